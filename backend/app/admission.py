@@ -0,0 +1,196 @@
+"""
+/api/chat 입장 제어 (클라이언트별 속도 제한 + 과부하 시 LLM 생략)
+
+- 요청 예산 (클라이언트별): 넘으면 429 + Retry-After. 분석/LLM/저장까지 가지 않으므로 파일도 남지 않는다.
+- LLM 예산 (대화별, 대화 ID가 없으면 클라이언트별): 넘으면 거절하지 않고 규칙 응답으로만 답한다.
+- 과부하: LLM 대기열이 ADMISSION_SHED_QUEUE 이상이면 위기가 아닌 요청부터 LLM을 건너뛴다
+  (위험 점수가 ELEVATED_RISK 이상이면 대기열이 두 배가 될 때까지는 LLM을 쓴다).
+- 위기 세션은 어느 경우에도 내리지 않는다. 위기로 판단된 대화(없으면 클라이언트)는 한동안 표시해 두고,
+  요청 예산을 넘긴 요청도 표시가 있거나 메시지에 자살 키워드가 있으면 통과시킨다.
+
+클라이언트 = 접속 IP (프록시 뒤에서는 TRUST_PROXY_HEADERS=1로 X-Forwarded-For 첫 주소).
+학교처럼 여러 학생이 같은 공인 IP를 쓰므로 요청 예산은 넉넉히 잡는다.
+버킷과 위기 표시는 공유 상태 저장소에 두므로 워커가 여러 개여도 한도는 하나다.
+
+환경 변수:
+    ADMISSION_ENABLED               0이면 끔
+    ADMISSION_RATE_PER_MINUTE       클라이언트별 요청 수 (기본 300, 순간 ADMISSION_BURST=100)
+    ADMISSION_LLM_RATE_PER_MINUTE   대화별 LLM 응답 수 (기본 20, 순간 ADMISSION_LLM_BURST=10)
+    ADMISSION_SHED_QUEUE            이 이상 LLM 대기열이 쌓이면 과부하 (기본 LLM_MAX_CONCURRENCY)
+    ADMISSION_CRISIS_TTL_SECONDS    위기 표시 유지 시간 (기본 86400)
+    TRUST_PROXY_HEADERS             1이면 X-Forwarded-For 사용
+"""
+from __future__ import annotations
+
+import contextvars
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .context import SUICIDE_HISTORY_WORDS, SUICIDE_REPLY_KEYWORDS
+from .features import flag
+from .metrics import ADMISSIONS, LLM_SHED
+from .state import get_state_store
+from .throttle import SharedTokenBucket, TokenBucket
+
+CRISIS_NS = "crisis_sessions"
+CRISIS_ACTIONS = ("전담자연계", "즉시대응")
+ELEVATED_RISK = 50
+MAX_LOCAL_CLIENTS = 10000
+
+# 미들웨어가 정한 요청의 클라이언트 키 (엔드포인트에서 LLM 예산을 볼 때 쓴다)
+client_var: contextvars.ContextVar[str] = contextvars.ContextVar("admission_client", default="-")
+
+
+def client_key(request) -> str:
+    if flag("TRUST_PROXY_HEADERS", False):
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()[:64]
+    return request.client.host if request.client else "unknown"
+
+
+def message_has_crisis(message: str) -> bool:
+    """본문만 보고 하는 싼 위기 판단 (분석 전에 거절할지 정할 때)"""
+    compact = message.replace(" ", "")
+    return any(k in compact for k in SUICIDE_REPLY_KEYWORDS) or any(w in message for w in SUICIDE_HISTORY_WORDS)
+
+
+def peek_chat_body(body: bytes) -> Tuple[str, Optional[str]]:
+    """요청 본문에서 (message, conversation_id)만 꺼낸다. 형식이 틀리면 빈 값 (검증은 엔드포인트가)"""
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        return "", None
+    if not isinstance(data, dict):
+        return "", None
+    message = data.get("message")
+    conversation_id = data.get("conversation_id")
+    return (
+        message if isinstance(message, str) else "",
+        conversation_id if isinstance(conversation_id, str) else None,
+    )
+
+
+class ClientBuckets:
+    """
+    키별 토큰 버킷
+    공유 저장소면 상태를 저장소에 두고(쓰지 않으면 TTL로 정리), 아니면 최근 MAX_LOCAL_CLIENTS개만 프로세스 안에 둔다.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: float) -> None:
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, burst)
+        self.store = get_state_store()
+        self._local: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> TokenBucket:
+        if self.store.shared:
+            # 가득 찰 때까지 걸리는 시간의 두 배 동안 안 쓰면 지워도 결과가 같다
+            idle = self.capacity / self.rate * 2 if self.rate > 0 else None
+            return SharedTokenBucket(self.store, f"{self.name}:{key}", self.rate, self.capacity, ttl=idle)
+        with self._lock:
+            bucket = self._local.get(key)
+            if bucket is None:
+                bucket = self._local[key] = TokenBucket(self.rate, self.capacity)
+                if len(self._local) > MAX_LOCAL_CLIENTS:
+                    self._local.popitem(last=False)
+            else:
+                self._local.move_to_end(key)
+            return bucket
+
+    def tracked(self) -> int:
+        with self._lock:
+            return len(self._local)
+
+
+class AdmissionController:
+    def __init__(self) -> None:
+        self.enabled = flag("ADMISSION_ENABLED")
+        self.requests = ClientBuckets(
+            "client",
+            float(os.getenv("ADMISSION_RATE_PER_MINUTE", "300")),
+            float(os.getenv("ADMISSION_BURST", "100")),
+        )
+        self.llm = ClientBuckets(
+            "client_llm",
+            float(os.getenv("ADMISSION_LLM_RATE_PER_MINUTE", "20")),
+            float(os.getenv("ADMISSION_LLM_BURST", "10")),
+        )
+        self.shed_queue = int(os.getenv("ADMISSION_SHED_QUEUE") or os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.crisis_ttl = float(os.getenv("ADMISSION_CRISIS_TTL_SECONDS", "86400"))
+        self.store = self.requests.store
+
+    # ---- 위기 표시 ----
+    def is_crisis(self, key: Optional[str]) -> bool:
+        return bool(key) and bool(self.store.get(CRISIS_NS, key))
+
+    def mark_crisis(self, key: str) -> None:
+        self.store.set(CRISIS_NS, key, True, ttl=self.crisis_ttl)
+
+    # ---- 요청 예산 (미들웨어) ----
+    def try_admit(self, client: str) -> bool:
+        return self.requests.get(client).try_acquire()
+
+    def retry_after(self, client: str) -> int:
+        return max(1, math.ceil(min(self.requests.get(client).wait_time(), 3600)))
+
+    def admit_over_budget(self, client: str, message: str, conversation_id: Optional[str]) -> bool:
+        """예산을 넘긴 요청 중 위기 세션/위기 메시지는 통과 (위기 표시는 대화 id에만 있다 - 클라이언트 IP로는 보지 않는다)"""
+        return self.is_crisis(conversation_id) or message_has_crisis(message)
+
+    # ---- LLM 예산 (엔드포인트) ----
+    def llm_shed_reason(self, session_key: str, risk_score: int, queued: int) -> Optional[str]:
+        """위기가 아닌 요청에서 LLM을 건너뛸 이유 (없으면 None)"""
+        threshold = self.shed_queue * (2 if risk_score >= ELEVATED_RISK else 1)
+        if queued >= threshold:
+            return "overload"
+        if not self.llm.get(session_key).try_acquire():
+            return "client_budget"
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "shared": self.store.shared,
+            "request_rate_per_minute": round(self.requests.rate * 60, 1),
+            "request_burst": self.requests.capacity,
+            "llm_rate_per_minute": round(self.llm.rate * 60, 1),
+            "llm_burst": self.llm.capacity,
+            "shed_queue": self.shed_queue,
+            "tracked_clients": self.requests.tracked(),
+            "admitted": int(ADMISSIONS.value(decision="admitted")),
+            "rejected": int(ADMISSIONS.value(decision="rejected")),
+            "crisis_bypass": int(ADMISSIONS.value(decision="crisis_bypass")),
+            "llm_shed_overload": int(LLM_SHED.value(reason="overload")),
+            "llm_shed_client_budget": int(LLM_SHED.value(reason="client_budget")),
+        }
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController()
+    return _controller
+
+
+def is_crisis_turn(analysis, ctx) -> bool:
+    """이번 턴이 위기 세션인지 (규칙 응답을 우선하는 조건과 같다)"""
+    return (
+        str(analysis.next_action) in CRISIS_ACTIONS
+        or str(analysis.suicide_signal) in ("중간", "높음")
+        or ctx.contact_handoff
+        or ctx.has_suicide_keyword
+        or ctx.has_suicide_in_history
+    )
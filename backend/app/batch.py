@@ -0,0 +1,347 @@
+"""
+저장된 대화 일괄 재채점
+키워드 목록이나 위험 점수 가중치를 바꾼 뒤 보관된 모든 대화의 턴별
+정서 고통/자살 신호/위험 점수/다음 조치를 다시 계산해서 파일에 반영한다.
+
+analyze_message를 턴마다 부르는 대신 청크 단위로 NumPy 배열 연산을 쓴다.
+- 청크의 사용자 발화를 대화 단위로 이어 붙인 한 문자열에서 키워드 위치를 찾고,
+  np.searchsorted로 각 위치가 끝나는 턴을 구해 (턴, 키워드) 행렬에 표시
+  (대화 안에서는 구분자 없이 이어 붙이므로 발화 경계에 걸친 키워드도 그대로 잡힌다)
+- 턴별 평가는 "그 턴까지의 발화를 이어 붙인 텍스트" 기준이므로, 대화 단위 누적 OR로 변환
+- 점수/조치/추이는 agent의 함수로 만든 조회표를 써서 가중치가 한 곳에서만 관리되게 한다
+- 종료 리포트의 발화별 위험 추이(risk_trajectory)/추이(trend)/요약은 저장된 history로 ConversationTracker를
+  다시 만들어서 채팅 경로(_build_end_report)와 같은 함수로 계산한다 (리포트가 있는 대화만)
+
+_estimate_distress/_estimate_suicide_signal의 판정 조건을 바꾸면 _classify도 같이 바꿔야 한다.
+(benchmarks/bench_batch.py로 턴 단위 계산과 결과가 같은지 확인)
+
+사용법:
+    cd backend
+    python -m app.batch [--include-test] [--workers 4] [--chunk-size 500] [--dry-run]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .agent import (
+    DISTRESS_CUES,
+    INTENSIFIERS,
+    SUICIDE_HIGH,
+    SUICIDE_MID,
+    ConversationTracker,
+    _estimate_risk_score,
+    _next_action,
+    _next_guidance,
+    _report_summary,
+    _trajectory_trend,
+    _trend,
+)
+from .storage import iter_conversation_files, write_conversation_file
+
+DISTRESS_LEVELS = ["낮음", "중간", "높음"]
+SUICIDE_SIGNALS = ["없음", "낮음", "중간", "높음"]
+NEXT_ACTIONS = ["일반대화", "주의환기", "전담자연계", "즉시대응"]
+
+# 대화 사이 구분자 (키워드에 없는 문자라 대화 경계를 넘는 매칭이 생기지 않는다)
+_CONVERSATION_SEPARATOR = "\x00"
+
+
+@dataclass
+class CueSet:
+    """키워드 행렬의 열 구성"""
+    keywords: List[str]
+    distress: np.ndarray
+    intensifier: np.ndarray
+    suicide_high: np.ndarray
+    suicide_mid: np.ndarray
+    die: int
+    want: int
+    patterns: List["re.Pattern"]
+
+
+def build_cue_set() -> CueSet:
+    keywords: List[str] = []
+
+    def add(words: Sequence[str]) -> np.ndarray:
+        start = len(keywords)
+        keywords.extend(words)
+        return np.arange(start, len(keywords))
+
+    distress = add(DISTRESS_CUES)
+    intensifier = add(INTENSIFIERS)
+    suicide_high = add(SUICIDE_HIGH)
+    suicide_mid = add(SUICIDE_MID)
+    die, want = add(["죽", "싶"])
+    return CueSet(
+        keywords=keywords,
+        distress=distress,
+        intensifier=intensifier,
+        suicide_high=suicide_high,
+        suicide_mid=suicide_mid,
+        die=int(die),
+        want=int(want),
+        patterns=[re.compile(re.escape(k)) for k in keywords],
+    )
+
+
+# 점수 조회표: RISK_TABLE[distress, signal], ACTION_TABLE[risk]
+RISK_TABLE = np.array(
+    [[_estimate_risk_score(d, s) for s in SUICIDE_SIGNALS] for d in DISTRESS_LEVELS],
+    dtype=np.int16,
+)
+ACTION_TABLE = np.array([NEXT_ACTIONS.index(_next_action(r)) for r in range(101)], dtype=np.int8)
+
+
+@dataclass
+class ScoredTurns:
+    """청크 전체 사용자 턴의 재채점 결과 (offsets[i]:offsets[i+1]이 i번째 대화)"""
+    offsets: np.ndarray
+    distress: np.ndarray
+    signal: np.ndarray
+    risk: np.ndarray
+    action: np.ndarray
+
+
+def _first_hits(text: str, turn_ends: np.ndarray, conversation_of_turn: np.ndarray, conversations: int, cues: CueSet) -> np.ndarray:
+    """
+    (대화, 키워드)별로 키워드가 처음 완성되는 턴의 전역 인덱스 (없으면 전체 턴 수)
+    매칭 위치는 앞에서부터 나오므로 대화별 첫 매칭이 곧 첫 등장 턴이다.
+    """
+    total = len(turn_ends)
+    first = np.full((conversations, len(cues.keywords)), total, dtype=np.int64)
+    for j, pattern in enumerate(cues.patterns):
+        match_ends = np.fromiter((m.end() for m in pattern.finditer(text)), dtype=np.int64)
+        if not match_ends.size:
+            continue
+        turns = np.searchsorted(turn_ends, match_ends, side="left")
+        owners, index = np.unique(conversation_of_turn[turns], return_index=True)
+        first[owners, j] = turns[index]
+    return first
+
+
+def _classify(first: np.ndarray, conversation_of_turn: np.ndarray, cues: CueSet) -> tuple:
+    """
+    첫 등장 턴 행렬 → 턴별 (distress 코드, signal 코드)
+    턴 t까지의 누적 텍스트에 키워드가 있다 ⇔ 그 대화에서 키워드가 처음 완성된 턴 <= t
+    """
+    # 하나라도 있으면 되는 묶음은 가장 이른 등장 턴 하나로 줄여서 비교량을 줄인다
+    grouped = np.column_stack([
+        first[:, cues.distress],
+        first[:, cues.intensifier].min(axis=1),
+        first[:, cues.suicide_high].min(axis=1),
+        first[:, cues.suicide_mid].min(axis=1),
+        first[:, cues.die],
+        first[:, cues.want],
+    ])
+    cum = np.arange(len(conversation_of_turn))[:, None] >= grouped[conversation_of_turn]
+    n = len(cues.distress)
+    hits = cum[:, :n].sum(axis=1)
+    intense, high, mid, die, want = (cum[:, n + i] for i in range(5))
+    distress = np.where(
+        (hits >= 3) | ((hits >= 2) & intense), 2,
+        np.where((hits >= 1) | intense, 1, 0),
+    )
+    signal = np.where(high, 3, np.where(mid, 2, np.where(die & want, 1, 0)))
+    return distress.astype(np.int8), signal.astype(np.int8)
+
+
+def score_conversations(conversations: Sequence[Sequence[str]], cues: Optional[CueSet] = None) -> ScoredTurns:
+    """
+    대화별 사용자 발화 목록을 받아 턴별 점수를 계산
+
+    Args:
+        conversations: 대화마다 (빈 문자열을 제외한) 사용자 발화 목록
+    """
+    cues = cues or build_cue_set()
+    lengths = np.array([len(turns) for turns in conversations], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    total = int(offsets[-1])
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int8)
+        return ScoredTurns(offsets, empty, empty, np.zeros(0, dtype=np.int16), empty)
+
+    texts = [turn.replace(" ", "") for turns in conversations for turn in turns]
+    conversation_of_turn = np.repeat(np.arange(len(conversations)), lengths)
+    # 대화마다 구분자 1글자가 앞에 쌓이므로 대화 번호만큼 위치를 민다
+    turn_ends = np.cumsum(np.fromiter(map(len, texts), dtype=np.int64, count=total)) + conversation_of_turn
+    text = _CONVERSATION_SEPARATOR.join(
+        "".join(texts[start:end]) for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    )
+
+    first = _first_hits(text, turn_ends, conversation_of_turn, len(conversations), cues)
+    distress, signal = _classify(first, conversation_of_turn, cues)
+    risk = RISK_TABLE[distress, signal]
+    action = ACTION_TABLE[risk]
+    return ScoredTurns(offsets, distress, signal, risk, action)
+
+
+# ---- 저장소 반영 ----
+def _user_items(data: Dict) -> List[Dict]:
+    return [
+        item for item in data.get("history") or []
+        if item.get("role") == "user" and item.get("content")
+    ]
+
+
+def _apply(data: Dict, scored: ScoredTurns, index: int) -> Tuple[int, bool]:
+    """
+    index번째 대화 결과를 data에 반영
+    (주제/턴 수처럼 위험도와 무관한 필드는 건드리지 않는다)
+
+    Returns:
+        (값이 바뀐 사용자 턴 수, 파일 내용이 바뀌었는지)
+    """
+    changed_turns = 0
+    start, end = int(scored.offsets[index]), int(scored.offsets[index + 1])
+    latest: Optional[Dict] = None
+    for item, row in zip(_user_items(data), range(start, end)):
+        d = DISTRESS_LEVELS[scored.distress[row]]
+        r = int(scored.risk[row])
+        latest = {
+            "emotional_distress": d,
+            "suicide_signal": SUICIDE_SIGNALS[scored.signal[row]],
+            "risk_score": r,
+            "next_action": NEXT_ACTIONS[scored.action[row]],
+        }
+        analysis = item.get("analysis") or {}
+        updated = {**analysis, **latest, "distress_level": d, "trend": _trend(r, d)}
+        if updated != analysis:
+            item["analysis"] = updated
+            changed_turns += 1
+
+    changed = changed_turns > 0
+    if latest is not None:
+        analysis = data.get("analysis") or {}
+        updated = {**analysis, **latest}
+        if updated != analysis:
+            data["analysis"] = updated
+            changed = True
+        end_report = data.get("end_report")
+        if end_report:
+            d, r = latest["emotional_distress"], latest["risk_score"]
+            tracker = ConversationTracker.from_history(
+                (item.get("role"), item.get("content") or "") for item in data.get("history") or []
+            )
+            updated = {
+                **end_report,
+                "summary": _report_summary(tracker),
+                "risk_score": r,
+                "distress_level": d,
+                "suicide_signal": latest["suicide_signal"],
+                "trend": _trajectory_trend(r, d, tracker.risk),
+                "next_guidance": _next_guidance(r, d),
+                "risk_trajectory": tracker.risk.report(),
+            }
+            if updated != end_report:
+                data["end_report"] = updated
+                changed = True
+    return changed_turns, changed
+
+
+def rescore_files(paths: Sequence[str], dry_run: bool = False) -> Dict[str, int]:
+    """파일 묶음 하나를 재채점 (프로세스 풀 작업 단위)"""
+    stats = {"files": 0, "turns": 0, "changed_files": 0, "changed_turns": 0, "errors": 0}
+    loaded = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                loaded.append((Path(path), json.load(f)))
+        except Exception as e:
+            print(f"[WARN] 대화 파일 읽기 실패 ({path}): {e}")
+            stats["errors"] += 1
+
+    scored = score_conversations([[item["content"] for item in _user_items(data)] for _, data in loaded])
+    for index, (path, data) in enumerate(loaded):
+        changed_turns, changed = _apply(data, scored, index)
+        stats["files"] += 1
+        stats["turns"] += int(scored.offsets[index + 1] - scored.offsets[index])
+        if not changed:
+            continue
+        stats["changed_files"] += 1
+        stats["changed_turns"] += changed_turns
+        if not dry_run:
+            try:
+                write_conversation_file(path, data)
+            except Exception as e:
+                print(f"[ERR] 대화 파일 쓰기 실패 ({path}): {e}")
+                stats["errors"] += 1
+    return stats
+
+
+def _chunks(items: Iterator[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def rescore_archive(
+    include_test: bool = False,
+    workers: int = 1,
+    chunk_size: int = 500,
+    dry_run: bool = False,
+) -> Dict[str, float]:
+    totals = {"files": 0, "turns": 0, "changed_files": 0, "changed_turns": 0, "errors": 0}
+    started = time.perf_counter()
+    chunks = _chunks((str(p) for p in iter_conversation_files(include_test)), chunk_size)
+    work = partial(rescore_files, dry_run=dry_run)
+    if workers <= 1:
+        results: Iterable[Dict[str, int]] = map(work, chunks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(work, chunks)
+    try:
+        for stats in results:
+            for key in totals:
+                totals[key] += stats[key]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    elapsed = time.perf_counter() - started
+    return {
+        **totals,
+        "seconds": round(elapsed, 3),
+        "turns_per_second": round(totals["turns"] / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="저장된 대화 턴별 위험도 일괄 재채점")
+    parser.add_argument("--include-test", action="store_true", help="테스트 대화도 포함")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="프로세스 수 (1이면 단일 프로세스)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="프로세스에 한 번에 넘길 파일 수")
+    parser.add_argument("--dry-run", action="store_true", help="파일에 쓰지 않고 바뀔 건수만 출력")
+    args = parser.parse_args(argv)
+
+    result = rescore_archive(
+        include_test=args.include_test,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        dry_run=args.dry_run,
+    )
+    mode = "dry-run" if args.dry_run else "written"
+    print(
+        f"[INFO] rescored {result['files']} files / {result['turns']} turns in {result['seconds']}s "
+        f"({result['turns_per_second']} turns/s), changed {result['changed_files']} files / "
+        f"{result['changed_turns']} turns ({mode}), errors {result['errors']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
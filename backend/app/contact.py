@@ -0,0 +1,169 @@
+"""
+연락처(이름/전화번호) 추출 모듈
+위기 상황에서 AI가 이름/전화번호를 물어본 뒤 학생 답변에서 연락처를 뽑아낸다.
+패턴은 모듈 로드 시 한 번만 컴파일하고, 한 턴에 한 번만 추출해서 main/agent가 같이 쓴다.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# 010-1234-5678, 010 1234 5678, 010.1234.5678, 02-123-4567, 01012345678
+_PHONE_PATTERN = re.compile(r"(?<!\d)(0\d{1,2})[-.\s]?(\d{3,4})[-.\s]?(\d{4})(?!\d)")
+# 구분자 없이 10-11자리 숫자 (기존 규칙과 호환)
+_PHONE_DIGITS_PATTERN = re.compile(r"(?<!\d)\d{10,11}(?!\d)")
+
+# "이름은 김민수야", "내 이름은 민수", "저는 김민수입니다", "나는 민수야"
+# 단어 시작에서만 (장난 아니야, 화난 상태야의 "난"은 단서가 아님)
+_NAME_CUE_PATTERN = re.compile(
+    r"(?<![가-힣])(?:이름(?:은|이|는)?|나는|난|저는)\s*([가-힣]{2,4}?)"
+    r"(이에요|예요|에요|입니다|이야|야|이고|이라고|라고|임)?(?=[\s.,!~]|$)"
+)
+# "민수라고 해", "김민수라고 합니다"
+_NAME_SUFFIX_PATTERN = re.compile(r"(?:^|[\s,])([가-힣]{2,4}?)(?:이라고|라고)\s*(?:해|합니다|해요)")
+_LATIN_NAME_CUE_PATTERN = re.compile(r"(?:my name is|i am|i'm)\s*[:\-]?\s*([a-z]{2,10})\b", re.IGNORECASE)
+_HANGUL_NAME_TOKEN_PATTERN = re.compile(r"^[가-힣]{2,4}$")
+_LATIN_NAME_TOKEN_PATTERN = re.compile(r"^[A-Za-z]{2,10}$")
+_TOKEN_SPLIT_PATTERN = re.compile(r"[\s,./!?~]+")
+_TRAILING_PARTICLE_PATTERN = re.compile(r"(?:이에요|예요|에요|입니다|이야|야|임)$")
+
+SURNAMES = frozenset(
+    "김 이 박 최 정 강 조 윤 장 임 한 오 서 신 권 황 안 송 류 유 전 홍 고 문 양 손 배 백 허 남 심 노 하 곽 성 차 "
+    "주 우 구 민 진 나 지 엄 채 원 천 방 공 현 함 변 염 여 추 도 소 석 선 설 마 길 연 위 표 명 기 반 왕 금 옥 육 "
+    "인 맹 제 모 탁 국 어 은 편 용 예 경 봉 사 부".split()
+)
+COMPOUND_SURNAMES = ("황보", "남궁", "제갈", "선우", "독고", "사공", "서문")
+
+# 이름처럼 보이지만 대화에서 흔한 단어들 (성씨 글자로 시작)
+NAME_STOPWORDS = frozenset([
+    "이제는", "이대로", "이름은", "이름이", "정말로", "진짜로", "지금은", "조금만", "오늘은", "오늘도", "아니야",
+    "그런데", "그래서", "있잖아", "괜찮아", "고마워", "미안해", "안녕하", "전화번호", "연락처는", "선생님", "부모님",
+    "우리반", "우리집", "학교에", "친구가", "친구들", "이야기", "하기싫", "나중에", "정말이", "학생", "중학생",
+    "고등학생", "초등학생", "남학생", "여학생", "기다릴", "조용히", "어디서", "혼자서",
+    # 성씨 글자로 시작하는 흔한 두 글자 말 (이름만 짧게 답한 경우와 구분)
+    "정말", "진짜", "진심", "지금", "조금", "이제", "이거", "이건", "우리", "오늘", "어제", "여기", "전화", "문자",
+    "경찰", "엄마", "부모", "선생", "정도", "주말", "방금", "하지", "안녕", "사실", "제발", "모름", "남자", "여자",
+    "혼자", "이름", "연락", "하나", "바보", "상관", "신고", "비밀", "장난", "공부", "시험", "성적", "학원",
+    "하이", "왕따", "우울", "기분", "고민", "고통", "심심", "도움", "도와", "사랑", "인생", "반장", "전학", "방학",
+    "소문", "주먹", "노답", "성격", "진로", "공포", "문제", "유치", "한번", "한심", "구라",
+    "노노", "이따", "이따가", "절대", "신경", "나중",
+])
+# 조사/호칭으로 끝나는 말은 이름이 아니라 다른 사람/기관을 가리킨다 (경찰에, 선생님께, 엄마한테, 나도)
+PARTICLE_ENDINGS = ("에게", "한테", "께서", "께", "에", "님", "쌤", "가", "를", "을", "는", "도", "랑", "하고")
+# 이름으로 끝나기 어려운 어미 (싫어, 안돼요, 어떡해, 도와줘, 하지마, 신경꺼, 안됨, 신고할거 ...)
+NON_NAME_ENDINGS = frozenset("어해줘요게까래네워져봐다야돼마꺼됨줌거면셈함")
+# 이름 안에 나오지 않는 동사/부정 조각 (전화하면, 하기 싫음, 할거, 않아, 못해, 싶어 ...)
+VERB_FRAGMENTS = ("하면", "하기", "할거", "할게", "지마", "싫", "않", "못", "싶", "겠")
+LATIN_STOPWORDS = frozenset(["ok", "okay", "no", "yes", "hi", "hello", "hey", "bye", "lol", "sorry", "thanks", "name"])
+
+
+@dataclass(frozen=True)
+class ContactInfo:
+    """한 메시지에서 추출한 연락처"""
+    phone: Optional[str] = None  # 숫자만 남긴 번호 (예: 01012345678)
+    name: Optional[str] = None
+
+    @property
+    def has_phone(self) -> bool:
+        return self.phone is not None
+
+    @property
+    def has_name(self) -> bool:
+        return self.name is not None
+
+    @property
+    def provided(self) -> bool:
+        """이름 또는 전화번호 중 하나라도 있으면 True"""
+        return self.phone is not None or self.name is not None
+
+    @property
+    def formatted_phone(self) -> Optional[str]:
+        if not self.phone:
+            return None
+        digits = self.phone
+        if digits.startswith("02"):
+            return f"02-{digits[2:-4]}-{digits[-4:]}"
+        return f"{digits[:3]}-{digits[3:-4]}-{digits[-4:]}"
+
+
+EMPTY_CONTACT = ContactInfo()
+
+
+def _is_verb_like(token: str) -> bool:
+    """거절/금지/부정 표현이나 동사 어간 (서술격 조사가 붙어도 이름으로 보지 않는다)"""
+    return token[-1] in NON_NAME_ENDINGS or any(fragment in token for fragment in VERB_FRAGMENTS)
+
+
+def _is_particle_final(token: str) -> bool:
+    if token.endswith(PARTICLE_ENDINGS):
+        return True
+    # "민준이"처럼 받침 있는 이름 + 주격 조사 (다른 사람 이야기: "민준이 때렸어")
+    return len(token) == 3 and token.endswith("이")
+
+
+def _looks_like_korean_name(token: str) -> bool:
+    if token in NAME_STOPWORDS or _is_verb_like(token):
+        return False
+    if token.startswith(COMPOUND_SURNAMES):
+        return True
+    return token[0] in SURNAMES
+
+
+def _extract_phone(message: str) -> Optional[str]:
+    match = _PHONE_PATTERN.search(message)
+    if match:
+        return "".join(match.groups())
+    match = _PHONE_DIGITS_PATTERN.search(message)
+    if match:
+        return match.group(0)
+    return None
+
+
+def _extract_name(message: str) -> Optional[str]:
+    # 1) "이름은 ~", "나는 ~야" 처럼 이름임을 밝힌 경우
+    for match in _NAME_CUE_PATTERN.finditer(message):
+        token, copula = match.group(1), match.group(2)
+        if not copula and len(token) == 3 and token.endswith("이"):
+            # 이름임을 밝힌 뒤의 "민준이"는 부르는 이름 (이름은 민준이 → 민준)
+            token = token[:-1]
+        if token in NAME_STOPWORDS or _is_particle_final(token) or _is_verb_like(token):
+            continue
+        # 서술격 조사가 붙으면 이름으로 보고, 아니면 성씨로 시작하는 2-4자만 인정 ("나는 너무 힘들어" 제외)
+        if copula or _looks_like_korean_name(token):
+            return token
+    match = _NAME_SUFFIX_PATTERN.search(message)
+    if match and match.group(1) not in NAME_STOPWORDS and not _is_verb_like(match.group(1)):
+        return match.group(1)
+    match = _LATIN_NAME_CUE_PATTERN.search(message)
+    if match and match.group(1).lower() not in LATIN_STOPWORDS:
+        return match.group(1)
+
+    # 2) 이름만 짧게 답한 경우 ("김민수", "민수", "지민이야", "김민수 01012345678", "minsu")
+    tokens = [t for t in _TOKEN_SPLIT_PATTERN.split(message) if t and not any(ch.isdigit() for ch in t)]
+    if not tokens or len(tokens) > 2:
+        return None
+    for token in tokens:
+        stripped = _TRAILING_PARTICLE_PATTERN.sub("", token)
+        if len(stripped) >= 2:
+            token = stripped
+        if (
+            _HANGUL_NAME_TOKEN_PATTERN.match(token)
+            and not _is_particle_final(token)
+            and _looks_like_korean_name(token)
+        ):
+            return token
+        if _LATIN_NAME_TOKEN_PATTERN.match(token) and token.lower() not in LATIN_STOPWORDS:
+            return token
+    return None
+
+
+def extract_contact_info(message: str) -> ContactInfo:
+    """메시지에서 전화번호(하이픈/공백 정규화)와 이름을 추출"""
+    if not message:
+        return EMPTY_CONTACT
+    phone = _extract_phone(message)
+    name = _extract_name(message)
+    if phone is None and name is None:
+        return EMPTY_CONTACT
+    return ContactInfo(phone=phone, name=name)
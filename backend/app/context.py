@@ -0,0 +1,112 @@
+"""
+턴 단위 공유 컨텍스트
+한 요청에서 main/agent/llm이 공통으로 쓰는 파생 값(최근 발화, 정규화 텍스트, 연락처 등)을
+한 번만 계산해서 나눠 쓴다. 모든 값은 처음 접근할 때 계산되고 이후에는 캐시된다.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .contact import ContactInfo, extract_contact_info
+from .schemas import ChatTurn
+from .transcript import Transcript
+
+# AI가 이름/연락처를 물어봤는지 판단하는 문구
+CONTACT_REQUEST_PHRASES = ("이름", "전화번호", "연락처", "전화해줄까")
+# main.chat에서 규칙 응답을 우선할 자살 키워드 (공백 제거 후 비교)
+SUICIDE_REPLY_KEYWORDS = ("자살", "죽고싶", "죽고싶어", "죽을래", "끝내고싶", "살고싶지")
+SUICIDE_HISTORY_WORDS = ("자살", "죽고", "죽을", "끝내", "살고 싶지")
+
+
+@dataclass
+class TurnContext:
+    history: Transcript
+    message: str
+    _recent: Dict[Tuple[str, int], List[str]] = field(default_factory=dict, repr=False)
+    _recent_text: Dict[Tuple[str, int], str] = field(default_factory=dict, repr=False)
+
+    # ---- 현재 메시지 ----
+    @cached_property
+    def normalized(self) -> str:
+        """공백 제거 메시지 (agent 키워드 매칭 기준)"""
+        return self.message.replace(" ", "")
+
+    @cached_property
+    def normalized_lower(self) -> str:
+        return self.normalized.lower()
+
+    @cached_property
+    def contact(self) -> ContactInfo:
+        return extract_contact_info(self.message)
+
+    # ---- 히스토리 뷰 ----
+    def recent(self, role: str, window: int) -> List[str]:
+        """history[-window:] 중 role 발화 내용"""
+        key = (role, window)
+        cached = self._recent.get(key)
+        if cached is None:
+            cached = self.history.recent(role, window)
+            self._recent[key] = cached
+        return cached
+
+    def recent_user(self, window: int) -> List[str]:
+        return self.recent("user", window)
+
+    def recent_ai(self, window: int) -> List[str]:
+        return self.recent("ai", window)
+
+    def recent_user_text(self, window: int) -> str:
+        """최근 사용자 발화를 공백으로 이어 붙인 소문자 텍스트"""
+        key = ("user", window)
+        cached = self._recent_text.get(key)
+        if cached is None:
+            cached = " ".join(self.recent_user(window)).lower()
+            self._recent_text[key] = cached
+        return cached
+
+    def recent_ai_has_any(self, window: int, phrases: Sequence[str]) -> bool:
+        return any(any(p in text for p in phrases) for text in self.recent_ai(window))
+
+    @cached_property
+    def user_texts(self) -> List[str]:
+        return self.history.texts("user")
+
+    @cached_property
+    def ai_texts(self) -> List[str]:
+        return self.history.texts("ai")
+
+    @cached_property
+    def full_user_text(self) -> str:
+        """전체 사용자 발화 + 현재 메시지 (공백 제거) - 위험도 평가 기준"""
+        return "".join(self.user_texts + [self.message]).replace(" ", "")
+
+    @cached_property
+    def last_user(self) -> Optional[str]:
+        return self.user_texts[-1] if self.user_texts else None
+
+    # ---- 파생 판단 ----
+    @cached_property
+    def asked_contact_info(self) -> bool:
+        """최근 AI 응답에서 이름/전화번호를 요청했는지"""
+        return self.recent_ai_has_any(3, CONTACT_REQUEST_PHRASES)
+
+    @cached_property
+    def contact_handoff(self) -> bool:
+        """AI가 연락처를 물었고 이번 메시지에서 연락처를 준 경우"""
+        return self.asked_contact_info and self.contact.provided
+
+    @cached_property
+    def has_suicide_keyword(self) -> bool:
+        return any(k in self.normalized for k in SUICIDE_REPLY_KEYWORDS)
+
+    @cached_property
+    def has_suicide_in_history(self) -> bool:
+        text = self.recent_user_text(5)
+        return any(word in text for word in SUICIDE_HISTORY_WORDS)
+
+
+def build_turn_context(history: Union[Transcript, Iterable[ChatTurn]], message: str) -> TurnContext:
+    """history는 Transcript (ChatTurn 목록을 넘기면 Transcript로 바꾼다)"""
+    return TurnContext(history=Transcript.from_turns(history), message=message)
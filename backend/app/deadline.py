@@ -0,0 +1,90 @@
+"""
+요청 단위 시간 예산(deadline)과 단계별 지연 통계
+채팅 요청마다 Deadline을 하나 만들어 RAG 검색/LLM 호출에 넘기고,
+각 단계는 남은 시간 안에서만 기다린다. 남은 시간이 LLM p95 지연보다 짧으면
+LLM을 부르지 않고 규칙 응답으로 바로 돌아간다.
+
+환경 변수:
+    CHAT_DEADLINE_SECONDS   채팅 요청 하나의 전체 예산 (기본 10초)
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class DeadlineExceeded(Exception):
+    """요청 예산 안에 단계가 끝나지 않음"""
+
+
+class Deadline:
+    def __init__(self, budget_seconds: float) -> None:
+        self.budget = budget_seconds
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget_seconds
+
+    @classmethod
+    def for_chat(cls) -> "Deadline":
+        return cls(float(os.getenv("CHAT_DEADLINE_SECONDS", "10")))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def covers(self, seconds: float) -> bool:
+        return self.remaining() >= seconds
+
+
+class LatencyTracker:
+    """
+    최근 window개 지연 시간의 분위수
+    표본이 min_samples개보다 적으면 prior 값을 쓴다 (서버 시작 직후)
+    """
+
+    def __init__(self, prior_seconds: float, window: int = 200, min_samples: int = 20) -> None:
+        self.prior_seconds = prior_seconds
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def reset(self) -> None:
+        """표본을 비운다 (다시 prior부터) - 업스트림이 회복된 것을 확인했을 때"""
+        with self._lock:
+            self._samples.clear()
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return self.prior_seconds
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def p95(self) -> float:
+        return self.quantile(0.95)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            samples = len(self._samples)
+        return {
+            "samples": samples,
+            "p50_ms": round(self.quantile(0.5) * 1000, 1),
+            "p95_ms": round(self.p95() * 1000, 1),
+        }
+
+
+def remaining_or(deadline: Optional[Deadline], default: float) -> float:
+    """deadline이 없으면 default, 있으면 남은 시간과 default 중 작은 값"""
+    return default if deadline is None else min(default, deadline.remaining())
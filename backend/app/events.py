@@ -0,0 +1,195 @@
+"""
+위험 상승 이벤트 버스 (pub/sub)
+main.chat에서 위험 상승 이벤트를 발행하고, 관리자 대시보드는 SSE로 구독한다.
+모든 이벤트에는 단조 증가하는 offset이 붙어 재접속한 클라이언트가 놓친 이벤트를 다시 받을 수 있다.
+이벤트 로그는 공유 상태 저장소(state.py)에 두므로 `uvicorn --workers N`에서도 어느 워커가 발행했든
+모든 워커의 구독자가 같은 순서로 받는다.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from .state import StateStore, get_state_store
+
+# 다음 조치 단계 (높을수록 위험)
+ACTION_RANK = {"일반대화": 0, "주의환기": 1, "전담자연계": 2, "즉시대응": 3}
+ESCALATION_ACTIONS = ("전담자연계", "즉시대응")
+
+HEARTBEAT_SECONDS = 15.0
+# 다른 워커가 발행한 이벤트를 확인하는 주기 (공유 저장소일 때만)
+POLL_SECONDS = 1.0
+EVENTS = "events"
+# {"next": 다음 offset, "events": 최근 이벤트 목록} - 발행 한 번이 이 키 하나의 원자적 갱신
+LOG_KEY = "log"
+# 로그가 커밋된 뒤 올리는 다음 offset (구독자는 이 작은 값만 보고 로그를 읽을지 정한다)
+HEAD_KEY = "head"
+
+
+@dataclass
+class Event:
+    offset: int
+    type: str
+    timestamp: str
+    data: Dict[str, Any]
+
+    def to_sse(self) -> str:
+        payload = json.dumps(asdict(self), ensure_ascii=False)
+        return f"id: {self.offset}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+class EventBus:
+    """
+    최근 이벤트를 공유 저장소에 링 버퍼(append-only, offset 순)로 보관하는 pub/sub 버스
+    - publish는 스레드/프로세스 안전 (offset 발급과 추가가 저장소의 한 update)
+    - 같은 워커의 구독자는 발행 즉시 깨우고, 다른 워커의 발행은 POLL_SECONDS마다 head를 보고 알아챈다.
+    - 구독자는 항상 로그에서 기대 offset 이후를 읽으므로 워커가 섞여도 순서가 뒤바뀌거나 빠지지 않는다.
+    """
+
+    def __init__(self, capacity: int = 1000, store: Optional[StateStore] = None) -> None:
+        self.capacity = capacity
+        self._store = store
+        self._lock = threading.Lock()
+        self._subscribers: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    @property
+    def store(self) -> StateStore:
+        return self._store or get_state_store()
+
+    @property
+    def next_offset(self) -> int:
+        return int(self.store.get(EVENTS, HEAD_KEY, 0))
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> Event:
+        def append(log: Optional[Dict]) -> Tuple[Dict, Event]:
+            log = log or {"next": 0, "events": []}
+            event = Event(
+                offset=log["next"],
+                type=event_type,
+                timestamp=datetime.now().isoformat(),
+                data=data,
+            )
+            events = (log["events"] + [asdict(event)])[-self.capacity:]
+            return {"next": event.offset + 1, "events": events}, event
+
+        store = self.store
+        event = store.update(EVENTS, LOG_KEY, append)
+        # 두 워커의 head 기록 순서가 뒤바뀌어도 줄어들지 않게
+        store.update(EVENTS, HEAD_KEY, lambda head: (max(head or 0, event.offset + 1), None))
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, wakeup in subscribers:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # 이벤트 루프가 이미 닫힌 구독자
+                self._discard((loop, wakeup))
+        return event
+
+    def replay(self, offset: int) -> List[Event]:
+        """offset 이상인 이벤트 (로그에 남아있는 것만)"""
+        log = self.store.get(EVENTS, LOG_KEY) or {}
+        return [Event(**e) for e in log.get("events", []) if e["offset"] >= offset]
+
+    def _discard(self, subscriber: Tuple[asyncio.AbstractEventLoop, asyncio.Event]) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    async def subscribe(
+        self,
+        offset: Optional[int] = None,
+        is_disconnected: Optional[Callable[[], Any]] = None,
+    ) -> AsyncIterator[Optional[Event]]:
+        """
+        offset부터 이벤트를 순서대로 내보낸다 (offset이 없으면 새 이벤트만).
+        HEARTBEAT_SECONDS 동안 이벤트가 없으면 None을 내보내 연결 유지에 쓴다.
+        """
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        subscriber = (loop, wakeup)
+        # 누락이 없도록 먼저 등록한 뒤 head를 읽는다.
+        with self._lock:
+            self._subscribers.add(subscriber)
+        # 저장소 읽기는 (sqlite 잠금 대기가 있을 수 있어) 이벤트 루프 밖에서
+        head = await asyncio.to_thread(lambda: self.next_offset)
+        # 로그보다 앞선 offset은 서버가 다시 시작되기 전(메모리 저장소)의 것 - 지금부터 받는다
+        expected = head if offset is None or offset > head else offset
+        poll = POLL_SECONDS if self.store.shared else HEARTBEAT_SECONDS
+        last_sent = time.monotonic()
+        try:
+            while True:
+                wakeup.clear()
+                head = await asyncio.to_thread(lambda: self.next_offset)
+                if head > expected:
+                    # head보다 앞선 이벤트는 로그에 이미 커밋되어 있다
+                    for event in await asyncio.to_thread(self.replay, expected):
+                        yield event
+                        expected = event.offset + 1
+                    expected = max(expected, head)
+                    last_sent = time.monotonic()
+                if is_disconnected is not None and await is_disconnected():
+                    break
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=poll)
+                except asyncio.TimeoutError:
+                    if time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+                        yield None
+                        last_sent = time.monotonic()
+        finally:
+            self._discard(subscriber)
+
+
+_bus = EventBus()
+
+
+def get_event_bus() -> EventBus:
+    return _bus
+
+
+def publish_risk_escalation(
+    previous_action: Optional[str],
+    analysis: Dict[str, Any],
+    filename: Optional[str] = None,
+    is_test: bool = False,
+) -> Optional[Event]:
+    """
+    다음 조치가 전담자연계/즉시대응으로 올라간 경우에만 이벤트 발행
+    (이미 같은 단계였던 턴에서는 다시 알리지 않음)
+    """
+    action = analysis.get("next_action")
+    if action not in ESCALATION_ACTIONS:
+        return None
+    if ACTION_RANK.get(action, 0) <= ACTION_RANK.get(previous_action or "", -1):
+        return None
+    return _bus.publish(
+        "risk_escalation",
+        {
+            "previous_action": previous_action,
+            "next_action": action,
+            "risk_score": analysis.get("risk_score"),
+            "emotional_distress": analysis.get("emotional_distress"),
+            "suicide_signal": analysis.get("suicide_signal"),
+            "filename": filename,
+            "is_test": is_test,
+        },
+    )
+
+
+async def sse_stream(
+    offset: Optional[int] = None,
+    is_disconnected: Optional[Callable[[], Any]] = None,
+) -> AsyncIterator[str]:
+    """text/event-stream 직렬화"""
+    # 클라이언트 재접속 대기 시간 (ms)
+    yield "retry: 3000\n\n"
+    async for event in _bus.subscribe(offset, is_disconnected):
+        if event is None:
+            yield ": keep-alive\n\n"
+        else:
+            yield event.to_sse()
@@ -0,0 +1,47 @@
+"""
+선택 기능 플래그
+무거운 선택 의존성(chromadb, numpy 모델 등)은 여기서 켜져 있는지만 싸게 확인하고,
+실제 import는 기능을 처음 쓸 때 한다. (관리자 엔드포인트만 쓰는 프로세스나 CLI가 빨리 뜨도록)
+
+환경 변수:
+    RAG_ENABLED     0이면 RAG 검색 끔 (chromadb가 설치되어 있어도 import하지 않음)
+    RISK_SHADOW     0이면 위험도 모델 shadow 끔
+    RISK_SHADOW_MODEL
+"""
+from __future__ import annotations
+
+import importlib.util
+import os
+from functools import lru_cache
+from pathlib import Path
+
+SHADOW_MODEL_PATH = Path("data/models/risk_ngram.npz")
+
+
+def flag(name: str, default: bool = True) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.lower() not in ("0", "false", "no", "off")
+
+
+@lru_cache(maxsize=None)
+def module_available(name: str) -> bool:
+    """패키지를 import하지 않고 설치 여부만 확인"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def rag_enabled() -> bool:
+    return flag("RAG_ENABLED") and module_available("chromadb")
+
+
+def shadow_model_path() -> Path:
+    return Path(os.getenv("RISK_SHADOW_MODEL") or SHADOW_MODEL_PATH)
+
+
+def shadow_enabled() -> bool:
+    """shadow 점수기를 쓸지 (모델 파일이 없으면 numpy/모델을 불러올 필요가 없다)"""
+    return flag("RISK_SHADOW") and shadow_model_path().exists()
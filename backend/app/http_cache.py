@@ -0,0 +1,147 @@
+"""
+관리자 조회 응답의 HTTP 캐시 (ETag / Last-Modified / 304, 압축 본문 재사용)
+
+- 렌더링 결과(JSON 바이트)를 저장소 버전(파일/디렉터리 stat)과 함께 기억해 두고, 버전이 같으면 다시 읽지 않는다
+- ETag는 본문 해시라서 버전 판단이 틀려도(같은 틱 안의 수정) 잘못된 304는 나가지 않는다
+- gzip(있으면 brotli) 압축 본문도 버전마다 한 번만 만든다
+- 관리자 데이터이므로 Cache-Control: private, no-cache (브라우저가 저장하되 매번 ETag로 확인)
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .features import module_available
+
+# 이보다 작은 본문은 압축하지 않는다
+MIN_COMPRESS_BYTES = 1024
+# stat 시각이 이보다 최근이면 같은 틱 안에 또 바뀔 수 있으므로 기억하지 않는다 (racy 판단)
+RACY_SECONDS = 1.0
+
+
+@dataclass
+class Rendered:
+    body: bytes
+    last_modified: float
+    etag: str = ""
+    _encoded: Dict[str, bytes] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self.etag:
+            self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+
+    def encoded(self, encoding: str) -> bytes:
+        with self._lock:
+            data = self._encoded.get(encoding)
+            if data is None:
+                if encoding == "br":
+                    import brotli
+                    data = brotli.compress(self.body, quality=5)
+                else:
+                    data = gzip.compress(self.body, compresslevel=6, mtime=0)
+                self._encoded[encoding] = data
+            return data
+
+
+def render_json(payload: Any, last_modified: float) -> Rendered:
+    return Rendered(json.dumps(payload, ensure_ascii=False).encode("utf-8"), last_modified)
+
+
+def is_racy(mtime: float) -> bool:
+    return time.time() - mtime < RACY_SECONDS
+
+
+class RenderCache:
+    """키별 (버전, Rendered) LRU - 버전이 바뀌면 다시 렌더링"""
+
+    def __init__(self, max_entries: int = 128) -> None:
+        self.max_entries = max_entries
+        self._items: "OrderedDict[Hashable, Tuple[Hashable, Rendered]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: Hashable, render: Callable[[], Optional[Rendered]], cacheable: bool = True) -> Optional[Rendered]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] == version:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+        rendered = render()
+        with self._lock:
+            if rendered is not None and cacheable:
+                self._items[key] = (version, rendered)
+                self._items.move_to_end(key)
+                while len(self._items) > self.max_entries:
+                    self._items.popitem(last=False)
+            else:
+                self._items.pop(key, None)
+        return rendered
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # 약한 비교 (W/ 접두사 무시) - 프록시가 압축하면서 W/를 붙이는 경우
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in tags
+
+
+def not_modified(request: Request, rendered: Rendered) -> bool:
+    """If-None-Match가 있으면 그것만, 없으면 If-Modified-Since로 판단"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, rendered.etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP 날짜는 초 단위
+        return int(rendered.last_modified) <= since
+    return False
+
+
+def _choose_encoding(request: Request, size: int) -> Optional[str]:
+    if size < MIN_COMPRESS_BYTES:
+        return None
+    accepted = {part.split(";")[0].strip().lower() for part in request.headers.get("accept-encoding", "").split(",")}
+    if "br" in accepted and module_available("brotli"):
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def cached_json_response(request: Request, rendered: Rendered) -> Response:
+    headers = {
+        "ETag": rendered.etag,
+        "Last-Modified": formatdate(rendered.last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if not_modified(request, rendered):
+        return Response(status_code=304, headers=headers)
+    encoding = _choose_encoding(request, len(rendered.body))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        return Response(rendered.encoded(encoding), media_type="application/json", headers=headers)
+    return Response(rendered.body, media_type="application/json", headers=headers)
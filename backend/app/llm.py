@@ -1,52 +1,221 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import os
-from typing import List, Optional
-
-from openai import OpenAI
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, List, Optional, Union
 
+from .context import TurnContext, build_turn_context
+from .deadline import Deadline, DeadlineExceeded, LatencyTracker, remaining_or
+from .features import rag_enabled
+from .llm_backends import BackendRateLimited, Completion, LLMBackend, get_backend
+from .metrics import LLM_CALLS, RAG_CHUNKS, RAG_SEARCHES, REPLY_CACHE, log, observe_stage, span
+from .rag import search_relevant_chunks
+from .reply_cache import get_reply_cache
 from .schemas import ChatTurn
+from .transcript import Transcript
+from .throttle import Coalescer, PriorityLimiter, QueueTimeout, make_token_bucket
+
 
-# RAG는 선택적으로 로드 (없어도 작동)
-try:
-    from .rag import search_relevant_chunks
-    RAG_AVAILABLE = True
-except ImportError:
-    RAG_AVAILABLE = False
-    def search_relevant_chunks(*args, **kwargs):
-        return []
+class _LLMGate:
+    """
+    LLM 백엔드 호출 앞단 (프로세스 전역)
+    - 동시 호출 수 제한 + 위험도 높은 세션 우선 (LLM_MAX_CONCURRENCY, 기본 8)
+    - 분당 호출 수 제한 (LLM_RATE_PER_MINUTE, 기본 300), 429를 받으면 Retry-After만큼 멈춤
+    - 같은 프롬프트가 호출 중이면 결과를 같이 받음
+    - 대기가 LLM_QUEUE_TIMEOUT_SECONDS(기본 15초)를 넘으면 포기하고 규칙 응답으로
+    - 요청 deadline이 있으면 그 안에서만 기다리고, LLM_HEDGE_AFTER_SECONDS(기본 0=끔)가
+      지나도 응답이 없으면 같은 요청을 하나 더 보내 먼저 온 응답을 쓴다
+    """
 
+    def __init__(self) -> None:
+        rate_per_minute = float(os.getenv("LLM_RATE_PER_MINUTE", "300"))
+        self.limiter = PriorityLimiter(int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+        # 분당 한도는 워커 전체 합계 (공유 상태 저장소가 sqlite면 워커끼리 버킷을 나눠 쓴다)
+        self.bucket = make_token_bucket("llm", rate=rate_per_minute / 60.0, capacity=max(1.0, rate_per_minute / 30.0))
+        self.coalescer = Coalescer()
+        self.queue_timeout = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "15"))
+        self.hedge_after = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+        # 표본이 모이기 전에는 LLM_P95_PRIOR_SECONDS를 p95로 본다
+        self.latency = LatencyTracker(float(os.getenv("LLM_P95_PRIOR_SECONDS", "4")))
+        self.rag_latency = LatencyTracker(0.5)
+        # deadline을 넘겨 버려진 호출도 끝날 때까지 스레드를 잡고 있으므로 여유를 둔다
+        self._executor = ThreadPoolExecutor(max_workers=self.limiter.max_concurrent * 2 + 4, thread_name_prefix="llm")
+        self.probe_interval = float(os.getenv("LLM_PROBE_INTERVAL_SECONDS", "10"))
+        self._last_probe = 0.0
+        self._counts: Counter = Counter()
+        self._counts_lock = threading.Lock()
 
-def _get_client() -> Optional[OpenAI]:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    def admit(self, deadline: Optional[Deadline]) -> Optional[str]:
+        """
+        요청당 한 번 하는 예산 판단: "call"(호출), "probe"(회복 확인용 호출), None(건너뜀)
+        남은 시간이 LLM p95보다 짧으면 호출하지 않는다.
+        단 업스트림이 느려져 p95가 예산만큼 커진 뒤에도 회복을 알 수 있도록
+        LLM_PROBE_INTERVAL_SECONDS(기본 10초)마다 한 번은 probe로 통과시킨다.
+        probe는 이후 단계에서 다시 건너뛰지 않고 complete(probe=True)까지 간다.
+        """
+        if deadline is None or deadline.covers(self.latency.p95()):
+            return "call"
+        now = time.monotonic()
+        with self._counts_lock:
+            if now - self._last_probe >= self.probe_interval:
+                self._last_probe = now
+                self._counts["probes"] += 1
+                return "probe"
+            self._counts["skipped_budget"] += 1
         return None
-    return OpenAI(api_key=api_key)
 
+    def count(self, name: str) -> None:
+        with self._counts_lock:
+            self._counts[name] += 1
 
-def generate_reply(history: List[ChatTurn], message: str) -> Optional[str]:
-    client = _get_client()
-    if not client:
-        return None
+    def complete(
+        self,
+        backend: LLMBackend,
+        priority: int,
+        deadline: Optional[Deadline] = None,
+        probe: bool = False,
+        **request,
+    ) -> Completion:
+        """probe: admit()가 회복 확인용으로 통과시킨 호출 - 예산 안에 응답하면 지연 표본을 비운다"""
+        key = hashlib.sha1(
+            json.dumps([backend.label, request], ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return self.coalescer.run(
+            key,
+            lambda: self._complete(backend, priority, request, deadline, probe),
+            timeout=deadline.remaining() if deadline else None,
+        )
 
-    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    
-    # RAG: 관련 매뉴얼 청크 검색 (우선 참고) - 더 많은 결과 검색
-    # RAG 검색 실패 시에도 대화는 계속 진행
-    relevant_chunks = []
-    if RAG_AVAILABLE:
-        try:
-            # 대화 히스토리와 현재 메시지를 모두 고려하여 검색
-            search_query = message
-            if history:
-                recent_context = " ".join([turn.content for turn in history[-3:] if turn.role == "user"])
-                search_query = recent_context + " " + message
-            relevant_chunks = search_relevant_chunks(search_query, history, n_results=5)  # 3개 → 5개로 증가
-            print(f"[RAG] 검색 결과: {len(relevant_chunks)}개 청크 발견")
-        except Exception as e:
-            print(f"⚠️ RAG 검색 중 예외 발생 (계속 진행): {e}")
-            relevant_chunks = []
-    
+    def _record_success(self, seconds: float, probe: bool) -> None:
+        if probe:
+            # 느린 표본(예산만큼 기록된 초과 포함)이 창을 채운 상태에서는 빠른 표본 하나로 p95가 내려오지 않는다.
+            # probe가 예산 안에 돌아왔으면 업스트림이 회복된 것으로 보고 prior부터 다시 모은다.
+            self.count("probe_recovered")
+            self.latency.reset()
+        self.latency.record(seconds)
+
+    def _complete(
+        self,
+        backend: LLMBackend,
+        priority: int,
+        request: Dict,
+        deadline: Optional[Deadline],
+        probe: bool = False,
+    ) -> Completion:
+        started = time.monotonic()
+        if deadline is None and not self.hedge_after:
+            result = self._call(backend, priority, request, self.queue_timeout + request.get("timeout", 30.0))
+            self._record_success(time.monotonic() - started, probe)
+            return result
+
+        budget = remaining_or(deadline, self.queue_timeout + request.get("timeout", 30.0))
+        ends_at = time.monotonic() + budget
+        first = self._executor.submit(self._call, backend, priority, request, budget)
+        pending = {first}
+        if self.hedge_after and budget > self.hedge_after:
+            done, _ = wait(pending, timeout=self.hedge_after)
+            if not done:
+                self.count("hedged")
+                pending.add(self._executor.submit(self._call, backend, priority, request, ends_at - time.monotonic()))
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, ends_at - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        self.count("hedge_wins")
+                    # hedge까지 포함한 실제 응답 시간 - 건너뛰기 판단(p95)의 기준
+                    self._record_success(time.monotonic() - started, probe)
+                    return future.result()
+                error = future.exception()
+        if pending:
+            # 늦은 호출은 백그라운드에서 끝나게 두고 지금은 포기한다 (지연 통계에는 예산만큼으로 기록)
+            self.count("deadline_exceeded")
+            self.latency.record(budget)
+            raise DeadlineExceeded(f"LLM 응답이 {budget:.1f}s 안에 오지 않음")
+        raise error
+
+    def _call(self, backend: LLMBackend, priority: int, request: Dict, budget: float) -> Completion:
+        ends_at = time.monotonic() + budget
+        with self.limiter.slot(priority, timeout=min(self.queue_timeout, budget)) as waited:
+            if not self.bucket.acquire(timeout=max(0.0, min(self.queue_timeout, budget) - waited)):
+                raise QueueTimeout("LLM 호출 속도 제한 대기 초과")
+            timeout = ends_at - time.monotonic()
+            request_timeout = request.get("timeout", 30.0)
+            try:
+                return backend.generate(
+                    **{**request, "timeout": max(0.1, min(request_timeout, timeout))},
+                    # 예산에 묶인 호출은 백엔드 재시도 없이 한 번만 (재시도는 hedge가 맡는다)
+                    retries=0 if timeout < request_timeout else None,
+                )
+            except BackendRateLimited as e:
+                self.count("rate_limited")
+                self.bucket.penalize(e.retry_after if e.retry_after is not None else 2.0)
+                raise
+
+    def search_chunks(self, query: str, history: Transcript, deadline: Optional[Deadline], reserve: float) -> List[str]:
+        """RAG 검색. deadline이 있으면 LLM 몫(reserve)을 남기고 그 안에서만 기다린다."""
+        started = time.monotonic()
+        if deadline is None:
+            chunks = search_relevant_chunks(query, history, n_results=5)
+        else:
+            budget = min(float(os.getenv("RAG_TIMEOUT_SECONDS", "1.5")), deadline.remaining() - reserve)
+            if budget <= 0:
+                self.count("rag_skipped_budget")
+                return []
+            future = self._executor.submit(search_relevant_chunks, query, history, 5)
+            try:
+                chunks = future.result(timeout=budget)
+            except FutureTimeout:
+                self.count("rag_timeouts")
+                self.rag_latency.record(budget)
+                log("[WARN]", f"RAG 검색 {budget:.1f}s 초과, 매뉴얼 없이 진행")
+                return []
+        self.rag_latency.record(time.monotonic() - started)
+        return chunks
+
+    def stats(self) -> Dict:
+        with self._counts_lock:
+            counts = dict(self._counts)
+        return {
+            **self.limiter.snapshot(),
+            "coalesced": self.coalescer.coalesced,
+            "in_flight": self.coalescer.in_flight(),
+            "llm_latency": self.latency.snapshot(),
+            "rag_latency": self.rag_latency.snapshot(),
+            **counts,
+        }
+
+
+_gate: Optional[_LLMGate] = None
+_gate_lock = threading.Lock()
+
+
+def get_llm_gate() -> _LLMGate:
+    global _gate
+    if _gate is None:
+        with _gate_lock:
+            if _gate is None:
+                _gate = _LLMGate()
+    return _gate
+
+
+def build_messages(
+    history: Transcript,
+    message: str,
+    ctx: TurnContext,
+    relevant_chunks: List[str],
+) -> List[Dict[str, str]]:
+    """시스템 프롬프트 + 매뉴얼 청크 + 히스토리 + 대화 흐름 요약으로 LLM 메시지 목록 구성"""
     # RAG 결과를 우선 참고하도록 프롬프트 구성
     if relevant_chunks:
         # 매뉴얼 내용을 별도 메시지로 추가하여 우선 참고하도록 함
@@ -245,15 +414,15 @@ def generate_reply(history: List[ChatTurn], message: str) -> Optional[str]:
     # 대화 히스토리 추가 (전체 히스토리 포함 - 대화 흐름 유지)
     # 최근 20턴까지 포함하여 대화 맥락을 충분히 반영
     role_map = {"ai": "assistant", "user": "user"}
-    for turn in history[-20:]:
-        messages.append({"role": role_map.get(turn.role, "user"), "content": turn.content})
+    for role, content in history.tail(20):
+        messages.append({"role": role_map.get(role, "user"), "content": content})
     messages.append({"role": "user", "content": message})
     
     # 마지막에 대화 맥락 요약 추가 (반복 방지 + RAG 활용 강조 + 대화 흐름 유지)
     if len(history) > 2:
         # 전체 대화 맥락 파악
-        all_user_messages = [turn.content for turn in history if turn.role == "user"]
-        all_ai_messages = [turn.content for turn in history if turn.role == "ai"]
+        all_user_messages = ctx.user_texts
+        all_ai_messages = ctx.ai_texts
         recent_user_messages = all_user_messages[-5:]
         recent_ai_messages = all_ai_messages[-5:]
         
@@ -321,16 +490,100 @@ def generate_reply(history: List[ChatTurn], message: str) -> Optional[str]:
                           f"11. ⚠️ 매우 중요: 자살 위험 신호('자살하고 싶어', '죽고 싶어')가 있을 때는 절대 일반적 응답을 사용하지 않는다."
             })
 
+    return messages
+
+
+def generate_reply(
+    history: Union[Transcript, List[ChatTurn]],
+    message: str,
+    ctx: Optional[TurnContext] = None,
+    priority: int = 0,
+    deadline: Optional[Deadline] = None,
+) -> Optional[str]:
+    """
+    priority: 대기열 우선순위 (위험 점수). 호출이 몰리면 높은 세션부터 처리된다.
+    deadline: 요청 전체 시간 예산. RAG/LLM은 남은 시간 안에서만 기다리고,
+              남은 시간이 LLM p95보다 짧으면 호출하지 않고 None (규칙 응답 사용)
+    """
+    backend = get_backend()
+    if backend is None:
+        return None
+    if ctx is None:
+        ctx = build_turn_context(history, message)
+    history = ctx.history
+
+    # 비위기 짧은 메시지는 캐시된 응답 변형을 돌려쓴다 (RAG 검색/LLM 호출 생략)
+    cache = get_reply_cache()
+    cache_key = cache.key_for(ctx, backend.label) if cache else None
+    if cache_key:
+        cached = cache.get(cache_key, ctx.recent_ai(3))
+        REPLY_CACHE.inc(result="hit" if cached else "miss")
+        if cached:
+            return cached
+    elif cache:
+        REPLY_CACHE.inc(result="bypass")
+
+    gate = get_llm_gate()
+    admission = gate.admit(deadline)
+    if admission is None:
+        LLM_CALLS.inc(result="skipped")
+        log("[WARN]", f"남은 시간 {deadline.remaining():.1f}s < LLM p95, 규칙 응답 사용")
+        return None
+    
+    # RAG: 관련 매뉴얼 청크 검색 (우선 참고) - 더 많은 결과 검색
+    # RAG 검색 실패 시에도 대화는 계속 진행
+    relevant_chunks = []
+    # RAG는 선택 기능 (chromadb가 없거나 RAG_ENABLED=0이면 매뉴얼 없이 진행)
+    if rag_enabled():
+        try:
+            # 대화 히스토리와 현재 메시지를 모두 고려하여 검색
+            search_query = message
+            if history:
+                recent_context = " ".join(ctx.recent_user(3))
+                search_query = recent_context + " " + message
+            # 3개 → 5개로 증가, deadline이 있으면 LLM p95만큼은 남겨두고 검색
+            with span("retrieval"):
+                relevant_chunks = gate.search_chunks(search_query, history, deadline, reserve=gate.latency.p95())
+            RAG_SEARCHES.inc(result="hit" if relevant_chunks else "miss")
+            RAG_CHUNKS.inc(len(relevant_chunks))
+            log("[RAG]", f"검색 결과: {len(relevant_chunks)}개 청크 발견")
+        except Exception as e:
+            RAG_SEARCHES.inc(result="error")
+            log("⚠️", f"RAG 검색 중 예외 발생 (계속 진행): {e}")
+            relevant_chunks = []
+    
+    prompt_started = time.perf_counter()
+    messages = build_messages(history, message, ctx, relevant_chunks)
+    observe_stage("prompt_build", prompt_started)
+
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.7,  # 다양성 증가
-            max_tokens=250,  # 토큰 증가
-            timeout=30.0,  # 타임아웃 설정
-        )
-        return response.choices[0].message.content.strip()
+        # 처음 판단을 그대로 쓴다 - probe는 다시 따지지 않고, 보통 호출만 RAG로 줄어든 시간을 다시 본다
+        if admission == "call" and deadline is not None and not deadline.covers(gate.latency.p95()):
+            gate.count("skipped_budget")
+            LLM_CALLS.inc(result="skipped")
+            log("[WARN]", f"RAG 이후 남은 시간 {deadline.remaining():.1f}s < LLM p95, 규칙 응답 사용")
+            return None
+        with span("llm"):
+            completion = gate.complete(
+                backend,
+                priority,
+                deadline=deadline,
+                probe=admission == "probe",
+                messages=messages,
+                temperature=0.7,  # 다양성 증가
+                max_tokens=250,  # 토큰 증가
+                timeout=30.0,  # 타임아웃 설정
+            )
+        LLM_CALLS.inc(result="ok")
+        if cache_key and completion.text:
+            cache.put(cache_key, completion.text, tokens=completion.tokens)
+        return completion.text
+    except (QueueTimeout, DeadlineExceeded) as e:
+        LLM_CALLS.inc(result="timeout")
+        log("[WARN]", f"LLM 시간 초과, 규칙 응답 사용: {e}")
+        return None
     except Exception as e:
-        # OpenAI API 호출 실패 시 None 반환 (기본 응답 사용)
-        print(f"⚠️ OpenAI API 호출 실패: {e}")
+        # LLM 호출 실패 시 None 반환 (기본 응답 사용)
+        LLM_CALLS.inc(result="error")
+        log("⚠️", f"LLM 호출 실패 ({backend.name}): {e}")
         return None
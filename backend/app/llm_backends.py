@@ -0,0 +1,329 @@
+"""
+LLM 백엔드 인터페이스
+generate_reply는 어떤 모델 서버를 쓰는지 모르고 LLMBackend만 부른다.
+
+- openai: OpenAI API (기존 동작, OPENAI_API_KEY 필요)
+- local:  OpenAI 호환 HTTP 서버 (llama.cpp server, vLLM 등 학교 내부 서버). openai 패키지 없이 동작
+- fake:   결정적인 가짜 응답 (테스트/부하 테스트용, 네트워크/토큰 사용 없음)
+
+환경 변수:
+    LLM_BACKEND                 openai | local | fake (기본 openai)
+    OPENAI_API_KEY, OPENAI_MODEL
+    LLM_LOCAL_URL               local 서버 주소 (기본 http://127.0.0.1:8080/v1)
+    LLM_LOCAL_MODEL             local 모델 이름 (기본 local)
+    LLM_LOCAL_API_KEY           local 서버가 키를 요구하면
+    LLM_FAKE_LATENCY_SECONDS    fake 응답 지연 (기본 0)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence
+
+Messages = List[Dict[str, str]]
+
+
+@dataclass
+class Completion:
+    text: str
+    tokens: int = 0
+
+
+class BackendRateLimited(Exception):
+    """백엔드가 429를 돌려줌 (retry_after: 서버가 알려준 대기 시간)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class LLMBackend:
+    """생성 백엔드 공통 인터페이스"""
+
+    name = "backend"
+    model = ""
+
+    def generate(
+        self,
+        messages: Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 250,
+        timeout: float = 30.0,
+        retries: Optional[int] = None,
+    ) -> Completion:
+        """retries: None이면 백엔드 기본값, 0이면 재시도 없이 한 번만"""
+        raise NotImplementedError
+
+    def stream(
+        self,
+        messages: Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 250,
+        timeout: float = 30.0,
+    ) -> Iterator[str]:
+        """응답 조각을 순서대로 낸다. 기본 구현은 generate 결과를 한 번에 낸다."""
+        yield self.generate(messages, temperature=temperature, max_tokens=max_tokens, timeout=timeout).text
+
+    def batch(self, requests: Sequence[Messages], max_workers: int = 4, **options) -> List[Optional[Completion]]:
+        """여러 요청을 동시에 처리. 실패한 요청은 None."""
+
+        def run(messages: Messages) -> Optional[Completion]:
+            try:
+                return self.generate(messages, **options)
+            except Exception as e:
+                print(f"[WARN] {self.name} batch 요청 실패: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            return list(pool.map(run, requests))
+
+    @property
+    def label(self) -> str:
+        """캐시/합치기 키에 쓰는 백엔드 식별자"""
+        return f"{self.name}:{self.model}"
+
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str, base_url: Optional[str] = None) -> None:
+        from openai import OpenAI
+
+        self.model = model
+        # base_url이 None이면 SDK가 OPENAI_BASE_URL을 읽는다
+        self._client = OpenAI(api_key=api_key, base_url=base_url)
+
+    def generate(
+        self,
+        messages: Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 250,
+        timeout: float = 30.0,
+        retries: Optional[int] = None,
+    ) -> Completion:
+        from openai import RateLimitError
+
+        client = self._client if retries is None else self._client.with_options(max_retries=retries)
+        try:
+            response = client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+            )
+        except RateLimitError as e:
+            headers = e.response.headers if e.response is not None else {}
+            raise BackendRateLimited(str(e), _parse_retry_after(headers.get("retry-after"))) from e
+        usage = getattr(response, "usage", None)
+        return Completion(response.choices[0].message.content.strip(), getattr(usage, "total_tokens", 0) or 0)
+
+    def stream(
+        self,
+        messages: Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 250,
+        timeout: float = 30.0,
+    ) -> Iterator[str]:
+        response = self._client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            stream=True,
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class LocalHTTPBackend(LLMBackend):
+    """
+    OpenAI 호환 /chat/completions 서버 (llama.cpp server, vLLM, Ollama 등)
+    학교 내부망 배포에서 openai 패키지 없이 쓰도록 표준 라이브러리 HTTP만 사용한다.
+    """
+
+    name = "local"
+
+    def __init__(self, base_url: str, model: str, api_key: Optional[str] = None, max_retries: int = 1) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.max_retries = max_retries
+
+    def _request(self, body: Dict, timeout: float):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(
+            f"{self.base_url}/chat/completions",
+            data=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+            headers=headers,
+            method="POST",
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise BackendRateLimited(f"{self.base_url} 429", _parse_retry_after(e.headers.get("Retry-After"))) from e
+            raise
+
+    def generate(
+        self,
+        messages: Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 250,
+        timeout: float = 30.0,
+        retries: Optional[int] = None,
+    ) -> Completion:
+        body = {"model": self.model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+        attempts = 1 + (self.max_retries if retries is None else retries)
+        ends_at = time.monotonic() + timeout
+        for attempt in range(attempts):
+            try:
+                with self._request(body, max(0.1, ends_at - time.monotonic())) as response:
+                    data = json.loads(response.read().decode("utf-8"))
+                break
+            except (urllib.error.URLError, TimeoutError, ConnectionError):
+                # 연결 실패/타임아웃만 재시도 (429는 호출 쪽 속도 제한이 처리)
+                if attempt == attempts - 1 or time.monotonic() >= ends_at:
+                    raise
+        text = data["choices"][0]["message"]["content"] or ""
+        return Completion(text.strip(), int((data.get("usage") or {}).get("total_tokens") or 0))
+
+    def stream(
+        self,
+        messages: Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 250,
+        timeout: float = 30.0,
+    ) -> Iterator[str]:
+        body = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        with self._request(body, timeout) as response:
+            for raw in response:
+                line = raw.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                choices = json.loads(payload).get("choices") or [{}]
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    yield content
+
+
+FAKE_REPLIES = [
+    "그랬구나. 조금 더 얘기해줄래?",
+    "말해줘서 고마워. 그때 기분이 어땠어?",
+    "응, 듣고 있어. 요즘 제일 신경 쓰이는 게 뭐야?",
+    "그럴 수 있지. 오늘은 어떤 하루였어?",
+]
+
+
+class FakeBackend(LLMBackend):
+    """
+    결정적인 가짜 백엔드 - 같은 대화에는 항상 같은 응답
+    토큰 수는 메시지 글자 수로 대충 흉내 낸다.
+    """
+
+    name = "fake"
+    model = "fake"
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+
+    def generate(
+        self,
+        messages: Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 250,
+        timeout: float = 30.0,
+        retries: Optional[int] = None,
+    ) -> Completion:
+        if self.latency:
+            time.sleep(min(self.latency, timeout))
+        last_user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        digest = hashlib.sha1(last_user.encode("utf-8")).digest()
+        text = FAKE_REPLIES[digest[0] % len(FAKE_REPLIES)]
+        prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        return Completion(text, prompt_chars // 2 + len(text))
+
+    def stream(
+        self,
+        messages: Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 250,
+        timeout: float = 30.0,
+    ) -> Iterator[str]:
+        for word in self.generate(messages, timeout=timeout).text.split(" "):
+            yield word + " "
+
+
+_backends: Dict[tuple, LLMBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def _backend_config() -> Optional[tuple]:
+    kind = os.getenv("LLM_BACKEND", "openai").lower()
+    if kind == "openai":
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            return None
+        return ("openai", api_key, os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+    if kind == "local":
+        return (
+            "local",
+            os.getenv("LLM_LOCAL_URL", "http://127.0.0.1:8080/v1"),
+            os.getenv("LLM_LOCAL_MODEL", "local"),
+            os.getenv("LLM_LOCAL_API_KEY"),
+        )
+    if kind == "fake":
+        return ("fake", float(os.getenv("LLM_FAKE_LATENCY_SECONDS", "0")))
+    print(f"[WARN] 알 수 없는 LLM_BACKEND={kind}, LLM 없이 규칙 응답만 사용")
+    return None
+
+
+def get_backend() -> Optional[LLMBackend]:
+    """
+    설정된 백엔드 (설정이 같으면 같은 인스턴스를 재사용)
+    OpenAI 키가 없는 등 쓸 수 없으면 None - 호출 쪽은 규칙 응답을 쓴다.
+    """
+    config = _backend_config()
+    if config is None:
+        return None
+    backend = _backends.get(config)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(config)
+            if backend is None:
+                kind = config[0]
+                if kind == "openai":
+                    backend = OpenAIBackend(api_key=config[1], model=config[2])
+                elif kind == "local":
+                    backend = LocalHTTPBackend(base_url=config[1], model=config[2], api_key=config[3])
+                else:
+                    backend = FakeBackend(latency=config[1])
+                _backends[config] = backend
+    return backend
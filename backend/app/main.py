@@ -1,27 +1,61 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from itertools import chain
+from typing import Optional
+
+import time
+
+from fastapi import FastAPI, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 
-from .agent import analyze_message, should_end_conversation, build_report, build_history_analysis, enrich_history_with_analysis
-from .llm import generate_reply
+from .admission import client_key, client_var, get_admission, is_crisis_turn, peek_chat_body
+from .agent import ConversationTracker, analyze_message, should_end_conversation, build_report, build_history_analysis, iter_enriched_history
+from .context import build_turn_context
+from .deadline import Deadline
+from .events import publish_risk_escalation, sse_stream
+from .features import rag_enabled, shadow_enabled
+from .http_cache import RenderCache, cached_json_response, is_racy, render_json
+from .llm import generate_reply, get_llm_gate
+from .metrics import (
+    ADMISSIONS,
+    HTTP_SECONDS,
+    LLM_SHED,
+    REPLIES,
+    GaugeFunc,
+    REGISTRY,
+    log,
+    new_request_id,
+    observe_stage,
+    render_metrics,
+    request_id_var,
+    span,
+)
+from .notify import get_dispatcher, notify_crisis_contact
+from .reply_cache import get_reply_cache
 from .schemas import ChatRequest, ChatResponse, TurnAnalysis
-from .storage import save_conversation, list_conversations, get_conversation
+from .search import search_conversations
+from .sessions import ResyncRequired, resolve as resolve_session
+from .rag import get_db_info
+from .transcript import Transcript
+from .storage import conversation_path, get_conversation, list_conversations, save_conversation, store_version
+from .warmup import readiness, start_warmup
 
-# RAG는 선택적으로 로드
-try:
-    from .rag import get_db_info
-    RAG_AVAILABLE = True
-except ImportError:
-    RAG_AVAILABLE = False
-    def get_db_info():
-        return {"path": "N/A", "collection": "N/A", "chunk_count": 0, "exists": False}
+load_dotenv()
 
 
-load_dotenv()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """시작: RAG/LLM 클라이언트/프롬프트/규칙 예열 (백그라운드, 끝나면 /ready 200), 종료: 알림 전송 스레드 정리"""
+    start_warmup()
+    yield
+    get_dispatcher().stop()
 
-app = FastAPI(title="Emotion Agent API")
+
+app = FastAPI(title="Emotion Agent API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,48 +65,261 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+REGISTRY.register(GaugeFunc("sori_llm_queue_waiting", "LLM 호출 대기 중인 요청 수", lambda: get_llm_gate().limiter.snapshot()["queued"]))
+REGISTRY.register(GaugeFunc("sori_llm_active_calls", "진행 중인 LLM 호출 수", lambda: get_llm_gate().limiter.snapshot()["active"]))
+REGISTRY.register(GaugeFunc("sori_admission_clients", "프로세스 안에서 추적 중인 클라이언트 수", lambda: get_admission().requests.tracked()))
+
+
+@app.middleware("http")
+async def admission(request: Request, call_next):
+    """/api/chat 클라이언트별 요청 예산 - 넘으면 429 (위기 세션/위기 메시지는 통과)"""
+    controller = get_admission()
+    if request.method != "POST" or request.url.path != "/api/chat" or not controller.enabled:
+        return await call_next(request)
+    client = client_key(request)
+    token = client_var.set(client)
+    try:
+        # sqlite 저장소는 파일 잠금을 기다릴 수 있으므로 이벤트 루프 밖에서
+        call = run_in_threadpool if controller.store.shared else _call_now
+        if await call(controller.try_admit, client):
+            ADMISSIONS.inc(decision="admitted")
+        else:
+            message, conversation_id = peek_chat_body(await request.body())
+            if not await call(controller.admit_over_budget, client, message, conversation_id):
+                ADMISSIONS.inc(decision="rejected")
+                retry_after = await call(controller.retry_after, client)
+                return JSONResponse(
+                    {"detail": "요청이 너무 많아요. 잠시 후 다시 시도해주세요.", "retry_after": retry_after},
+                    status_code=429,
+                    headers={"Retry-After": str(retry_after)},
+                )
+            ADMISSIONS.inc(decision="crisis_bypass")
+        return await call_next(request)
+    finally:
+        client_var.reset(token)
+
+
+async def _call_now(fn, *args):
+    return fn(*args)
+
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """요청 ID 부여(X-Request-ID) + 요청 처리 시간 기록"""
+    request_id = new_request_id(request.headers.get("x-request-id"))
+    token = request_id_var.set(request_id)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        # 경로 파라미터가 들어간 실제 URL 대신 라우트 템플릿으로 집계 (라벨 수 제한)
+        route = request.scope.get("route")
+        HTTP_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        )
+        request_id_var.reset(token)
+
+
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
+    """Prometheus 수집 엔드포인트"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 
 @app.get("/health")
 def health() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def ready() -> JSONResponse:
+    """예열 완료 여부 (완료 전에는 503 - 이 응답이 200일 때만 트래픽을 보낸다)"""
+    return JSONResponse(readiness.snapshot(), status_code=200 if readiness.ready else 503)
+
+
 @app.get("/api/rag/info")
 def rag_info() -> dict:
-    """RAG DB 정보 확인"""
-    return get_db_info()
+    """RAG DB 정보 확인 (chromadb를 불러오지 않고 DB 파일에서 읽는다)"""
+    return {**get_db_info(), "enabled": rag_enabled()}
+
+
+def shadow_score(full_user_text: str, analysis: dict) -> None:
+    """위험도 모델 shadow 기록 - 모델 파일이 있을 때만 scoring(numpy)을 불러온다"""
+    if shadow_enabled():
+        from .scoring import shadow_score as submit
+        submit(full_user_text, analysis)
+
+
+# 관리자 조회 렌더링 결과 (저장소 버전이 같으면 파일을 다시 읽지 않음)
+_admin_renders = RenderCache(max_entries=256)
 
 
 @app.get("/api/admin/conversations")
-def get_conversations_list(include_test: bool = False) -> dict:
-    """관리자: 저장된 대화 목록 조회"""
-    conversations = list_conversations(include_test=include_test)
-    return {"conversations": conversations}
+def get_conversations_list(request: Request, include_test: bool = False) -> Response:
+    """관리자: 저장된 대화 목록 조회 (ETag/Last-Modified, 바뀐 게 없으면 304)"""
+    version, last_modified = store_version(include_test)
+    rendered = _admin_renders.get(
+        ("list", include_test),
+        version,
+        lambda: render_json({"conversations": list_conversations(include_test=include_test)}, last_modified),
+        cacheable=not is_racy(last_modified),
+    )
+    return cached_json_response(request, rendered)
 
 
 @app.get("/api/admin/conversations/{filename}")
-def get_conversation_detail(filename: str, is_test: bool = False) -> dict:
-    """관리자: 특정 대화 상세 조회"""
-    conversation = get_conversation(filename, is_test=is_test)
-    if not conversation:
-        from fastapi import HTTPException
+def get_conversation_detail(request: Request, filename: str, is_test: bool = False) -> Response:
+    """관리자: 특정 대화 상세 조회 (파일 stat 기준으로 렌더링 결과/압축 본문 재사용)"""
+    from fastapi import HTTPException
+
+    path = conversation_path(filename, is_test=is_test)
+    try:
+        stat = path.stat() if path else None
+    except FileNotFoundError:
+        stat = None
+    if stat is None:
         raise HTTPException(status_code=404, detail="대화를 찾을 수 없습니다.")
-    return conversation
+
+    def render():
+        conversation = get_conversation(filename, is_test=is_test)
+        return render_json(conversation, stat.st_mtime) if conversation else None
+
+    rendered = _admin_renders.get(
+        ("detail", str(path)),
+        (stat.st_mtime_ns, stat.st_size),
+        render,
+        cacheable=not is_racy(stat.st_mtime),
+    )
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="대화를 찾을 수 없습니다.")
+    return cached_json_response(request, rendered)
+
+
+@app.get("/api/admin/search")
+def search_conversation_list(
+    q: str = Query(..., min_length=1, description="검색어"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    include_test: bool = False,
+) -> dict:
+    """관리자: 저장된 대화 전문 검색 (하이라이트 + 페이지네이션)"""
+    return search_conversations(q, page=page, page_size=page_size, include_test=include_test)
+
+
+@app.get("/api/admin/reply-cache")
+def reply_cache_stats() -> dict:
+    """관리자: LLM 응답 캐시 적중률/절약 토큰"""
+    cache = get_reply_cache()
+    return {"enabled": cache is not None, **(cache.stats() if cache else {})}
+
+
+@app.get("/api/admin/llm-queue")
+def llm_queue_stats() -> dict:
+    """관리자: LLM 호출 대기열 상태 (대기 시간, 합쳐진 호출, 429 횟수)"""
+    return get_llm_gate().stats()
+
+
+@app.get("/api/admin/admission")
+def admission_stats() -> dict:
+    """관리자: 클라이언트별 속도 제한/LLM 생략 현황"""
+    return get_admission().stats()
+
+
+@app.get("/api/admin/events")
+async def admin_events(request: Request, offset: Optional[int] = Query(None, ge=0)) -> StreamingResponse:
+    """
+    관리자: 위험 상승 이벤트 SSE 스트림
+    - offset 또는 Last-Event-ID 헤더가 있으면 그 이후 이벤트부터 재생
+    """
+    if offset is None:
+        last_event_id = request.headers.get("last-event-id")
+        if last_event_id and last_event_id.isdigit():
+            offset = int(last_event_id) + 1
+    return StreamingResponse(
+        sse_stream(offset, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/api/chat", response_model=ChatResponse)
 def chat(payload: ChatRequest) -> ChatResponse:
+    """
+    프로토콜 1: 매 턴 전체 history
+    프로토콜 2: conversation_id + last_seen_turn + 새 메시지 (서버 기록과 어긋나면 409 → 전체 history로 다시)
+    """
+    from fastapi import HTTPException
+
+    try:
+        session = resolve_session(payload)
+    except ResyncRequired as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"resync": True, "conversation_id": e.conversation_id, "server_turn": e.server_turn},
+        )
+    response = _chat(payload, session.history, session.tracker, session.conversation_id)
+    try:
+        response.turn = session.record(response.reply)
+        response.conversation_id = session.conversation_id
+    except Exception as session_error:
+        # 기록에 실패해도 이번 응답은 돌려준다 (다음 요청이 409로 resync)
+        log("[WARN]", f"session record failed: {session_error}")
+    return response
+
+
+def admit_llm(analysis, ctx, conversation_id: Optional[str]) -> Optional[str]:
+    """
+    LLM을 건너뛸 이유 (overload, client_budget) - 위기 세션이면 표시해 두고 항상 None
+    위기 표시는 서버가 정한 대화 id에만 단다. 클라이언트 IP에 달면 같은 학교/NAT 뒤의 모두가 예산을 넘겨도 통과한다.
+    (프로토콜 1은 id가 없어 표시하지 않는다 - 클라이언트가 보낸 history에 위기 말이 있으면 매 턴 위기 턴이다)
+    """
+    controller = get_admission()
+    if not controller.enabled:
+        return None
+    if is_crisis_turn(analysis, ctx):
+        if conversation_id:
+            controller.mark_crisis(conversation_id)
+        return None
+    if controller.is_crisis(conversation_id):
+        return None
+    queued = get_llm_gate().limiter.snapshot()["queued"]
+    return controller.llm_shed_reason(conversation_id or client_var.get(), int(analysis.risk_score), queued)
+
+
+def _chat(
+    payload: ChatRequest,
+    history: Transcript,
+    tracker: ConversationTracker,
+    conversation_id: Optional[str] = None,
+) -> ChatResponse:
+    """
+    history: 클라이언트가 보냈거나 서버 기록으로 맞춘 대화 (분석/LLM/저장이 같은 Transcript를 읽는다)
+    tracker: history의 누적 상태 - 주제, 위험 추이 (종료 리포트용)
+    conversation_id: 프로토콜 2 대화 id (첫 턴에 새로 만든 것 포함, 프로토콜 1이면 None)
+    """
     import traceback
     from fastapi import HTTPException
     from .schemas import DistressLevel, SuicideSignal, NextAction
     
     try:
-        print("[REQ] chat request received")
+        log("[REQ]", "chat request received")
+        # 요청 전체 시간 예산 - LLM/RAG는 이 안에서만 기다리고 넘으면 규칙 응답
+        deadline = Deadline.for_chat()
         # 1. 기본 분석 수행 (에러 발생 시 기본값 사용)
+        # 턴 컨텍스트는 요청당 한 번 만들어서 분석/LLM/종료 판단이 공유
+        ctx = build_turn_context(history, payload.message)
         try:
-            analysis = analyze_message(payload.history, payload.message)
+            with span("analysis"):
+                analysis = analyze_message(history, payload.message, ctx=ctx)
         except Exception as analysis_error:
-            print("[WARN] analysis failed")
+            log("[WARN]", f"analysis failed: {analysis_error}")
             # 기본 분석 객체 생성
             from .agent import Analysis
             from .schemas import DistressLevel, SuicideSignal, NextAction
@@ -84,125 +331,101 @@ def chat(payload: ChatRequest) -> ChatResponse:
                 reply="죄송해요, 잠시 문제가 생겼어요. 다시 말해줄 수 있을까?",
             )
         
+        # 위험도 ML 모델 shadow 기록 (모델이 있을 때만, 응답/조치에는 쓰지 않음)
+        try:
+            shadow_score(
+                " ".join(ctx.user_texts + [payload.message]),
+                {"risk_score": int(analysis.risk_score), "next_action": str(analysis.next_action)},
+            )
+        except Exception as shadow_error:
+            log("[WARN]", f"risk shadow scoring skipped: {shadow_error}")
+
         # 2. LLM 응답 시도 (실패해도 계속 진행)
+        # 위기 세션은 표시만 하고 내리지 않는다. 그 외에는 과부하/클라이언트 LLM 예산을 넘으면 규칙 응답으로
         llm_reply = None
+        shed_reason = None
         try:
-            llm_reply = generate_reply(payload.history, payload.message)
-        except Exception as llm_error:
-            print("[WARN] LLM call failed, using fallback reply")
+            shed_reason = admit_llm(analysis, ctx, conversation_id)
+        except Exception as admission_error:
+            log("[WARN]", f"admission check failed: {admission_error}")
+        if shed_reason:
+            LLM_SHED.inc(reason=shed_reason)
+        else:
+            try:
+                llm_reply = generate_reply(history, payload.message, ctx=ctx, priority=int(analysis.risk_score), deadline=deadline)
+            except Exception as llm_error:
+                log("[WARN]", f"LLM call failed, using fallback reply: {llm_error}")
         
         # 3. 응답 선택 로직
         # ⚠️ 자살 신호가 있거나(중간/높음) 자살 관련 키워드가 포함된 경우에는
         #    규칙 기반 응답(analysis.reply)을 최우선으로 사용하고, LLM 응답은 무시한다.
-        import re
-        suicide_keywords = ["자살", "죽고 싶", "죽고싶", "죽고싶어", "죽을래", "끝내고 싶", "끝내고싶", "살고 싶지", "살고싶지"]
-        msg_no_space = payload.message.replace(" ", "")
-        has_suicide_keyword = any(k.replace(" ", "") in msg_no_space for k in suicide_keywords)
-        
-        # 히스토리에 자살 신호가 있는지 확인
-        recent_user_messages = [turn.content for turn in payload.history[-5:] if turn.role == "user"]
-        recent_user_text = " ".join(recent_user_messages).lower()
-        has_suicide_in_history = any(word in recent_user_text for word in ["자살", "죽고", "죽을", "끝내", "살고 싶지"])
-        
-        # 이름/전화번호 제공 여부 확인
-        phone_pattern = r'\d{10,11}'  # 10-11자리 숫자
-        has_phone_number = bool(re.search(phone_pattern, payload.message))
-        name_pattern = r'[가-힣]{2,4}|[a-zA-Z]{2,10}'  # 한글 2-4자 또는 영문 2-10자
-        has_name = bool(re.search(name_pattern, payload.message))
-        
-        # 이전 AI 응답에서 이름/전화번호 요청 여부 확인
-        recent_ai_messages = [turn.content for turn in payload.history[-3:] if turn.role == "ai"]
-        has_asked_contact_info = any(
-            "이름" in text or "전화번호" in text or "연락처" in text or "전화해줄까" in text
-            for text in recent_ai_messages
-        )
-        
         # 이름/전화번호를 제공한 경우 무조건 규칙 응답 우선 (마무리 메시지)
-        if has_asked_contact_info and (has_phone_number or has_name):
+        contact_handoff = ctx.contact_handoff
+        if contact_handoff:
             reply = analysis.reply
+            reply_source = "rule_priority"
         # 자살 신호가 있으면(현재 메시지 또는 히스토리) 규칙 응답 우선
-        elif analysis.suicide_signal in ("중간", "높음") or has_suicide_keyword or has_suicide_in_history:
+        elif analysis.suicide_signal in ("중간", "높음") or ctx.has_suicide_keyword or ctx.has_suicide_in_history:
             reply = analysis.reply
+            reply_source = "rule_priority"
         else:
             # 그 외의 경우에는 LLM 응답이 있으면 우선 사용
             reply = llm_reply if llm_reply else analysis.reply
+            reply_source = "llm" if llm_reply else ("rule_shed" if shed_reason else "rule_fallback")
+        REPLIES.inc(source=reply_source)
         
         # 대화 종료 여부 확인
         try:
             conversation_end = should_end_conversation(
-                payload.history,
+                history,
                 analysis.risk_score,
                 analysis.emotional_distress,
                 payload.message,
+                ctx=ctx,
             )
         except Exception as end_error:
-            print(f"⚠️ 대화 종료 확인 실패: {end_error}")
+            log("[WARN]", f"conversation end check failed: {end_error}")
             conversation_end = False
 
-        # 전체 대화에 대한 턴별 분석 생성 (JSON 출력용)
-        # 응답 시에는 None으로 설정 (저장 시에만 사용)
+        # 전체 대화에 대한 턴별 분석(history_analysis)은 응답 지연을 막기 위해 요청 경로에서 만들지 않는다.
+        # 저장된 대화에는 오프라인 작업(python -m app.reanalyze)이 채운다.
         history_analysis = None
-        # try:
-        #     history_analysis = build_history_analysis(payload.history, payload.message)
-        # except Exception as history_error:
-        #     print(f"⚠️ 히스토리 분석 생성 실패: {history_error}")
-        #     traceback.print_exc()
         
         end_report = None
         if conversation_end:
             try:
-                end_report = build_report(
-                    payload.history,
-                    analysis.risk_score,
-                    analysis.emotional_distress,
-                    analysis.suicide_signal,
-                )
+                with span("end_report"):
+                    end_report = build_report(
+                        history,
+                        analysis.risk_score,
+                        analysis.emotional_distress,
+                        analysis.suicide_signal,
+                        tracker,
+                    )
             except Exception as report_error:
-                print("[WARN] end report build failed")
+                log("[WARN]", f"end report build failed: {report_error}")
                 end_report = None
 
         # 모든 사용자 발화마다 저장 (요청 단위 저장)
+        saved_filename = None
+        previous_action = None
+        save_started = time.perf_counter()
         try:
-            base_history = [
-                {"role": turn.role, "content": turn.content}
-                for turn in payload.history
-            ]
-            # 연속 중복 발화 제거 (같은 role/content가 연속으로 들어오는 경우)
-            deduped_history = []
-            for item in base_history:
-                if not deduped_history:
-                    deduped_history.append(item)
-                    continue
-                last = deduped_history[-1]
-                if last["role"] == item["role"] and last["content"] == item["content"]:
-                    continue
-                deduped_history.append(item)
-            # 현재 메시지가 이미 히스토리에 포함되어 있으면 중복 추가하지 않음
-            has_current_in_history = (
-                bool(deduped_history)
-                and deduped_history[-1]["role"] == "user"
-                and deduped_history[-1]["content"] == payload.message
+            # 저장할 history를 한 번에 만든다: 연속 중복 제거(현재 메시지가 이미 히스토리 끝에 있거나
+            # 같은 발화가 연속으로 들어온 경우) + 사용자 발화별 분석 + 마지막 AI 응답
+            turns = chain(
+                history.pairs(),
+                (("user", payload.message),) if payload.message else (),
+                (("ai", reply),),
             )
-            # 각 사용자 메시지에 분석 포함
-            final_history = enrich_history_with_analysis(
-                deduped_history,
-                payload.message,
-                include_current=not has_current_in_history,
-            )
-            # 마지막 AI 응답 추가
-            final_history.append({"role": "ai", "content": reply})
-
-            # 최종 히스토리 연속 중복 제거 (저장 직전 안전장치)
-            deduped_final = []
-            for item in final_history:
-                if not deduped_final:
-                    deduped_final.append(item)
-                    continue
-                last = deduped_final[-1]
-                if last.get("role") == item.get("role") and last.get("content") == item.get("content"):
-                    continue
-                deduped_final.append(item)
-            final_history = deduped_final
+            final_history = []
+            last_action = None
+            for item in iter_enriched_history(turns):
+                turn_analysis = item.get("analysis")
+                if turn_analysis:
+                    # 직전 사용자 턴의 다음 조치 (위험 상승 알림 판단용)
+                    previous_action, last_action = last_action, turn_analysis.get("next_action")
+                final_history.append(item)
 
             # end_report를 딕셔너리로 변환 (Pydantic v1/v2 호환)
             try:
@@ -210,7 +433,7 @@ def chat(payload: ChatRequest) -> ChatResponse:
             except Exception:
                 end_report_dict = None
 
-            save_conversation(
+            saved_filename = save_conversation(
                 history=final_history,
                 analysis={
                     "emotional_distress": str(analysis.emotional_distress),
@@ -222,7 +445,43 @@ def chat(payload: ChatRequest) -> ChatResponse:
                 is_test=payload.is_admin,  # 관리자 모드면 테스트로 저장
             )
         except Exception as save_error:
-            print("[WARN] conversation save failed")
+            log("[WARN]", f"conversation save failed: {save_error}")
+        observe_stage("save", save_started)
+
+        # 위험 단계 상승 시 관리자 대시보드로 실시간 알림
+        try:
+            publish_risk_escalation(
+                previous_action,
+                {
+                    "emotional_distress": str(analysis.emotional_distress),
+                    "suicide_signal": str(analysis.suicide_signal),
+                    "risk_score": int(analysis.risk_score),
+                    "next_action": str(analysis.next_action),
+                },
+                filename=saved_filename,
+                is_test=payload.is_admin,
+            )
+        except Exception:
+            log("[WARN]", "risk escalation event publish failed")
+
+        # "지금 바로 연락을 취할게" 응답에 맞춰 실제 외부 알림 적재 (전송은 백그라운드)
+        if contact_handoff:
+            try:
+                notify_crisis_contact(
+                    ctx.user_texts,
+                    payload.message,
+                    {
+                        "suicide_signal": str(analysis.suicide_signal),
+                        "risk_score": int(analysis.risk_score),
+                        "next_action": str(analysis.next_action),
+                    },
+                    contact=ctx.contact,
+                    filename=saved_filename,
+                    is_test=payload.is_admin,
+                    conversation_id=conversation_id,
+                )
+            except Exception:
+                log("[WARN]", "crisis notification enqueue failed")
         
         # 안전하게 ChatResponse 생성
         try:
@@ -237,7 +496,7 @@ def chat(payload: ChatRequest) -> ChatResponse:
                 history_analysis=history_analysis,
             )
         except Exception as response_error:
-            print("[WARN] ChatResponse build failed")
+            log("[WARN]", f"ChatResponse build failed: {response_error}")
             # 최소한의 응답이라도 반환
             return ChatResponse(
                 reply="죄송해요, 잠시 문제가 생겼어요. 다시 말해줄 수 있을까?",
@@ -255,12 +514,12 @@ def chat(payload: ChatRequest) -> ChatResponse:
         raise
     except Exception as e:
         # 예상치 못한 에러는 상세 정보와 함께 반환
-        print("[ERR] chat API error")
+        log("[ERR]", f"chat API error: {e}")
         
         # 클라이언트에는 간단한 메시지만 전달하되, 로그에는 상세 정보 기록
         try:
             # 최소한의 응답이라도 반환 시도
-            analysis = analyze_message(payload.history, payload.message)
+            analysis = analyze_message(history, payload.message)
             return ChatResponse(
                 reply=analysis.reply,
                 emotional_distress=analysis.emotional_distress,
@@ -271,7 +530,7 @@ def chat(payload: ChatRequest) -> ChatResponse:
                 end_report=None
             )
         except Exception as fallback_error:
-            print("[ERR] fallback failed")
+            log("[ERR]", f"fallback failed: {fallback_error}")
             # 마지막 수단: 기본 응답
             return ChatResponse(
                 reply="죄송해요, 잠시 문제가 생겼어요. 다시 말해줄 수 있을까?",
@@ -0,0 +1,245 @@
+"""
+단계별 지연 측정과 Prometheus /metrics
+prometheus_client 없이 텍스트 노출 형식(0.0.4)을 직접 만든다 (추가 의존성 없음).
+
+- span("analysis") 같은 구간 측정 → sori_stage_seconds 히스토그램
+  - OpenTelemetry API가 설치되어 있고 OTEL_ENABLED=1이면 같은 구간을 OTel span으로도 남긴다
+    (내보내기 설정은 배포 쪽 SDK/opentelemetry-instrument가 맡는다)
+- 요청 ID: 미들웨어가 X-Request-ID(없으면 새로 생성)를 contextvar에 두고 응답 헤더로 돌려준다
+  log()로 찍는 줄에는 요청 ID가 붙는다
+"""
+from __future__ import annotations
+
+import contextvars
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from opentelemetry import trace as otel_trace
+    OTEL_AVAILABLE = True
+except ImportError:
+    otel_trace = None
+    OTEL_AVAILABLE = False
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    # 외부에서 받은 값은 로그/헤더에 그대로 쓰므로 길이와 문자를 제한한다
+    if incoming and len(incoming) <= 64 and incoming.replace("-", "").replace("_", "").isalnum():
+        return incoming
+    return uuid.uuid4().hex[:16]
+
+
+def log(prefix: str, message: str) -> None:
+    """요청 ID를 붙여서 출력 (예: [WARN] [3f2a...] LLM call failed)"""
+    print(f"{prefix} [{request_id_var.get()}] {message}")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # 키별 [버킷별 개수..., 합계]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 1)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(row)) for key, row in self._values.items())
+        lines = []
+        for key, row in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, (("le", _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class GaugeFunc(_Metric):
+    """노출 시점에 함수를 불러 값을 읽는 게이지 (예: LLM 대기열 길이)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], float]) -> None:
+        super().__init__(name, help_text)
+        self.fn = fn
+
+    def samples(self) -> List[str]:
+        try:
+            return [f"{self.name} {_format_value(self.fn())}"]
+        except Exception:
+            return []
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # 모듈이 다시 로드되어도 같은 이름은 한 번만
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            samples = metric.samples()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "sori_stage_seconds", "채팅 요청 단계별 소요 시간", ("stage",)
+))
+HTTP_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "sori_http_request_seconds", "HTTP 요청 처리 시간", ("method", "route", "status")
+))
+REPLIES: Counter = REGISTRY.register(Counter(
+    "sori_replies_total", "응답 출처별 건수 (llm, rule_priority, rule_fallback, rule_shed)", ("source",)
+))
+LLM_CALLS: Counter = REGISTRY.register(Counter(
+    "sori_llm_calls_total", "LLM 호출 결과별 건수 (ok, error, timeout, skipped)", ("result",)
+))
+RAG_SEARCHES: Counter = REGISTRY.register(Counter(
+    "sori_rag_searches_total", "RAG 검색 결과별 건수 (hit, miss, error)", ("result",)
+))
+RAG_CHUNKS: Counter = REGISTRY.register(Counter(
+    "sori_rag_chunks_total", "RAG 검색으로 찾은 청크 수"
+))
+REPLY_CACHE: Counter = REGISTRY.register(Counter(
+    "sori_reply_cache_total", "LLM 응답 캐시 조회 결과 (hit, miss, bypass)", ("result",)
+))
+ADMISSIONS: Counter = REGISTRY.register(Counter(
+    "sori_admission_total", "채팅 요청 입장 결과 (admitted, rejected, crisis_bypass)", ("decision",)
+))
+LLM_SHED: Counter = REGISTRY.register(Counter(
+    "sori_llm_shed_total", "LLM을 건너뛰고 규칙 응답으로 내린 요청 (overload, client_budget)", ("reason",)
+))
+
+
+def _otel_enabled() -> bool:
+    return OTEL_AVAILABLE and os.getenv("OTEL_ENABLED", "").lower() in ("1", "true", "yes")
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """구간 소요 시간을 sori_stage_seconds{stage}에 기록 (OTel이 켜져 있으면 span도 생성)"""
+    started = time.perf_counter()
+    if _otel_enabled():
+        tracer = otel_trace.get_tracer("sori")
+        with tracer.start_as_current_span(stage) as otel_span:
+            otel_span.set_attribute("sori.request_id", request_id_var.get())
+            try:
+                yield
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        return
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def observe_stage(stage: str, started: float) -> None:
+    """with 블록으로 감싸기 어려운 긴 구간용 (started = time.perf_counter() 값)"""
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
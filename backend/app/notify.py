@@ -0,0 +1,349 @@
+"""
+위기 상황 외부 알림 디스패처
+- 알림은 먼저 디스크 outbox에 기록한 뒤 백그라운드 스레드가 전송한다 (채팅 응답 경로를 막지 않음).
+- 같은 idempotency key는 한 번만 적재된다.
+- 채널(sink)별 속도 제한과 지수 백오프 재시도를 적용한다.
+
+환경 변수:
+    NOTIFY_WEBHOOK_URL        웹훅 URL (POST JSON)
+    NOTIFY_SMTP_HOST          SMTP 서버 (NOTIFY_SMTP_PORT, NOTIFY_SMTP_FROM, NOTIFY_SMTP_TO,
+                              NOTIFY_SMTP_USER, NOTIFY_SMTP_PASSWORD, NOTIFY_SMTP_STARTTLS)
+    NOTIFY_FILE_PATH          JSONL 파일 경로 (다른 채널이 없으면 data/notifications.jsonl 사용)
+    NOTIFY_RATE_PER_MINUTE    채널별 분당 전송 한도 (기본 30)
+    NOTIFY_MAX_ATTEMPTS       최대 전송 시도 횟수 (기본 5)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import smtplib
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .contact import ContactInfo
+from .state import get_state_store
+from .throttle import make_token_bucket
+
+OUTBOX_DIR = Path("data/outbox")
+DEFAULT_FILE_PATH = Path("data/notifications.jsonl")
+POLL_SECONDS = 1.0
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 300.0
+# 여러 워커가 같은 outbox를 처리할 때 한 알림을 한 워커만 보내도록 잡는 선점 기록
+CLAIMS = "notify_claims"
+CLAIM_TTL_SECONDS = 120.0
+
+
+class NotificationSink:
+    """알림 채널 인터페이스: 실패 시 예외를 던진다."""
+
+    name = "sink"
+
+    def send(self, notification: Dict) -> None:
+        raise NotImplementedError
+
+
+class WebhookSink(NotificationSink):
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 5.0) -> None:
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, notification: Dict) -> None:
+        body = json.dumps(notification["payload"], ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(
+            self.url,
+            data=body,
+            method="POST",
+            headers={
+                "Content-Type": "application/json; charset=utf-8",
+                "Idempotency-Key": notification["key"],
+            },
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"webhook status {response.status}")
+
+
+class SmtpSink(NotificationSink):
+    name = "smtp"
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        recipients: List[str],
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = False,
+        timeout: float = 10.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send(self, notification: Dict) -> None:
+        payload = notification["payload"]
+        message = EmailMessage()
+        message["Subject"] = f"[SORI] 위기 알림 - {payload.get('next_action', '')}"
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message["Message-ID"] = f"<{notification['key']}@sori>"
+        message.set_content(json.dumps(payload, ensure_ascii=False, indent=2))
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password or "")
+            smtp.send_message(message)
+
+
+class FileSink(NotificationSink):
+    name = "file"
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+
+    def send(self, notification: Dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(
+            {"key": notification["key"], "sent_at": datetime.now().isoformat(), **notification["payload"]},
+            ensure_ascii=False,
+        )
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def load_sinks_from_env() -> List[NotificationSink]:
+    sinks: List[NotificationSink] = []
+    webhook_url = os.getenv("NOTIFY_WEBHOOK_URL")
+    if webhook_url:
+        sinks.append(WebhookSink(webhook_url))
+    smtp_host = os.getenv("NOTIFY_SMTP_HOST")
+    smtp_to = os.getenv("NOTIFY_SMTP_TO")
+    if smtp_host and smtp_to:
+        sinks.append(SmtpSink(
+            host=smtp_host,
+            port=int(os.getenv("NOTIFY_SMTP_PORT", "25")),
+            sender=os.getenv("NOTIFY_SMTP_FROM", "sori@localhost"),
+            recipients=[addr.strip() for addr in smtp_to.split(",") if addr.strip()],
+            user=os.getenv("NOTIFY_SMTP_USER"),
+            password=os.getenv("NOTIFY_SMTP_PASSWORD"),
+            starttls=os.getenv("NOTIFY_SMTP_STARTTLS", "").lower() in ("1", "true", "yes"),
+        ))
+    file_path = os.getenv("NOTIFY_FILE_PATH")
+    if file_path or not sinks:
+        sinks.append(FileSink(Path(file_path) if file_path else DEFAULT_FILE_PATH))
+    return sinks
+
+
+def make_idempotency_key(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+class NotificationDispatcher:
+    """
+    durable outbox 기반 디스패처
+    outbox/<sink>/{pending,sent,failed}/<key>.json 으로 상태를 관리한다.
+    """
+
+    def __init__(
+        self,
+        sinks: List[NotificationSink],
+        outbox_dir: Path = OUTBOX_DIR,
+        rate_per_minute: float = 30.0,
+        max_attempts: int = 5,
+    ) -> None:
+        self.sinks = {sink.name: sink for sink in sinks}
+        self.outbox_dir = Path(outbox_dir)
+        self.max_attempts = max_attempts
+        self._buckets = {
+            name: make_token_bucket(f"notify:{name}", rate=rate_per_minute / 60.0, capacity=max(1.0, rate_per_minute / 6.0))
+            for name in self.sinks
+        }
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _path(self, sink: str, state: str, key: str) -> Path:
+        return self.outbox_dir / sink / state / f"{key}.json"
+
+    def _write(self, path: Path, notification: Dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 임시 파일 이름을 워커/스레드마다 다르게 - 같은 key를 동시에 쓰는 다른 워커와 겹치지 않게
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(notification, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def enqueue(self, key: str, payload: Dict) -> List[str]:
+        """
+        모든 채널의 outbox에 알림 적재 (이미 있는 key는 건너뜀)
+
+        Returns:
+            새로 적재된 채널 이름 목록
+        """
+        queued = []
+        with self._lock:
+            for name in self.sinks:
+                if any(self._path(name, state, key).exists() for state in ("pending", "sent", "failed")):
+                    continue
+                self._write(self._path(name, "pending", key), {
+                    "key": key,
+                    "sink": name,
+                    "payload": payload,
+                    "attempts": 0,
+                    "next_attempt_at": 0.0,
+                    "created_at": datetime.now().isoformat(),
+                    "last_error": None,
+                })
+                queued.append(name)
+        if queued:
+            self.start()
+            self._wakeup.set()
+        return queued
+
+    def _pending(self) -> List[Path]:
+        return sorted(self.outbox_dir.glob("*/pending/*.json"))
+
+    def process_once(self) -> int:
+        """전송 시점이 된 pending 알림을 한 번씩 처리. 전송 성공 건수를 반환."""
+        sent = 0
+        store = get_state_store()
+        for path in self._pending():
+            # 선점한 뒤에 파일을 읽는다 - 다른 워커가 방금 보냈으면 파일이 없거나 다음 시도 시각이 미래
+            claim = f"{path.parent.parent.name}:{path.stem}"
+            if not store.add(CLAIMS, claim, os.getpid(), ttl=CLAIM_TTL_SECONDS):
+                continue
+            try:
+                if self._process(path):
+                    sent += 1
+            finally:
+                store.delete(CLAIMS, claim)
+        return sent
+
+    def _process(self, path: Path) -> bool:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                notification = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"[WARN] outbox read failed ({path}): {e}")
+            return False
+        if notification.get("next_attempt_at", 0) > time.time():
+            return False
+        name = notification["sink"]
+        sink = self.sinks.get(name)
+        if sink is None:
+            return False
+        if not self._buckets[name].try_acquire():
+            # 속도 제한: 이번 주기에는 이 채널 전송 보류
+            return False
+
+        notification["attempts"] += 1
+        try:
+            sink.send(notification)
+        except Exception as e:
+            notification["last_error"] = str(e)
+            if notification["attempts"] >= self.max_attempts:
+                print(f"[ERR] notification failed permanently ({name}, {notification['key']}): {e}")
+                self._write(self._path(name, "failed", notification["key"]), notification)
+                path.unlink(missing_ok=True)
+            else:
+                delay = min(BACKOFF_BASE_SECONDS * 2 ** (notification["attempts"] - 1), BACKOFF_MAX_SECONDS)
+                notification["next_attempt_at"] = time.time() + delay
+                print(f"[WARN] notification retry in {delay:.0f}s ({name}, {notification['key']}): {e}")
+                self._write(path, notification)
+            return False
+
+        notification["sent_at"] = datetime.now().isoformat()
+        self._write(self._path(name, "sent", notification["key"]), notification)
+        path.unlink(missing_ok=True)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.process_once()
+            except Exception as e:
+                print(f"[ERR] notification dispatcher loop error: {e}")
+            self._wakeup.wait(POLL_SECONDS)
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """백그라운드 전송 스레드 시작 (재시작 시 남아있던 pending도 이어서 전송)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="notify-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+_dispatcher: Optional[NotificationDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = NotificationDispatcher(
+                    load_sinks_from_env(),
+                    rate_per_minute=float(os.getenv("NOTIFY_RATE_PER_MINUTE", "30")),
+                    max_attempts=int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5")),
+                )
+    return _dispatcher
+
+
+def notify_crisis_contact(
+    history_user_texts: List[str],
+    message: str,
+    analysis: Dict,
+    contact: Optional[ContactInfo] = None,
+    filename: Optional[str] = None,
+    is_test: bool = False,
+    conversation_id: Optional[str] = None,
+) -> List[str]:
+    """
+    학생이 이름/연락처를 알려준 위기 상황 알림 적재
+    같은 대화에서 같은 메시지로 재요청되면 idempotency key가 같아 중복 전송되지 않는다.
+    key에는 대화(프로토콜 2 conversation_id, 없으면 저장 파일명)가 들어가므로
+    짧은 위기 대화가 글자까지 같은 다른 학생의 알림이 중복으로 버려지지 않는다.
+    """
+    key = make_idempotency_key(conversation_id or filename or "", *history_user_texts, message)
+    payload = {
+        "type": "crisis_contact",
+        "contact_message": message,
+        "contact_name": contact.name if contact else None,
+        "contact_phone": contact.formatted_phone if contact else None,
+        "risk_score": analysis.get("risk_score"),
+        "suicide_signal": analysis.get("suicide_signal"),
+        "next_action": analysis.get("next_action"),
+        "filename": filename,
+        "is_test": is_test,
+        "created_at": datetime.now().isoformat(),
+    }
+    return get_dispatcher().enqueue(key, payload)
@@ -1,16 +1,18 @@
 """
 RAG (Retrieval-Augmented Generation) 모듈
 학생 자살 위기 대응 매뉴얼을 벡터 DB에 저장하고 검색하는 기능
+
+chromadb는 무거워서(임베딩 모델, onnxruntime 등) 클라이언트를 처음 열 때 import한다.
+이 모듈 자체는 chromadb 없이도 import된다 - 설치/활성 여부는 features.rag_enabled()로 확인.
 """
 from __future__ import annotations
 
 import os
+import sqlite3
+import threading
 from pathlib import Path
 from typing import List, Optional
 
-import chromadb
-from chromadb.config import Settings
-
 # ChromaDB 저장 위치: backend/data/chroma_db
 # 사용자가 직접 확인할 수 있는 위치
 BASE_DIR = Path(__file__).parent.parent
@@ -20,13 +22,36 @@ MANUAL_PATH = BASE_DIR.parent / "docs" / "학생자살위기대응_매뉴얼.txt
 COLLECTION_NAME = "suicide_prevention_manual"
 
 
-def _get_client() -> chromadb.Client:
-    """ChromaDB 클라이언트 생성"""
-    DB_PATH.mkdir(parents=True, exist_ok=True)
-    return chromadb.PersistentClient(
-        path=str(DB_PATH),
-        settings=Settings(anonymized_telemetry=False)
-    )
+_client = None
+_collection = None
+_client_lock = threading.Lock()
+
+
+def _get_client():
+    """ChromaDB 클라이언트 (프로세스에서 한 번만 열고 재사용)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import chromadb
+                from chromadb.config import Settings
+
+                DB_PATH.mkdir(parents=True, exist_ok=True)
+                _client = chromadb.PersistentClient(
+                    path=str(DB_PATH),
+                    settings=Settings(anonymized_telemetry=False)
+                )
+    return _client
+
+
+def _get_collection():
+    """매뉴얼 컬렉션 (없으면 예외 - init_rag_db.py로 먼저 만들어야 함)"""
+    global _collection
+    if _collection is None:
+        with _client_lock:
+            if _collection is None:
+                _collection = _get_client().get_collection(COLLECTION_NAME)
+    return _collection
 
 
 def _chunk_manual() -> List[dict]:
@@ -113,8 +138,10 @@ def init_db() -> bool:
     매뉴얼을 벡터 DB에 저장
     저장 위치: backend/data/chroma_db
     """
+    global _collection
     try:
         client = _get_client()
+        _collection = None
         
         # 기존 컬렉션이 있으면 삭제하고 재생성
         try:
@@ -169,11 +196,9 @@ def search_relevant_chunks(
         관련 청크 텍스트 리스트
     """
     try:
-        client = _get_client()
-        
         # 컬렉션이 존재하는지 확인
         try:
-            collection = client.get_collection(COLLECTION_NAME)
+            collection = _get_collection()
         except Exception:
             # DB가 초기화되지 않았으면 빈 리스트 반환
             return []
@@ -202,17 +227,42 @@ def search_relevant_chunks(
         return []
 
 
+def _count_chunks_sqlite() -> Optional[int]:
+    """
+    chromadb를 import하지 않고 chroma.sqlite3에서 청크 수만 읽는다 (CLI --info, /api/rag/info용)
+    스키마가 다르면 None - 호출 쪽이 chromadb로 다시 센다.
+    """
+    db_file = DB_PATH / "chroma.sqlite3"
+    if not db_file.exists():
+        return 0
+    try:
+        conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+        try:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM embeddings e "
+                "JOIN segments s ON e.segment_id = s.id "
+                "JOIN collections c ON s.collection = c.id "
+                "WHERE c.name = ?",
+                (COLLECTION_NAME,),
+            ).fetchone()
+        finally:
+            conn.close()
+        return int(row[0])
+    except sqlite3.Error:
+        return None
+
+
 def get_db_info() -> dict:
     """DB 정보 반환 (확인용)"""
     try:
-        client = _get_client()
-        collection = client.get_collection(COLLECTION_NAME)
-        count = collection.count()
+        count = _count_chunks_sqlite()
+        if count is None:
+            count = _get_collection().count()
         return {
             "path": str(DB_PATH.absolute()),
             "collection": COLLECTION_NAME,
             "chunk_count": count,
-            "exists": True
+            "exists": count > 0
         }
     except:
         return {
@@ -221,3 +271,13 @@ def get_db_info() -> dict:
             "chunk_count": 0,
             "exists": False
         }
+
+
+def warm_up() -> dict:
+    """
+    서버 시작 시 호출: DB를 열고 합성 쿼리 한 번으로 임베딩 모델까지 올려 둔다
+    (첫 검색에서 모델 로딩 수 초가 실제 요청에 걸리지 않도록)
+    """
+    collection = _get_collection()
+    collection.query(query_texts=["요즘 학교 가기 힘들어"], n_results=1)
+    return {"chunk_count": collection.count()}
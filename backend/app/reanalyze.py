@@ -0,0 +1,226 @@
+"""
+저장된 대화 턴별 분석 채우기
+채팅 요청 경로에서는 느려서 빼둔 build_history_analysis / enrich_history_with_analysis를
+보관된 대화 전체에 대해 별도 프로세스 풀로 돌려 파일에 반영한다.
+
+- 각 사용자 메시지의 analysis 필드(주제/추이 포함)와 대화 단위 history_analysis 목록을 채운다.
+- 처리한 파일은 체크포인트(JSONL)에 "경로 + 반영 후 mtime"으로 기록해서,
+  중간에 멈춰도 다시 실행하면 남은 파일부터 이어간다. (이후 파일이 바뀌면 다시 처리)
+- 진행 상황과 처리량(files/s, turns/s)을 주기적으로 출력한다.
+
+사용법:
+    cd backend
+    python -m app.reanalyze [--include-test] [--workers 4] [--chunk-size 50] [--reset]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set
+
+from .agent import build_history_analysis, enrich_history_with_analysis
+from .schemas import ChatTurn
+from .storage import iter_conversation_files, write_conversation_file
+
+CHECKPOINT_PATH = Path("data/reanalyze_checkpoint.jsonl")
+REPORT_EVERY_SECONDS = 5.0
+
+
+def reanalyze_conversation(data: Dict) -> int:
+    """
+    대화 데이터에 턴별 분석을 채운다 (data를 직접 수정)
+
+    Returns:
+        분석한 사용자 턴 수
+    """
+    history = data.get("history") or []
+    # enrich는 analysis 필드를 새로 계산하므로 기존 값은 넘기지 않는다
+    plain = [{"role": item.get("role"), "content": item.get("content") or ""} for item in history]
+    enriched = enrich_history_with_analysis(plain, "", include_current=False)
+    for item, new in zip(history, enriched):
+        if "analysis" in new:
+            item["analysis"] = new["analysis"]
+
+    turns = [
+        ChatTurn(role=item["role"], content=item["content"])
+        for item in plain
+        if item["role"] in ("user", "ai")
+    ]
+    analyses = build_history_analysis(turns, "")
+    data["history_analysis"] = [analysis.model_dump() for analysis in analyses]
+    return len(analyses)
+
+
+def reanalyze_files(paths: Sequence[str]) -> List[Dict]:
+    """파일 묶음 하나를 처리 (프로세스 풀 작업 단위). 파일마다 결과 dict를 반환."""
+    results = []
+    for path in paths:
+        result = {"path": path, "turns": 0, "mtime": None, "error": None}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            result["turns"] = reanalyze_conversation(data)
+            write_conversation_file(Path(path), data)
+            result["mtime"] = os.stat(path).st_mtime
+        except Exception as e:
+            result["error"] = str(e)
+        results.append(result)
+    return results
+
+
+class Checkpoint:
+    """처리 완료 파일 기록 (JSONL, 부모 프로세스만 쓴다)"""
+
+    def __init__(self, path: Path = CHECKPOINT_PATH) -> None:
+        self.path = Path(path)
+        self.done: Dict[str, float] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.done[entry["path"]] = entry["mtime"]
+                    except (ValueError, KeyError):
+                        # 기록 도중 끊긴 마지막 줄은 무시
+                        continue
+
+    def is_done(self, path: str) -> bool:
+        mtime = self.done.get(path)
+        return mtime is not None and os.path.exists(path) and os.stat(path).st_mtime == mtime
+
+    def record(self, results: Sequence[Dict]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for result in results:
+                if result["error"] is None:
+                    self.done[result["path"]] = result["mtime"]
+                    f.write(json.dumps({"path": result["path"], "mtime": result["mtime"]}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def reset(self) -> None:
+        self.done.clear()
+        self.path.unlink(missing_ok=True)
+
+
+def _chunks(items: Sequence[str], size: int) -> Iterator[List[str]]:
+    for start in range(0, len(items), size):
+        yield list(items[start:start + size])
+
+
+class Progress:
+    def __init__(self, total_files: int, report_every: float) -> None:
+        self.total_files = total_files
+        self.report_every = report_every
+        self.files = 0
+        self.turns = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def update(self, results: Sequence[Dict]) -> None:
+        for result in results:
+            self.files += 1
+            self.turns += result["turns"]
+            if result["error"] is not None:
+                self.errors += 1
+                print(f"[WARN] 재분석 실패 ({result['path']}): {result['error']}")
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_every:
+            self._last_report = now
+            print(f"[INFO] {self.line()}")
+
+    def summary(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "files": self.files,
+            "turns": self.turns,
+            "errors": self.errors,
+            "seconds": round(elapsed, 3),
+            "files_per_second": round(self.files / elapsed, 1) if elapsed else 0.0,
+            "turns_per_second": round(self.turns / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def line(self) -> str:
+        stats = self.summary()
+        remaining = self.total_files - self.files
+        eta = remaining / stats["files_per_second"] if stats["files_per_second"] else 0.0
+        return (
+            f"{self.files}/{self.total_files} files, {self.turns} turns, "
+            f"{stats['files_per_second']} files/s, {stats['turns_per_second']} turns/s, ETA {eta:.0f}s"
+        )
+
+
+def run_reanalysis(
+    include_test: bool = False,
+    workers: int = 1,
+    chunk_size: int = 50,
+    reset: bool = False,
+    checkpoint_path: Path = CHECKPOINT_PATH,
+    report_every: float = REPORT_EVERY_SECONDS,
+) -> Dict:
+    checkpoint = Checkpoint(checkpoint_path)
+    if reset:
+        checkpoint.reset()
+    all_paths = [str(path) for path in iter_conversation_files(include_test)]
+    pending = [path for path in all_paths if not checkpoint.is_done(path)]
+    skipped = len(all_paths) - len(pending)
+    if skipped:
+        print(f"[INFO] checkpoint: {skipped} files already done, {len(pending)} remaining")
+
+    progress = Progress(len(pending), report_every)
+    chunks = _chunks(pending, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            results = reanalyze_files(chunk)
+            checkpoint.record(results)
+            progress.update(results)
+    else:
+        # 제출량을 제한해서 아카이브가 커도 대기 중인 작업이 메모리에 쌓이지 않게 한다
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight: Set[Future] = set()
+            for chunk in chunks:
+                in_flight.add(pool.submit(reanalyze_files, chunk))
+                if len(in_flight) >= workers * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        results = future.result()
+                        checkpoint.record(results)
+                        progress.update(results)
+            for future in in_flight:
+                results = future.result()
+                checkpoint.record(results)
+                progress.update(results)
+
+    return {**progress.summary(), "skipped": skipped}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="저장된 대화에 턴별 분석(history_analysis) 채우기")
+    parser.add_argument("--include-test", action="store_true", help="테스트 대화도 포함")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="프로세스 수 (1이면 단일 프로세스)")
+    parser.add_argument("--chunk-size", type=int, default=50, help="프로세스에 한 번에 넘길 파일 수")
+    parser.add_argument("--reset", action="store_true", help="체크포인트를 지우고 처음부터 다시 처리")
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH, help="체크포인트 파일 경로")
+    args = parser.parse_args(argv)
+
+    result = run_reanalysis(
+        include_test=args.include_test,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        reset=args.reset,
+        checkpoint_path=args.checkpoint,
+    )
+    print(
+        f"[INFO] reanalyzed {result['files']} files / {result['turns']} turns in {result['seconds']}s "
+        f"({result['files_per_second']} files/s, {result['turns_per_second']} turns/s), "
+        f"skipped {result['skipped']}, errors {result['errors']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+LLM 응답 캐시 (비위기 턴 전용)
+"안녕", "심심해", "그냥 힘들어" 같은 짧은 첫마디는 거의 같은 응답을 받으므로
+generate_reply의 OpenAI 호출을 캐시한다.
+
+- 키: 정규화한 메시지 + 대화 맥락 지문(이전 사용자 턴 수 구간, 직전 AI 응답 해시, 모델)
+- 키마다 응답 변형을 여러 개 모은 뒤(그동안은 계속 LLM 호출) 돌아가며 꺼낸다
+  - 최근 AI 응답과 같은 변형은 건너뛰어 같은 말을 반복하지 않는다
+- 변형마다 TTL이 있어 오래된 응답은 다시 채운다
+- 정확히 같은 키가 없으면 같은 지문 안에서 비슷한 메시지(문자 bigram 코사인 유사도)를 찾는다
+  (similarity 함수를 바꿔 끼우면 임베딩 유사도도 쓸 수 있다)
+- 자살/학교폭력 신호나 연락처 대화가 한 번이라도 있으면 캐시를 아예 쓰지 않는다
+- 공유 상태 저장소(state.py)가 여러 워커를 잇는 경우 항목/통계를 거기에 두어 워커끼리 캐시를 나눠 쓴다
+  (변형 순번 갱신은 마지막 쓰기가 이긴다 - 드물게 같은 변형이 연달아 나갈 수 있는 정도)
+
+환경 변수:
+    REPLY_CACHE                 0/false면 비활성
+    REPLY_CACHE_TTL_SECONDS     변형 유효 시간 (기본 3600)
+    REPLY_CACHE_VARIANTS        키당 모을 변형 수 (기본 3)
+    REPLY_CACHE_MAX_MESSAGE     캐시할 메시지 최대 길이 (기본 30자)
+    REPLY_CACHE_SIMILARITY      유사 메시지 매칭 기준 (기본 0.8, 1이면 정확히 같은 키만)
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from .agent import BULLYING_CUES, SUICIDE_HIGH, SUICIDE_MID
+from .context import SUICIDE_HISTORY_WORDS, TurnContext
+from .state import StateStore, get_state_store
+
+MAX_ENTRIES = 5000
+# 공유 저장소에서 지문 하나에 기억할 메시지 수 (유사 메시지 검색 후보)
+MAX_INDEX_MESSAGES = 200
+ENTRIES_NS = "reply_cache"
+INDEX_NS = "reply_cache_index"
+STATS_NS = "reply_cache_stats"
+
+_PUNCTUATION = re.compile(r"[\s.,!?~…·'\"()\[\]]+")
+_REPEATED = re.compile(r"(.)\1{2,}")
+# 대화 맥락에 이 단어가 있으면 캐시하지 않는다 (공백 제거 텍스트 기준)
+# 키워드 목록에 없는 표현도 넓게 잡는다 - 놓치는 것보다 캐시를 덜 쓰는 편이 낫다
+_EXTRA_BYPASS_WORDS = ("죽", "왕따", "학폭", "때리", "때려", "협박", "자해", "다치", "사라지")
+_BYPASS_WORDS = tuple(dict.fromkeys(
+    w.replace(" ", "")
+    for w in SUICIDE_HIGH + SUICIDE_MID + BULLYING_CUES + list(SUICIDE_HISTORY_WORDS) + list(_EXTRA_BYPASS_WORDS)
+))
+
+
+def normalize_message(message: str) -> str:
+    """공백/문장부호 제거, 소문자화, 3번 이상 반복 문자는 2번으로 ("ㅠㅠㅠㅠ" → "ㅠㅠ")"""
+    text = _PUNCTUATION.sub("", message.lower())
+    return _REPEATED.sub(r"\1\1", text)
+
+
+def _turn_bucket(user_turns: int) -> str:
+    if user_turns == 0:
+        return "t0"
+    if user_turns == 1:
+        return "t1"
+    if user_turns <= 3:
+        return "t2-3"
+    return "t4+"
+
+
+def _bigram_vector(text: str) -> Counter:
+    if len(text) < 2:
+        return Counter([text])
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def bigram_cosine(a: str, b: str) -> float:
+    va, vb = _bigram_vector(a), _bigram_vector(b)
+    dot = sum(count * vb[gram] for gram, count in va.items())
+    norm = math.sqrt(sum(c * c for c in va.values())) * math.sqrt(sum(c * c for c in vb.values()))
+    return dot / norm if norm else 0.0
+
+
+@dataclass
+class _Variant:
+    reply: str
+    tokens: int
+    created_at: float
+
+
+@dataclass
+class _Entry:
+    variants: List[_Variant] = field(default_factory=list)
+    cursor: int = 0
+
+
+@dataclass
+class CacheKey:
+    fingerprint: str
+    message: str
+
+    @property
+    def value(self) -> str:
+        return f"{self.fingerprint}|{self.message}"
+
+
+class ReplyCache:
+    def __init__(
+        self,
+        ttl_seconds: float = 3600.0,
+        variants: int = 3,
+        max_message_length: int = 30,
+        similarity_threshold: float = 0.8,
+        similarity: Callable[[str, str], float] = bigram_cosine,
+        max_entries: int = MAX_ENTRIES,
+        store: Optional[StateStore] = None,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.variants = max(1, variants)
+        self.max_message_length = max_message_length
+        self.similarity_threshold = similarity_threshold
+        self.similarity = similarity
+        self.max_entries = max_entries
+        # None이면 프로세스 안 OrderedDict (LRU), 있으면 저장소 TTL로 만료
+        self.store = store
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._by_fingerprint: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        if self.store is not None:
+            self.store.incr(STATS_NS, name, amount)
+        else:
+            self._stats[name] += amount
+
+    # ---- 키/우회 판단 ----
+    def key_for(self, ctx: TurnContext, model: str) -> Optional[CacheKey]:
+        """캐시할 수 없는 턴이면 None (우회 건수로 집계)"""
+        reason = self._bypass_reason(ctx)
+        if reason:
+            with self._lock:
+                self._count("bypassed")
+                self._count(f"bypassed_{reason}")
+            return None
+        last_ai = ctx.ai_texts[-1] if ctx.ai_texts else ""
+        last_ai_hash = hashlib.sha1(normalize_message(last_ai).encode("utf-8")).hexdigest()[:12] if last_ai else "-"
+        fingerprint = f"{model}:{_turn_bucket(len(ctx.user_texts))}:{last_ai_hash}"
+        return CacheKey(fingerprint, normalize_message(ctx.message))
+
+    def _bypass_reason(self, ctx: TurnContext) -> Optional[str]:
+        if any(word in ctx.full_user_text for word in _BYPASS_WORDS):
+            return "risk"
+        if ctx.asked_contact_info or ctx.contact.provided:
+            return "contact"
+        if len(ctx.message) > self.max_message_length or not normalize_message(ctx.message):
+            return "length"
+        return None
+
+    # ---- 조회/저장 ----
+    def _live(self, entry: _Entry, now: float) -> List[_Variant]:
+        entry.variants = [v for v in entry.variants if now - v.created_at < self.ttl_seconds]
+        return entry.variants
+
+    def _candidates(self, fingerprint: str) -> Dict[str, str]:
+        """같은 지문 안의 메시지 → 항목 키"""
+        if self.store is not None:
+            messages = self.store.get(INDEX_NS, fingerprint) or []
+            return {message: f"{fingerprint}|{message}" for message in messages}
+        return self._by_fingerprint.get(fingerprint, {})
+
+    def _find_similar(self, key: CacheKey) -> Optional[str]:
+        if self.similarity_threshold >= 1.0:
+            return None
+        best, best_score = None, self.similarity_threshold
+        for message, value in self._candidates(key.fingerprint).items():
+            score = self.similarity(key.message, message)
+            if score >= best_score:
+                best, best_score = value, score
+        return best
+
+    def _load(self, value: str) -> Optional[_Entry]:
+        if self.store is None:
+            return self._entries.get(value)
+        data = self.store.get(ENTRIES_NS, value)
+        if data is None:
+            return None
+        return _Entry([_Variant(*variant) for variant in data["variants"]], data["cursor"])
+
+    def _save(self, key: CacheKey, value: str, entry: _Entry, is_new: bool) -> None:
+        if self.store is None:
+            if is_new:
+                self._entries[value] = entry
+                self._by_fingerprint.setdefault(key.fingerprint, {})[key.message] = value
+            self._entries.move_to_end(value)
+            while len(self._entries) > self.max_entries:
+                old_value, _ = self._entries.popitem(last=False)
+                fingerprint, _, message = old_value.partition("|")
+                self._by_fingerprint.get(fingerprint, {}).pop(message, None)
+            return
+        data = {"variants": [[v.reply, v.tokens, v.created_at] for v in entry.variants], "cursor": entry.cursor}
+        self.store.set(ENTRIES_NS, value, data, ttl=self.ttl_seconds)
+        if is_new:
+            def add_message(messages):
+                messages = [m for m in (messages or []) if m != key.message] + [key.message]
+                return messages[-MAX_INDEX_MESSAGES:], None
+
+            self.store.update(INDEX_NS, key.fingerprint, add_message, ttl=self.ttl_seconds)
+
+    def get(self, key: CacheKey, recent_ai: List[str]) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            self._count("lookups")
+            value, entry = key.value, self._load(key.value)
+            if entry is None:
+                value = self._find_similar(key)
+                entry = self._load(value) if value else None
+            if entry is None or len(self._live(entry, now)) < self.variants:
+                # 변형이 다 모일 때까지는 LLM을 불러서 채운다
+                self._count("misses")
+                return None
+            for offset in range(len(entry.variants)):
+                variant = entry.variants[(entry.cursor + offset) % len(entry.variants)]
+                if variant.reply not in recent_ai:
+                    entry.cursor = (entry.cursor + offset + 1) % len(entry.variants)
+                    self._save(key, value, entry, is_new=False)
+                    self._count("hits")
+                    if value != key.value:
+                        self._count("similar_hits")
+                    self._count("tokens_saved", variant.tokens)
+                    return variant.reply
+            self._count("misses")
+            return None
+
+    def put(self, key: CacheKey, reply: str, tokens: int = 0) -> None:
+        now = time.time()
+        with self._lock:
+            entry = self._load(key.value)
+            is_new = entry is None
+            if entry is None:
+                entry = _Entry()
+            self._live(entry, now)
+            if reply in (v.reply for v in entry.variants):
+                return
+            entry.variants.append(_Variant(reply, tokens, now))
+            if len(entry.variants) > self.variants:
+                entry.variants.pop(0)
+            self._save(key, key.value, entry, is_new)
+            self._count("stores")
+            self._count("tokens_spent", tokens)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            if self.store is not None:
+                stats = {name: int(value) for name, value in self.store.items(STATS_NS).items()}
+                entries = len(self.store.items(ENTRIES_NS))
+            else:
+                stats = dict(self._stats)
+                entries = len(self._entries)
+        lookups = stats.get("lookups", 0)
+        return {
+            **stats,
+            "entries": entries,
+            "shared": self.store is not None,
+            "hit_rate": round(stats.get("hits", 0) / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_fingerprint.clear()
+            if self.store is not None:
+                for namespace in (ENTRIES_NS, INDEX_NS, STATS_NS):
+                    self.store.clear(namespace)
+
+
+_cache: Optional[ReplyCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_reply_cache() -> Optional[ReplyCache]:
+    """응답 캐시 (REPLY_CACHE=0이면 None)"""
+    global _cache
+    if os.getenv("REPLY_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                store = get_state_store()
+                _cache = ReplyCache(
+                    ttl_seconds=float(os.getenv("REPLY_CACHE_TTL_SECONDS", "3600")),
+                    variants=int(os.getenv("REPLY_CACHE_VARIANTS", "3")),
+                    max_message_length=int(os.getenv("REPLY_CACHE_MAX_MESSAGE", "30")),
+                    similarity_threshold=float(os.getenv("REPLY_CACHE_SIMILARITY", "0.8")),
+                    # 워커가 여러 개면 캐시도 워커끼리 나눠 쓴다
+                    store=store if store.shared else None,
+                )
+    return _cache
@@ -0,0 +1,318 @@
+"""
+데이터 기반 응답 규칙 엔진
+reply_rules.json에 선언된 규칙(조건 → 응답 템플릿)을 결정 트리로 컴파일해서 평가한다.
+
+- 조건은 TurnContext에서 계산되는 feature 이름으로 적는다 ("!" 접두사는 부정).
+- feature 값은 평가 1회 안에서 한 번만 계산되고, 규칙 안의 조건은 계산 비용이 낮은 순으로 평가된다.
+- group 노드의 조건이 거짓이면 하위 규칙은 아예 평가하지 않는다.
+- 규칙 파일이 바뀌면 재시작 없이 다시 컴파일한다 (컴파일 실패 시 기존 규칙 유지).
+
+규칙 파일 형식:
+    {
+      "lists":    {"이름": ["키워드", ...]},                     # "@이름"으로 참조
+      "features": {"이름": {"source": "recent_ai:3", "contains_any": [...] | "@이름"}
+                          | {"any": [조건, ...]} | {"all": [조건, ...]}},
+      "rules":    [{"id": "...", "when": [조건, ...], "reply": "..." | [...], "pick": "...", ...}
+                   | {"id": "...", "when": [...], "rules": [...]}]
+    }
+
+    조건: "feature" | "!feature" | {"feature": "risk_score", "gte": 60 | "lt" | "eq" | "in": [...]}
+    pick: first(기본) | non_repeating | alternate | index(feature 값으로 순환 선택)
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .context import TurnContext
+from .metrics import log
+
+DEFAULT_RULES_PATH = Path(__file__).parent / "reply_rules.json"
+RELOAD_CHECK_SECONDS = 1.0
+
+
+class RuleCompileError(ValueError):
+    pass
+
+
+@dataclass
+class RuleInput:
+    """규칙 평가 1회의 입력과 feature 캐시"""
+    ctx: TurnContext
+    distress: str
+    suicide_signal: str
+    risk_score: int
+    cache: Dict[str, Any] = field(default_factory=dict)
+
+
+FeatureFn = Callable[[RuleInput], Any]
+
+
+# ---- 텍스트 소스 ----
+# (계산 비용, 함수) - 비용은 조건 평가 순서에만 쓰인다.
+def _source(spec: str) -> Tuple[int, Callable[[RuleInput], Sequence[str]]]:
+    name, _, arg = spec.partition(":")
+    if name == "message":
+        return 1, lambda inp: (inp.ctx.normalized,)
+    if name == "message_lower":
+        return 1, lambda inp: (inp.ctx.normalized_lower,)
+    window = int(arg) if arg else 0
+    if window <= 0:
+        raise RuleCompileError(f"source '{spec}' needs a positive window")
+    if name == "recent_user_text":
+        return 2, lambda inp: (inp.ctx.recent_user_text(window),)
+    if name == "recent_ai":
+        return 2, lambda inp: inp.ctx.recent_ai(window)
+    if name == "recent_ai_text":
+        return 2, lambda inp: (" ".join(inp.ctx.recent_ai(window)),)
+    raise RuleCompileError(f"unknown source '{spec}'")
+
+
+@dataclass
+class _Condition:
+    cost: int
+    test: Callable[[RuleInput], bool]
+
+
+@dataclass
+class _Leaf:
+    id: str
+    tests: List[Callable[[RuleInput], Any]]
+    action: Callable[[RuleInput], str]
+
+
+@dataclass
+class _Branch:
+    id: str
+    tests: List[Callable[[RuleInput], Any]]
+    children: List[Any]
+
+
+class _Compiler:
+    def __init__(self, spec: Dict, builtins: Dict[str, Tuple[int, FeatureFn]], lists: Dict[str, Sequence[str]]):
+        self.spec = spec
+        self.lists = {**lists, **{k: tuple(v) for k, v in (spec.get("lists") or {}).items()}}
+        self.features: Dict[str, Tuple[int, FeatureFn]] = dict(builtins)
+        self._pending = dict(spec.get("features") or {})
+        self._resolving: set = set()
+
+    # ---- features ----
+    def _words(self, value: Any) -> Tuple[str, ...]:
+        if isinstance(value, str) and value.startswith("@"):
+            if value[1:] not in self.lists:
+                raise RuleCompileError(f"unknown list '{value}'")
+            return tuple(self.lists[value[1:]])
+        if isinstance(value, list):
+            return tuple(value)
+        raise RuleCompileError(f"expected keyword list, got {value!r}")
+
+    def feature(self, name: str) -> Tuple[int, FeatureFn]:
+        if name in self.features:
+            return self.features[name]
+        if name not in self._pending:
+            raise RuleCompileError(f"unknown feature '{name}'")
+        if name in self._resolving:
+            raise RuleCompileError(f"feature '{name}' is defined recursively")
+        self._resolving.add(name)
+        cost, fn = self._compile_feature(name, self._pending[name])
+        self._resolving.discard(name)
+
+        def cached(inp: RuleInput, _name=name, _fn=fn) -> Any:
+            if _name not in inp.cache:
+                inp.cache[_name] = _fn(inp)
+            return inp.cache[_name]
+
+        self.features[name] = (cost, cached)
+        return self.features[name]
+
+    def _compile_feature(self, name: str, spec: Dict) -> Tuple[int, FeatureFn]:
+        if "any" in spec or "all" in spec:
+            conditions = [self.condition(c) for c in spec.get("any") or spec.get("all")]
+            conditions.sort(key=lambda c: c.cost)
+            cost = max(c.cost for c in conditions)
+            tests = [c.test for c in conditions]
+            if "any" in spec:
+                return cost, lambda inp: any(t(inp) for t in tests)
+            return cost, lambda inp: all(t(inp) for t in tests)
+        if "source" in spec and "contains_any" in spec:
+            cost, source = _source(spec["source"])
+            words = self._words(spec["contains_any"])
+
+            def contains_any(inp: RuleInput) -> bool:
+                for text in source(inp):
+                    for word in words:
+                        if word in text:
+                            return True
+                return False
+
+            return cost, contains_any
+        raise RuleCompileError(f"feature '{name}' has no supported definition")
+
+    # ---- conditions ----
+    def condition(self, spec: Any) -> _Condition:
+        if isinstance(spec, str):
+            negate = spec.startswith("!")
+            cost, fn = self.feature(spec.lstrip("!"))
+            if negate:
+                return _Condition(cost, lambda inp: not fn(inp))
+            return _Condition(cost, fn)
+        if isinstance(spec, dict) and "feature" in spec:
+            cost, fn = self.feature(spec["feature"])
+            if "eq" in spec:
+                expected = spec["eq"]
+                return _Condition(cost, lambda inp: fn(inp) == expected)
+            if "in" in spec:
+                allowed = tuple(spec["in"])
+                return _Condition(cost, lambda inp: fn(inp) in allowed)
+            if "gte" in spec:
+                bound = spec["gte"]
+                return _Condition(cost, lambda inp: fn(inp) >= bound)
+            if "lt" in spec:
+                bound = spec["lt"]
+                return _Condition(cost, lambda inp: fn(inp) < bound)
+        raise RuleCompileError(f"unsupported condition {spec!r}")
+
+    def conditions(self, specs: List[Any]) -> List[_Condition]:
+        compiled = [self.condition(spec) for spec in specs or []]
+        # 조건은 모두 부수효과가 없으므로 싼 것부터 평가해도 결과는 같다.
+        compiled.sort(key=lambda c: c.cost)
+        return compiled
+
+    # ---- actions ----
+    def action(self, rule: Dict) -> Callable[[RuleInput], str]:
+        reply = rule["reply"]
+        candidates = [reply] if isinstance(reply, str) else list(reply)
+        if not candidates:
+            raise RuleCompileError(f"rule '{rule.get('id')}' has no reply")
+        template = bool(rule.get("template"))
+        excludes = [
+            (self.condition(ex["when"]), tuple(ex["containing"]))
+            for ex in rule.get("exclude") or []
+        ]
+        pick = rule.get("pick", "first")
+        _, avoid = _source(rule.get("avoid", "recent_ai:3"))
+        index_feature = self.feature(rule["index"])[1] if pick == "index" else None
+        if pick not in ("first", "non_repeating", "alternate", "index"):
+            raise RuleCompileError(f"rule '{rule.get('id')}' has unknown pick '{pick}'")
+
+        def run(inp: RuleInput) -> str:
+            options = candidates
+            if template:
+                values = {"last_user": inp.ctx.last_user or ""}
+                options = [c.format_map(values) for c in options]
+            for condition, words in excludes:
+                if condition.test(inp):
+                    options = [c for c in options if not any(w in c for w in words)]
+            if pick == "first":
+                return options[0] if options else ""
+            if pick == "index":
+                return options[index_feature(inp) % len(options)] if options else ""
+            recent = avoid(inp)
+            if pick == "alternate":
+                # 바로 전 AI 발화와 같은 문장이면 다음 버전으로 넘긴다.
+                if recent and recent[-1] in options:
+                    return options[(options.index(recent[-1]) + 1) % len(options)]
+                return options[0] if options else ""
+            for candidate in options:
+                if candidate not in recent:
+                    return candidate
+            return options[0] if options else ""
+
+        return run
+
+    # ---- tree ----
+    def node(self, rule: Dict) -> Any:
+        rule_id = rule.get("id", "?")
+        tests = [c.test for c in self.conditions(rule.get("when"))]
+        if "rules" in rule:
+            return _Branch(rule_id, tests, [self.node(child) for child in rule["rules"]])
+        if "reply" not in rule:
+            raise RuleCompileError(f"rule '{rule_id}' needs 'reply' or 'rules'")
+        return _Leaf(rule_id, tests, self.action(rule))
+
+    def compile(self) -> List[Any]:
+        rules = self.spec.get("rules")
+        if not rules:
+            raise RuleCompileError("rule file has no rules")
+        tree = [self.node(rule) for rule in rules]
+        # 사용되지 않은 feature 정의도 오류를 미리 확인
+        for name in list(self._pending):
+            self.feature(name)
+        return tree
+
+
+def _evaluate(nodes: List[Any], inp: RuleInput) -> Optional[Tuple[str, str]]:
+    for node in nodes:
+        for test in node.tests:
+            if not test(inp):
+                break
+        else:
+            if isinstance(node, _Branch):
+                result = _evaluate(node.children, inp)
+                if result is not None:
+                    return result
+                continue
+            return node.id, node.action(inp)
+    return None
+
+
+class ReplyRuleEngine:
+    def __init__(
+        self,
+        path: Path,
+        builtins: Dict[str, Tuple[int, FeatureFn]],
+        lists: Dict[str, Sequence[str]],
+        fallback_reply: str = "",
+    ) -> None:
+        self.path = Path(path)
+        self.builtins = builtins
+        self.lists = lists
+        self.fallback_reply = fallback_reply
+        self._tree: List[Any] = []
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """규칙 파일을 읽어 컴파일 (실패하면 예외)"""
+        mtime = self.path.stat().st_mtime
+        with open(self.path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        tree = _Compiler(spec, self.builtins, self.lists).compile()
+        with self._lock:
+            self._tree = tree
+            self._mtime = mtime
+
+    def maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < RELOAD_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        try:
+            if self.path.stat().st_mtime == self._mtime:
+                return
+            self.load()
+            log("[INFO]", f"reply rules reloaded: {self.path}")
+        except Exception as e:
+            # 잘못된 규칙 파일로 서비스가 멈추지 않도록 기존 규칙 유지
+            log("[WARN]", f"reply rules reload failed, keeping previous rules: {e}")
+            self._mtime = self.path.stat().st_mtime if self.path.exists() else self._mtime
+
+    def evaluate(self, ctx: TurnContext, distress: str, suicide_signal: str, risk_score: int) -> Tuple[str, str]:
+        """(규칙 id, 응답) 반환"""
+        self.maybe_reload()
+        inp = RuleInput(ctx=ctx, distress=distress, suicide_signal=suicide_signal, risk_score=risk_score)
+        result = _evaluate(self._tree, inp)
+        if result is None:
+            return "fallback", self.fallback_reply
+        return result
+
+
+def rules_path() -> Path:
+    return Path(os.getenv("REPLY_RULES_PATH") or DEFAULT_RULES_PATH)
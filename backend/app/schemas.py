@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pydantic import BaseModel, Field
-from typing import List, Literal, Optional
+from typing import Dict, List, Literal, Optional
 
 
 Role = Literal["user", "ai"]
@@ -19,19 +19,53 @@ class ChatRequest(BaseModel):
     history: List[ChatTurn] = Field(default_factory=list)
     message: str
     is_admin: bool = False  # 관리자 모드 여부
+    # 프로토콜 2: 새 메시지만 보내고 서버 기록과 맞춘다 (sessions.py)
+    protocol: int = 1
+    conversation_id: Optional[str] = Field(None, max_length=64)
+    last_seen_turn: Optional[int] = Field(None, ge=0)
+
+
+class TopicStat(BaseModel):
+    topic: str
+    count: int = Field(..., description="주제가 나온 사용자 발화 수")
+    first_turn: int = Field(..., description="처음 나온 턴")
+
+
+class RiskChange(BaseModel):
+    turn: int = Field(..., description="구간이 바뀐 턴")
+    from_action: NextAction
+    to_action: NextAction
+    risk_score: int = Field(..., description="그 발화의 위험 점수")
+
+
+class RiskTrajectoryReport(BaseModel):
+    """사용자 발화별 위험 점수 추이 (발화 하나만 본 점수)"""
+    turns: int = Field(..., description="점수가 매겨진 사용자 발화 수")
+    first_score: int
+    last_score: int
+    peak_score: int
+    peak_turn: int = Field(..., description="가장 위험했던 발화의 턴")
+    slope: float = Field(..., description="발화당 점수 변화 (최소제곱 기울기)")
+    turns_at_or_above: Dict[str, int] = Field(default_factory=dict, description="조치 구간별 그 이상이었던 발화 수")
+    escalation_count: int = 0
+    de_escalation_count: int = 0
+    escalations: List[RiskChange] = Field(default_factory=list, description="구간이 올라간 지점 (최근 것)")
+    de_escalations: List[RiskChange] = Field(default_factory=list, description="구간이 내려간 지점 (최근 것)")
 
 
 class EndReport(BaseModel):
     summary: str = Field(..., description="대화 요약")
     risk_score: int = Field(..., description="최종 위험 점수")
-    trend: str = Field(..., description="상태 추이 (안정화 중 / 주의 필요 / 위험)")
+    trend: str = Field(..., description="상태 추이 (안정화 중 / 관찰 필요 / 악화 중 / 주의 필요 / 위험)")
     next_guidance: str = Field(..., description="다음 대화 시 가이드")
     
     # 추가 정보
     distress_level: DistressLevel = Field(..., description="최종 정서적 고통 수준")
     suicide_signal: SuicideSignal = Field(..., description="최종 자살 신호")
     conversation_turns: int = Field(..., description="대화 턴 수")
-    key_topics: List[str] = Field(default_factory=list, description="주요 주제")
+    key_topics: List[str] = Field(default_factory=list, description="주요 주제 (많이 나온 순)")
+    topics: List[TopicStat] = Field(default_factory=list, description="주제별 언급 횟수/처음 나온 턴 (많이 나온 순)")
+    risk_trajectory: Optional[RiskTrajectoryReport] = Field(None, description="발화별 위험 점수 추이")
 
 
 class TurnAnalysis(BaseModel):
@@ -59,6 +93,10 @@ class ChatResponse(BaseModel):
     conversation_end: bool = Field(..., description="대화 종료 여부")
     end_report: Optional[EndReport] = Field(None, description="대화 종료 시 종합 결과")
 
+    # 프로토콜 2 (다음 요청에 그대로 보낸다)
+    conversation_id: Optional[str] = Field(None, description="대화 ID")
+    turn: Optional[int] = Field(None, description="서버에 기록된 대화 항목 수 (다음 요청의 last_seen_turn)")
+
     # 히스토리 기반 분석 (선택적)
     history_analysis: Optional[List[TurnAnalysis]] = Field(
         None,
@@ -0,0 +1,415 @@
+"""
+위험도 점수기(scorer) 인터페이스와 경량 ML 분류기
+키워드 규칙(_estimate_distress/_estimate_suicide_signal)은 그대로 두고,
+문자 n-gram 로지스틱 회귀 모델을 옆에서 같이 돌려(shadow mode) 두 점수를 기록한다.
+모델 점수는 응답/조치에 쓰이지 않는다.
+
+- 모델: 공백 정리 + 소문자화한 텍스트의 문자 1~3-gram을 해싱한 이진 특성 → 로지스틱 회귀
+- 가중치는 NumPy .npz 파일 하나 (weights, bias, 설정값) - CPU만 사용, 추가 의존성 없음
+- 추론은 여러 문장을 한 번에 처리 (np.add.reduceat)
+- shadow 기록은 백그라운드 스레드가 모아서 배치로 채점하고 JSONL에 남긴다 (채팅 응답 경로를 막지 않음)
+
+환경 변수:
+    RISK_SHADOW_MODEL   모델 경로 (기본 data/models/risk_ngram.npz, 파일이 없으면 shadow 비활성)
+    RISK_SHADOW_LOG     기록 경로 (기본 data/shadow_scores.jsonl)
+    RISK_SHADOW         0/false면 shadow 비활성
+
+학습:
+    cd backend
+    python -m app.scoring train [--include-test] [--labels labels.jsonl] [--out data/models/risk_ngram.npz]
+    python -m app.scoring eval  [--include-test] [--model data/models/risk_ngram.npz]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .agent import _estimate_distress, _estimate_risk_score, _estimate_suicide_signal
+from .features import SHADOW_MODEL_PATH, flag, shadow_model_path
+
+DEFAULT_MODEL_PATH = SHADOW_MODEL_PATH
+DEFAULT_SHADOW_LOG = Path("data/shadow_scores.jsonl")
+HIGH_RISK_SCORE = 60  # 전담자연계 이상을 "고위험"으로 본다
+SHADOW_BATCH_SIZE = 32
+SHADOW_QUEUE_SIZE = 1000
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RiskScorer:
+    """위험도 점수기 인터페이스: 대화 누적 사용자 텍스트 → 고위험 확률(0~1)"""
+
+    name = "scorer"
+    threshold = 0.5  # 이 값 이상이면 고위험으로 판정
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def score(self, text: str) -> float:
+        return float(self.score_batch([text])[0])
+
+
+class RuleScorer(RiskScorer):
+    """기존 키워드 규칙 (위험 점수 / 100)"""
+
+    name = "rules"
+    threshold = HIGH_RISK_SCORE / 100.0
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        scores = []
+        for text in texts:
+            normalized = text.replace(" ", "")
+            distress = _estimate_distress(normalized)
+            scores.append(_estimate_risk_score(distress, _estimate_suicide_signal(normalized)) / 100.0)
+        return np.array(scores, dtype=np.float32)
+
+
+def normalize_text(text: str) -> str:
+    # 부정 표현("안 죽어")을 잡을 수 있게 공백은 지우지 않고 하나로만 줄인다
+    return _WHITESPACE.sub(" ", text.strip().lower())
+
+
+@lru_cache(maxsize=1 << 18)
+def _hash_ngram(ngram: str, n_features: int) -> int:
+    return zlib.crc32(ngram.encode("utf-8")) & (n_features - 1)
+
+
+def featurize(text: str, n_features: int, ngram_range: Tuple[int, int]) -> np.ndarray:
+    """문자 n-gram 해시 인덱스 (중복 제거, 이진 특성)"""
+    text = normalize_text(text)
+    low, high = ngram_range
+    indices = {
+        _hash_ngram(text[i:i + n], n_features)
+        for n in range(low, high + 1)
+        for i in range(len(text) - n + 1)
+    }
+    return np.fromiter(indices, dtype=np.int64, count=len(indices))
+
+
+def _pack(features: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """가변 길이 특성 목록 → (이어 붙인 인덱스, 시작 위치, 길이)"""
+    lengths = np.array([len(f) for f in features], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    flat = np.concatenate(features) if len(features) else np.zeros(0, dtype=np.int64)
+    return flat, starts, lengths
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30, 30)))
+
+
+class NgramLogisticScorer(RiskScorer):
+    name = "ngram_lr"
+
+    def __init__(
+        self,
+        weights: np.ndarray,
+        bias: float,
+        ngram_range: Tuple[int, int] = (1, 3),
+        threshold: float = 0.5,
+    ) -> None:
+        self.weights = weights.astype(np.float32)
+        self.bias = float(bias)
+        self.n_features = len(weights)
+        if self.n_features & (self.n_features - 1):
+            raise ValueError("n_features must be a power of two")
+        self.ngram_range = (int(ngram_range[0]), int(ngram_range[1]))
+        self.threshold = float(threshold)
+
+    @classmethod
+    def zeros(cls, n_features: int = 1 << 18, ngram_range: Tuple[int, int] = (1, 3)) -> "NgramLogisticScorer":
+        return cls(np.zeros(n_features, dtype=np.float32), 0.0, ngram_range)
+
+    @classmethod
+    def load(cls, path: Path) -> "NgramLogisticScorer":
+        with np.load(path) as data:
+            return cls(
+                data["weights"],
+                float(data["bias"]),
+                tuple(data["ngram_range"].tolist()),
+                float(data["threshold"]),
+            )
+
+    def save(self, path: Path, **metadata: str) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=np.float32(self.bias),
+            ngram_range=np.array(self.ngram_range),
+            threshold=np.float32(self.threshold),
+            metadata=np.array(json.dumps(metadata, ensure_ascii=False)),
+        )
+
+    def features(self, texts: Sequence[str]) -> List[np.ndarray]:
+        return [featurize(text, self.n_features, self.ngram_range) for text in texts]
+
+    def logits(self, features: Sequence[np.ndarray]) -> np.ndarray:
+        flat, starts, lengths = _pack(features)
+        sums = np.zeros(len(features), dtype=np.float32)
+        nonempty = lengths > 0
+        if flat.size:
+            # reduceat은 빈 구간에서 다음 값을 돌려주므로 빈 문장은 0으로 둔다
+            sums[nonempty] = np.add.reduceat(self.weights[flat], starts[nonempty])
+        # 문장 길이에 따라 점수가 커지지 않도록 특성 수의 제곱근으로 나눈다
+        return sums / np.sqrt(np.maximum(lengths, 1)) + self.bias
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        return _sigmoid(self.logits(self.features(texts)))
+
+
+# ---- 학습 ----
+def train_logistic(
+    features: Sequence[np.ndarray],
+    labels: np.ndarray,
+    n_features: int = 1 << 18,
+    ngram_range: Tuple[int, int] = (1, 3),
+    epochs: int = 8,
+    batch_size: int = 256,
+    learning_rate: float = 2.0,
+    l2: float = 1e-6,
+    seed: int = 7,
+) -> NgramLogisticScorer:
+    """해시 특성 위 미니배치 SGD (양성 비율이 낮아도 학습되도록 클래스 가중치 적용)"""
+    model = NgramLogisticScorer.zeros(n_features, ngram_range)
+    labels = labels.astype(np.float32)
+    positive = float(labels.mean()) if len(labels) else 0.0
+    class_weight = np.where(labels > 0, 0.5 / max(positive, 1e-3), 0.5 / max(1 - positive, 1e-3)).astype(np.float32)
+    rng = np.random.default_rng(seed)
+    order = np.arange(len(features))
+    for epoch in range(epochs):
+        rng.shuffle(order)
+        rate = learning_rate / (1 + epoch)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            batch_features = [features[i] for i in batch]
+            flat, _, lengths = _pack(batch_features)
+            scale = 1.0 / np.sqrt(np.maximum(lengths, 1))
+            error = (_sigmoid(model.logits(batch_features)) - labels[batch]) * class_weight[batch]
+            gradient = np.zeros(n_features, dtype=np.float32)
+            np.add.at(gradient, flat, np.repeat(error * scale, lengths))
+            model.weights -= rate * (gradient / len(batch) + l2 * model.weights)
+            model.bias -= rate * float(error.mean())
+    return model
+
+
+def load_training_examples(include_test: bool = False, labels_path: Optional[Path] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    저장된 대화에서 (그 턴까지의 사용자 텍스트, 고위험 여부) 예시를 만든다.
+    라벨은 저장된 턴별 분석의 위험 점수(규칙 결과)이고, labels 파일({"text", "label"} JSONL)의
+    사람이 붙인 라벨이 있으면 같은 텍스트의 규칙 라벨을 덮어쓴다.
+    """
+    from .storage import iter_conversation_files
+
+    examples: Dict[str, int] = {}
+    for path in iter_conversation_files(include_test):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[WARN] 대화 파일 읽기 실패 ({path}): {e}")
+            continue
+        texts: List[str] = []
+        for item in data.get("history") or []:
+            if item.get("role") != "user" or not item.get("content"):
+                continue
+            texts.append(item["content"])
+            analysis = item.get("analysis") or {}
+            if "risk_score" in analysis:
+                examples[" ".join(texts)] = int(analysis["risk_score"] >= HIGH_RISK_SCORE)
+
+    if labels_path:
+        with open(labels_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    examples[entry["text"]] = int(entry["label"])
+
+    texts = list(examples)
+    return texts, np.array([examples[t] for t in texts], dtype=np.int8)
+
+
+def _split(count: int, holdout: float, seed: int = 7) -> Tuple[List[int], List[int]]:
+    indices = list(range(count))
+    random.Random(seed).shuffle(indices)
+    cut = int(count * (1 - holdout))
+    return indices[:cut], indices[cut:]
+
+
+def evaluate(model: RiskScorer, texts: Sequence[str], labels: np.ndarray) -> Dict[str, float]:
+    started = time.perf_counter()
+    probabilities = model.score_batch(texts)
+    elapsed = time.perf_counter() - started
+    predicted = probabilities >= model.threshold
+    actual = labels.astype(bool)
+    tp = int((predicted & actual).sum())
+    fp = int((predicted & ~actual).sum())
+    fn = int((~predicted & actual).sum())
+    return {
+        "examples": len(texts),
+        "positives": int(actual.sum()),
+        "precision": round(tp / (tp + fp), 4) if tp + fp else 0.0,
+        "recall": round(tp / (tp + fn), 4) if tp + fn else 0.0,
+        "accuracy": round(float((predicted == actual).mean()), 4) if len(texts) else 0.0,
+        "ms_per_message": round(elapsed / max(len(texts), 1) * 1000, 4),
+    }
+
+
+# ---- shadow mode ----
+class ShadowScorer:
+    """규칙 점수와 모델 점수를 나란히 기록 (모델 점수는 기록만 하고 판단에는 쓰지 않는다)"""
+
+    def __init__(self, model: RiskScorer, log_path: Path = DEFAULT_SHADOW_LOG) -> None:
+        self.model = model
+        self.log_path = Path(log_path)
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=SHADOW_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="risk-shadow", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str, analysis: Dict) -> bool:
+        try:
+            self._queue.put_nowait({"text": text, "analysis": analysis, "at": datetime.now().isoformat()})
+            return True
+        except queue.Full:
+            # 기록이 밀리면 버린다 (shadow 기록 때문에 요청이 느려지면 안 됨)
+            return False
+
+    def _drain(self) -> List[Dict]:
+        items = [self._queue.get()]
+        while len(items) < SHADOW_BATCH_SIZE:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self) -> None:
+        while True:
+            items = self._drain()
+            try:
+                self._write(items)
+            except Exception as e:
+                print(f"[WARN] risk shadow scoring failed: {e}")
+
+    def _write(self, items: List[Dict]) -> None:
+        started = time.perf_counter()
+        probabilities = self.model.score_batch([item["text"] for item in items])
+        per_message_ms = (time.perf_counter() - started) * 1000 / len(items)
+        threshold = self.model.threshold
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            for item, probability in zip(items, probabilities):
+                analysis = item["analysis"]
+                rule_high = analysis.get("risk_score", 0) >= HIGH_RISK_SCORE
+                model_high = bool(probability >= threshold)
+                f.write(json.dumps({
+                    "at": item["at"],
+                    # 원문 대신 해시만 남겨 기록 파일에 대화 내용이 쌓이지 않게 한다
+                    "text_sha1": hashlib.sha1(item["text"].encode("utf-8")).hexdigest(),
+                    "text_length": len(item["text"]),
+                    "rule_risk_score": analysis.get("risk_score"),
+                    "rule_next_action": analysis.get("next_action"),
+                    "rule_high": rule_high,
+                    "model": self.model.name,
+                    "model_probability": round(float(probability), 4),
+                    "model_high": model_high,
+                    "disagree": rule_high != model_high,
+                    "model_ms": round(per_message_ms, 4),
+                }, ensure_ascii=False) + "\n")
+
+
+_shadow: Optional[ShadowScorer] = None
+_shadow_loaded = False
+_shadow_lock = threading.Lock()
+
+
+def get_shadow_scorer() -> Optional[ShadowScorer]:
+    """shadow 점수기 (비활성 또는 모델 파일이 없으면 None)"""
+    global _shadow, _shadow_loaded
+    if _shadow_loaded:
+        return _shadow
+    with _shadow_lock:
+        if not _shadow_loaded:
+            _shadow_loaded = True
+            if not flag("RISK_SHADOW"):
+                return None
+            model_path = shadow_model_path()
+            if model_path.exists():
+                try:
+                    _shadow = ShadowScorer(
+                        NgramLogisticScorer.load(model_path),
+                        Path(os.getenv("RISK_SHADOW_LOG") or DEFAULT_SHADOW_LOG),
+                    )
+                    print(f"[INFO] risk shadow model loaded: {model_path}")
+                except Exception as e:
+                    print(f"[WARN] risk shadow model load failed ({model_path}): {e}")
+    return _shadow
+
+
+def shadow_score(full_user_text: str, analysis: Dict) -> None:
+    scorer = get_shadow_scorer()
+    if scorer is not None:
+        scorer.submit(full_user_text, analysis)
+
+
+# ---- CLI ----
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="위험도 n-gram 분류기 학습/평가")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="저장된 대화로 학습")
+    train.add_argument("--out", type=Path, default=DEFAULT_MODEL_PATH)
+    train.add_argument("--epochs", type=int, default=8)
+    train.add_argument("--n-features", type=int, default=1 << 18, help="해시 특성 수 (2의 거듭제곱)")
+    train.add_argument("--holdout", type=float, default=0.2, help="평가용으로 남길 비율")
+    evaluate_cmd = sub.add_parser("eval", help="저장된 대화로 평가")
+    evaluate_cmd.add_argument("--model", type=Path, default=DEFAULT_MODEL_PATH)
+    for command in (train, evaluate_cmd):
+        command.add_argument("--include-test", action="store_true", help="테스트 대화도 포함")
+        command.add_argument("--labels", type=Path, help="사람이 붙인 라벨 JSONL ({\"text\", \"label\"})")
+    args = parser.parse_args(argv)
+
+    texts, labels = load_training_examples(args.include_test, args.labels)
+    if not texts:
+        print("[WARN] 학습/평가할 대화가 없습니다.")
+        return
+    print(f"[INFO] {len(texts)} examples, {int(labels.sum())} high-risk")
+
+    if args.command == "eval":
+        model = NgramLogisticScorer.load(args.model)
+        print(f"[INFO] model: {evaluate(model, texts, labels)}")
+        print(f"[INFO] rules: {evaluate(RuleScorer(), texts, labels)}")
+        return
+
+    train_idx, test_idx = _split(len(texts), args.holdout)
+    model_features = NgramLogisticScorer.zeros(args.n_features).features(texts)
+    started = time.perf_counter()
+    model = train_logistic(
+        [model_features[i] for i in train_idx],
+        labels[train_idx],
+        n_features=args.n_features,
+        epochs=args.epochs,
+    )
+    print(f"[INFO] trained on {len(train_idx)} examples in {time.perf_counter() - started:.1f}s")
+    if test_idx:
+        print(f"[INFO] holdout: {evaluate(model, [texts[i] for i in test_idx], labels[test_idx])}")
+    model.save(args.out, trained_at=datetime.now().isoformat(), examples=str(len(train_idx)))
+    print(f"[INFO] saved: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+저장된 대화 전문 검색 모듈
+사용자/AI 발화를 한글 n-gram으로 토큰화해 역색인(inverted index)을 만들고,
+대화가 저장될 때마다 색인을 증분 갱신한다.
+다른 워커가 저장한 대화는 검색할 때 저장소 버전(storage.store_version)이 바뀌었으면 디렉터리를 다시 훑어
+새로 생기거나 바뀐 파일만 읽어 들인다.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .storage import STORAGE_DIR, TEST_STORAGE_DIR, store_version
+
+# 한글 연속 구간 / 영문·숫자 연속 구간
+_RUN_PATTERN = re.compile(r"[가-힣]+|[a-z0-9]+")
+# 한글 사이 공백 ('죽고 싶'을 '죽고싶'과 같게) - 영문/숫자 단어 사이 공백은 남겨 단어를 나눈다
+_HANGUL_GAP_PATTERN = re.compile(r"(?<=[가-힣])\s+(?=[가-힣])")
+_SEARCH_ROLES = ("user", "ai")
+SNIPPET_RADIUS = 30
+
+
+def _is_hangul(ch: str) -> bool:
+    return "가" <= ch <= "힣"
+
+
+def normalize(text: str) -> str:
+    """검색용 정규화: 소문자 + 공백 제거 (agent와 동일하게 '죽고 싶'/'죽고싶'을 같은 것으로 본다)"""
+    return re.sub(r"\s+", "", text.lower())
+
+
+def _runs(text: str) -> List[str]:
+    """한글 구간(사이 공백은 이어 붙임)과 영문/숫자 단어 ('my friend John' → my, friend, john)"""
+    return _RUN_PATTERN.findall(_HANGUL_GAP_PATTERN.sub("", text.lower()))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    문서 색인용 토큰화
+    - 한글: 1-gram + 2-gram (한 글자 검색어도 찾을 수 있도록 1-gram 포함)
+    - 영문/숫자: 단어 단위
+    """
+    tokens: List[str] = []
+    for run in _runs(text):
+        if _is_hangul(run[0]):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def query_tokens(query: str) -> List[str]:
+    """검색어 토큰화: 두 글자 이상 한글 구간은 2-gram만, 한 글자면 1-gram 사용"""
+    tokens: List[str] = []
+    for run in _runs(query):
+        if _is_hangul(run[0]) and len(run) >= 2:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    # 순서를 유지한 중복 제거
+    return list(dict.fromkeys(tokens))
+
+
+def _spaced(text: str) -> str:
+    """글자 사이 공백 유무와 상관없이 매칭되는 정규식 조각"""
+    return r"\s*".join(re.escape(ch) for ch in normalize(text))
+
+
+def _highlight_pattern(query: str) -> Optional[re.Pattern]:
+    """검색어 글자 사이 공백 유무와 상관없이 매칭되는 하이라이트용 정규식"""
+    terms = [t for t in query.split() if t]
+    if not terms:
+        return None
+    alternatives = [_spaced(query)]
+    if len(terms) > 1:
+        alternatives.extend(_spaced(t) for t in terms)
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+
+@dataclass
+class _Doc:
+    filename: str
+    is_test: bool
+    timestamp: str
+    length: int
+    terms: Dict[str, int] = field(default_factory=dict)
+    # 발화별 정규화 텍스트를 줄바꿈으로 이은 것 - 2-gram이 모두 있는 후보가 실제로 이어진 검색어를 담고 있는지 확인용
+    # (정규화 텍스트에는 공백이 없어서 정규화한 검색어가 발화 경계를 넘어 매칭되지 않는다)
+    text: str = ""
+    # 색인할 때의 파일 (mtime_ns, size) - 다시 훑을 때 바뀐 파일만 읽는다
+    stat: Optional[Tuple[int, int]] = None
+
+
+class SearchIndex:
+    """대화 파일 단위 역색인 (token -> {doc_key: tf})"""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[Tuple[bool, str], int]] = {}
+        self._docs: Dict[Tuple[bool, str], _Doc] = {}
+        self._built = False
+        # 마지막으로 저장소와 맞춘 시점의 store_version
+        self.version: Optional[Tuple[int, ...]] = None
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def add(self, filename: str, data: Dict, is_test: bool, stat: Optional[Tuple[int, int]] = None) -> None:
+        """대화 1건 색인 (같은 파일명이 있으면 교체)"""
+        texts = [
+            item.get("content", "")
+            for item in data.get("history") or []
+            if isinstance(item, dict) and item.get("role") in _SEARCH_ROLES
+        ]
+        terms: Dict[str, int] = {}
+        for text in texts:
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0) + 1
+
+        key = (is_test, filename)
+        with self._lock:
+            self._remove_locked(key)
+            self._docs[key] = _Doc(
+                filename=filename,
+                is_test=is_test,
+                timestamp=data.get("timestamp", ""),
+                length=sum(terms.values()),
+                terms=terms,
+                text="\n".join(normalize(text) for text in texts),
+                stat=stat,
+            )
+            for token, tf in terms.items():
+                self._postings.setdefault(token, {})[key] = tf
+
+    def remove(self, filename: str, is_test: bool) -> None:
+        with self._lock:
+            self._remove_locked((is_test, filename))
+
+    def _remove_locked(self, key: Tuple[bool, str]) -> None:
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        for token in doc.terms:
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(key, None)
+            if not posting:
+                del self._postings[token]
+
+    def build(self, sources: Iterable[Tuple[Path, bool]]) -> int:
+        """저장소 전체를 읽어 색인을 새로 만든다."""
+        with self._lock:
+            self._postings.clear()
+            self._docs.clear()
+            count = self.refresh(sources)
+            self._built = True
+        return count
+
+    def refresh(self, sources: Iterable[Tuple[Path, bool]]) -> int:
+        """
+        디렉터리를 다시 훑어 새로 생기거나 (mtime/크기가) 바뀐 파일만 읽고, 없어진 파일은 뺀다.
+        Returns:
+            새로 읽은 파일 수
+        """
+        count = 0
+        with self._lock:
+            seen = set()
+            scanned = []
+            for directory, is_test in sources:
+                scanned.append(is_test)
+                if not directory.exists():
+                    continue
+                for filepath in directory.glob("*.json"):
+                    key = (is_test, filepath.name)
+                    seen.add(key)
+                    try:
+                        stat = filepath.stat()
+                    except FileNotFoundError:
+                        seen.discard(key)
+                        continue
+                    stat_key = (stat.st_mtime_ns, stat.st_size)
+                    doc = self._docs.get(key)
+                    if doc is not None and doc.stat == stat_key:
+                        continue
+                    try:
+                        with open(filepath, "r", encoding="utf-8") as f:
+                            data = json.load(f)
+                    except Exception as e:
+                        print(f"[WARN] search index skip ({filepath}): {e}")
+                        continue
+                    self.add(filepath.name, data, is_test, stat=stat_key)
+                    count += 1
+            for key in [key for key in self._docs if key[0] in scanned and key not in seen]:
+                self._remove_locked(key)
+        return count
+
+    def query(
+        self,
+        query: str,
+        include_test: bool = False,
+        limit: Optional[int] = None,
+    ) -> Tuple[int, List[Tuple[float, _Doc]]]:
+        """
+        검색어가 (공백 무시하고) 이어서 나오는 대화를 TF-IDF 점수 순으로 반환
+        2-gram 교집합은 후보일 뿐이라 ('죽고 나서 살고 싶어'도 '죽고싶'의 2-gram을 다 가진다)
+        검색어 전체가 실제로 이어서 나오는지 정규화 텍스트에서 부분 문자열로 확인한다
+        (하이라이트의 첫 대안과 같은 판정 - total/페이지가 하이라이트와 맞도록).
+        토큰 하나가 곧 검색어 전체면 posting이 정답이라 확인하지 않는다.
+
+        Returns:
+            (전체 결과 수, 점수 순 상위 limit개 - limit이 없으면 전부)
+        """
+        tokens = query_tokens(query)
+        phrase = normalize(query)
+        if not tokens or not phrase:
+            return 0, []
+        verify = not (len(tokens) == 1 and tokens[0] == phrase)
+        with self._lock:
+            postings = [self._postings.get(token) for token in tokens]
+            if any(not p for p in postings):
+                return 0, []
+            # 가장 짧은 posting부터 교집합
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return 0, []
+
+            total_docs = len(self._docs)
+            weighted = [(p, math.log(1 + total_docs / len(p))) for p in postings]
+            docs = self._docs
+            results: List[Tuple[float, _Doc]] = []
+            for key in candidates:
+                if key[0] and not include_test:
+                    continue
+                doc = docs[key]
+                if verify and phrase not in doc.text:
+                    continue
+                score = sum(p[key] * w for p, w in weighted)
+                results.append((score / math.sqrt(doc.length or 1), doc))
+
+        rank = lambda r: (r[0], r[1].timestamp)  # noqa: E731
+        if limit is not None and limit < len(results):
+            # 페이지에 필요한 만큼만 정렬
+            return len(results), heapq.nlargest(limit, results, key=rank)
+        results.sort(key=rank, reverse=True)
+        return len(results), results
+
+
+def _highlights(data: Dict, pattern: Optional[re.Pattern], limit: int = 3) -> List[Dict]:
+    """매칭된 발화별 스니펫과 스니펫 내 매칭 구간(start, end) 목록"""
+    if pattern is None:
+        return []
+    highlights: List[Dict] = []
+    for idx, item in enumerate(data.get("history") or []):
+        if not isinstance(item, dict) or item.get("role") not in _SEARCH_ROLES:
+            continue
+        content = item.get("content", "")
+        matches = list(pattern.finditer(content))
+        if not matches:
+            continue
+        start = max(matches[0].start() - SNIPPET_RADIUS, 0)
+        end = min(matches[0].end() + SNIPPET_RADIUS, len(content))
+        highlights.append({
+            "turn_index": idx,
+            "role": item.get("role"),
+            "snippet": content[start:end],
+            "prefix_ellipsis": start > 0,
+            "suffix_ellipsis": end < len(content),
+            "matches": [
+                [m.start() - start, m.end() - start]
+                for m in matches
+                if m.start() >= start and m.end() <= end
+            ],
+        })
+        if len(highlights) >= limit:
+            break
+    return highlights
+
+
+_index = SearchIndex()
+_build_lock = threading.Lock()
+
+
+_SOURCES = [(STORAGE_DIR, False), (TEST_STORAGE_DIR, True)]
+
+
+def get_index() -> SearchIndex:
+    """
+    색인을 처음 사용할 때 저장소 전체로 한 번 생성하고,
+    이후에는 저장소 버전이 바뀌었을 때만 (다른 워커가 저장/교체한 파일을) 다시 맞춘다.
+    """
+    # 훑기 전에 버전을 읽어 둔다 - 훑는 동안 생긴 파일은 다음 검색 때 다시 잡힌다
+    version = store_version(include_test=True)[0]
+    if _index.version != version:
+        with _build_lock:
+            if _index.version != version:
+                if _index.built:
+                    _index.refresh(_SOURCES)
+                else:
+                    _index.build(_SOURCES)
+                _index.version = version
+    return _index
+
+
+def index_conversation(filename: str, data: Dict, is_test: bool = False) -> None:
+    """
+    저장 직후 호출되는 증분 갱신
+    색인이 아직 만들어지지 않았다면 첫 검색 때 디스크에서 함께 읽히므로 생략한다.
+    """
+    if _index.built:
+        path = (TEST_STORAGE_DIR if is_test else STORAGE_DIR) / filename
+        try:
+            stat = path.stat()
+            stat_key: Optional[Tuple[int, int]] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stat_key = None
+        _index.add(filename, data, is_test, stat=stat_key)
+
+
+def search_conversations(
+    query: str,
+    page: int = 1,
+    page_size: int = 20,
+    include_test: bool = False,
+) -> Dict:
+    """
+    대화 전문 검색
+
+    Args:
+        query: 검색어 (공백 무시, 모든 토큰을 포함하는 대화만 반환)
+        page: 1부터 시작하는 페이지 번호
+        page_size: 페이지당 결과 수
+        include_test: 테스트 대화 포함 여부
+
+    Returns:
+        total, page, page_size, results(파일명/점수/하이라이트)
+    """
+    from .storage import get_conversation
+
+    start = (page - 1) * page_size
+    total, results = get_index().query(query, include_test=include_test, limit=start + page_size)
+    page_results = results[start:start + page_size]
+
+    pattern = _highlight_pattern(query)
+    items = []
+    for score, doc in page_results:
+        data = get_conversation(doc.filename, is_test=doc.is_test) or {}
+        items.append({
+            "filename": doc.filename,
+            "is_test": doc.is_test,
+            "timestamp": doc.timestamp,
+            "score": round(score, 4),
+            "highlights": _highlights(data, pattern),
+        })
+
+    return {
+        "query": query,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "results": items,
+    }
@@ -0,0 +1,98 @@
+"""
+채팅 프로토콜 2 (delta): 서버가 대화 기록을 들고 있는다
+프로토콜 1은 매 턴 전체 history를 보내고 서버가 ChatTurn마다 다시 검증한다 (대화 길이에 비례하는 요청 크기/검증 비용).
+프로토콜 2에서 클라이언트는 새 메시지 + conversation_id + last_seen_turn만 보낸다.
+
+- 첫 요청(conversation_id 없음): history 전체를 보내면 새 conversation_id를 받는다
+- 이후: {protocol: 2, conversation_id, last_seen_turn, message}
+  서버에 저장된 기록 길이가 last_seen_turn과 다르거나 기록이 없으면(만료, 재시작) 409 → 클라이언트가 전체 history로 다시 보낸다
+- history를 보내면 항상 그걸 기준으로 삼고 서버 기록을 덮어쓴다 (resync)
+
+turn = 클라이언트 화면의 대화 항목 수 (첫 인사 포함, 방금 받은 AI 응답까지)
+서버가 만든 history는 프로토콜 1에서 클라이언트가 보냈을 history와 같다 (저장된 기록 + 이번 사용자 메시지).
+기록은 state.py 세션 저장소에 두므로 여러 워커 어디로 가도 이어진다.
+같은 대화의 두 요청이 다른 워커에서 같은 턴을 이어 받으면 먼저 기록한 쪽만 남고, 늦은 쪽은 덮어쓰지 않는다 (다음 요청이 409로 resync).
+대화 누적 상태(agent.ConversationTracker: 주제, 위험 추이)도 기록과 같이 저장해서 다음 요청은 새 메시지만 더한다 (프로토콜 1은 매번 history로 계산).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .agent import ConversationTracker
+from .schemas import ChatRequest
+from .state import get_session, new_conversation_id, update_session
+from .transcript import Transcript
+
+
+class ResyncRequired(Exception):
+    """서버 기록과 클라이언트가 본 턴이 다름 - 전체 history로 다시 보내야 함"""
+
+    def __init__(self, conversation_id: str, server_turn: Optional[int]) -> None:
+        super().__init__(f"conversation {conversation_id}: server turn {server_turn}")
+        self.conversation_id = conversation_id
+        self.server_turn = server_turn
+
+
+@dataclass
+class ChatSession:
+    conversation_id: Optional[str]
+    # 프로토콜 1에서 클라이언트가 보냈을 history (이번 사용자 메시지 포함)
+    history: Transcript
+    # history 전체의 누적 상태 (이번 사용자 메시지 포함)
+    tracker: ConversationTracker = field(default_factory=ConversationTracker)
+    # 이어 받은 서버 기록의 turn (첫 요청/resync처럼 클라이언트 history가 기준이면 None)
+    base_turn: Optional[int] = None
+
+    @classmethod
+    def from_history(cls, conversation_id: Optional[str], history: Transcript) -> "ChatSession":
+        return cls(conversation_id, history, ConversationTracker.from_history(history.pairs()))
+
+    def record(self, reply: str) -> Optional[int]:
+        """
+        AI 응답까지 기록하고 새 turn을 돌려준다 (프로토콜 1이면 기록하지 않음)
+        서버 기록을 이어 받았는데 그 사이 다른 요청이 기록을 바꿨으면 덮어쓰지 않고 ResyncRequired
+        """
+        if self.conversation_id is None:
+            return None
+        items = self.history.to_pairs()
+        items.append(["ai", reply])
+        self.tracker.observe("ai", reply)
+        session = {"turns": items, "tracker": self.tracker.to_dict()}
+        base_turn = self.base_turn
+
+        def apply(current):
+            server_turn = len(current["turns"]) if current else None
+            if base_turn is not None and server_turn != base_turn:
+                return current, (False, server_turn)
+            return session, (True, server_turn)
+
+        written, server_turn = update_session(self.conversation_id, apply)
+        if not written:
+            raise ResyncRequired(self.conversation_id, server_turn)
+        return len(items)
+
+
+def resolve(payload: ChatRequest) -> ChatSession:
+    """요청을 전체 history 형태로 맞춘다. 맞출 수 없으면 ResyncRequired."""
+    if payload.protocol < 2:
+        return ChatSession.from_history(None, Transcript.from_turns(payload.history))
+
+    conversation_id = payload.conversation_id or new_conversation_id()
+    if payload.history or not payload.conversation_id:
+        # 첫 요청 또는 resync: 클라이언트 history가 기준
+        return ChatSession.from_history(conversation_id, Transcript.from_turns(payload.history))
+
+    session = get_session(conversation_id)
+    server_turn = len(session["turns"]) if session else None
+    if session is None or payload.last_seen_turn != server_turn:
+        raise ResyncRequired(conversation_id, server_turn)
+    # 저장된 기록은 서버가 검증해서 넣은 것이므로 ChatTurn으로 다시 검증하지 않는다
+    history = Transcript.from_pairs(session["turns"])
+    tracker = ConversationTracker.from_dict(session.get("tracker"))
+    if tracker is None or tracker.turns != server_turn:
+        # 누적 상태가 없는 예전 기록
+        tracker = ConversationTracker.from_history(history.pairs())
+    history.append("user", payload.message)
+    tracker.observe("user", payload.message)
+    return ChatSession(conversation_id, history, tracker, base_turn=server_turn)
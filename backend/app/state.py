@@ -0,0 +1,271 @@
+"""
+공유 상태 저장소
+`uvicorn --workers N`으로 여러 프로세스를 띄우면 모듈 전역 dict(캐시, 속도 제한 버킷 등)는
+워커마다 따로 생긴다. 워커끼리 나눠야 하는 상태는 이 인터페이스를 거친다.
+
+- MemoryStateStore: 프로세스 안 (기본, 워커 1개)
+- SQLiteStateStore: 같은 호스트의 여러 워커가 파일 하나(WAL)를 공유. 추가 의존성 없음
+
+값은 JSON으로 직렬화할 수 있어야 하고, 저장한 뒤에는 바꾸지 않는다 (바꾸려면 다시 set/update).
+
+환경 변수:
+    STATE_BACKEND       memory | sqlite (기본: WEB_CONCURRENCY가 2 이상이면 sqlite, 아니면 memory)
+    STATE_SQLITE_PATH   sqlite 파일 경로 (기본 data/state.sqlite3)
+    SESSION_TTL_SECONDS 대화 세션 상태 보관 시간 (기본 86400)
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_SQLITE_PATH = Path("data/state.sqlite3")
+PURGE_EVERY_WRITES = 1000
+
+
+class StateStore:
+    """namespace/key → 값 (선택적 TTL). 모든 메서드는 스레드/프로세스 안전해야 한다."""
+
+    name = "state"
+    # 여러 프로세스가 같은 상태를 보는지 (False면 워커별 상태)
+    shared = False
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str) -> None:
+        raise NotImplementedError
+
+    def update(self, namespace: str, key: str, fn: Callable[[Any], Tuple[Any, T]], ttl: Optional[float] = None) -> T:
+        """
+        원자적 읽기-수정-쓰기: fn(현재 값 또는 None) → (새 값, 돌려줄 결과)
+        새 값이 None이면 키를 지운다.
+        """
+        raise NotImplementedError
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def add(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """키가 없을 때만 저장 (선점/중복 방지용). 저장했으면 True."""
+        return self.update(namespace, key, lambda current: (value, True) if current is None else (current, False), ttl)
+
+    def incr(self, namespace: str, key: str, amount: float = 1) -> float:
+        def bump(current: Any) -> Tuple[float, float]:
+            value = (current or 0) + amount
+            return value, value
+
+        return self.update(namespace, key, bump)
+
+
+class MemoryStateStore(StateStore):
+    name = "memory"
+    shared = False
+
+    def __init__(self) -> None:
+        self._data: Dict[Tuple[str, str], Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.RLock()
+
+    def _get_locked(self, namespace: str, key: str) -> Any:
+        item = self._data.get((namespace, key))
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[(namespace, key)]
+            return None
+        return value
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            value = self._get_locked(namespace, key)
+        return default if value is None else value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[(namespace, key)] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._data.pop((namespace, key), None)
+
+    def update(self, namespace: str, key: str, fn: Callable[[Any], Tuple[Any, T]], ttl: Optional[float] = None) -> T:
+        with self._lock:
+            current = self._get_locked(namespace, key)
+            value, result = fn(current)
+            if value is None:
+                self._data.pop((namespace, key), None)
+            elif ttl or current is None:
+                self._data[(namespace, key)] = (value, time.time() + ttl if ttl else None)
+            else:
+                # TTL을 주지 않은 갱신은 기존 만료 시각을 유지
+                self._data[(namespace, key)] = (value, self._data[(namespace, key)][1])
+            return result
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        with self._lock:
+            keys = [k for ns, k in self._data if ns == namespace]
+            return {k: v for k in keys if (v := self._get_locked(namespace, k)) is not None}
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        with self._lock:
+            if namespace is None:
+                self._data.clear()
+            else:
+                for key in [key for key in self._data if key[0] == namespace]:
+                    del self._data[key]
+
+
+class SQLiteStateStore(StateStore):
+    """
+    SQLite(WAL) 파일 하나를 여러 워커 프로세스가 공유
+    update는 BEGIN IMMEDIATE로 쓰기 잠금을 잡고 읽기-수정-쓰기를 한 트랜잭션으로 처리한다.
+    같은 호스트 전용 (네트워크 파일시스템 위에서는 잠금이 보장되지 않음)
+    """
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: Path = DEFAULT_SQLITE_PATH, busy_timeout: float = 5.0) -> None:
+        self.path = Path(path)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._writes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 연결은 스레드 간에 공유하지 않는다 (스레드풀 스레드마다 하나)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _select(self, conn: sqlite3.Connection, namespace: str, key: str, now: float) -> Tuple[Any, Optional[float]]:
+        row = conn.execute(
+            "SELECT value, expires_at FROM state WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def _write(self, conn: sqlite3.Connection, namespace: str, key: str, value: Any, expires_at: Optional[float]) -> None:
+        conn.execute(
+            "INSERT INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (namespace, key, json.dumps(value, ensure_ascii=False), expires_at),
+        )
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            conn.execute("DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        value, _ = self._select(self._conn(), namespace, key, time.time())
+        return default if value is None else value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._write(self._conn(), namespace, key, value, time.time() + ttl if ttl else None)
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._conn().execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def update(self, namespace: str, key: str, fn: Callable[[Any], Tuple[Any, T]], ttl: Optional[float] = None) -> T:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current, expires_at = self._select(conn, namespace, key, now)
+            value, result = fn(current)
+            if value is None:
+                conn.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+            else:
+                self._write(conn, namespace, key, value, now + ttl if ttl else expires_at)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        rows = self._conn().execute(
+            "SELECT key, value FROM state WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, time.time()),
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        if namespace is None:
+            self._conn().execute("DELETE FROM state")
+        else:
+            self._conn().execute("DELETE FROM state WHERE namespace = ?", (namespace,))
+
+
+_store: Optional[StateStore] = None
+_store_lock = threading.Lock()
+
+
+def _default_backend() -> str:
+    try:
+        workers = int(os.getenv("WEB_CONCURRENCY") or "1")
+    except ValueError:
+        workers = 1
+    return "sqlite" if workers > 1 else "memory"
+
+
+def get_state_store() -> StateStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = (os.getenv("STATE_BACKEND") or _default_backend()).lower()
+                if backend == "sqlite":
+                    _store = SQLiteStateStore(Path(os.getenv("STATE_SQLITE_PATH") or DEFAULT_SQLITE_PATH))
+                else:
+                    if backend != "memory":
+                        print(f"[WARN] 알 수 없는 STATE_BACKEND={backend}, memory 사용")
+                    _store = MemoryStateStore()
+                print(f"[INFO] state backend: {_store.name}")
+    return _store
+
+
+# ---- 대화 세션 ----
+SESSIONS = "sessions"
+
+
+def new_conversation_id() -> str:
+    """워커와 무관하게 겹치지 않는 대화 ID (조율 없이 만들 수 있도록 랜덤)"""
+    return uuid.uuid4().hex
+
+
+def _session_ttl() -> float:
+    return float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+
+
+def get_session(conversation_id: str) -> Optional[Dict]:
+    return get_state_store().get(SESSIONS, conversation_id)
+
+
+def update_session(conversation_id: str, fn: Callable[[Optional[Dict]], Tuple[Optional[Dict], T]]) -> T:
+    """다른 워커가 같은 대화를 동시에 갱신해도 잃어버리지 않도록 원자적으로 갱신"""
+    return get_state_store().update(SESSIONS, conversation_id, fn, ttl=_session_ttl())
@@ -5,9 +5,11 @@ from __future__ import annotations
 
 import json
 import os
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 
 STORAGE_DIR = Path("data/conversations")
 TEST_STORAGE_DIR = Path("data/conversations/test")
@@ -21,6 +23,20 @@ def ensure_storage_dir(is_test: bool = False):
         STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _create_unique(storage_dir: Path, stem: str):
+    """
+    stem.json을 새로 만든다. 같은 초에 저장된 파일이 있으면 stem_2.json, stem_3.json ...
+    O_EXCL("x") 생성이라 여러 워커 프로세스가 동시에 저장해도 서로 덮어쓰지 않는다.
+    """
+    attempt = 1
+    while True:
+        filename = f"{stem}.json" if attempt == 1 else f"{stem}_{attempt}.json"
+        try:
+            return filename, open(storage_dir / filename, "x", encoding="utf-8")
+        except FileExistsError:
+            attempt += 1
+
+
 def save_conversation(
     history: List[Dict],
     analysis: Dict,
@@ -44,11 +60,9 @@ def save_conversation(
     # 파일명: 날짜_시간.json (테스트는 test_ 접두사 추가)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     prefix = "test_" if is_test else ""
-    filename = f"{prefix}{timestamp}.json"
     
     # 저장 디렉토리 선택
     storage_dir = TEST_STORAGE_DIR if is_test else STORAGE_DIR
-    filepath = storage_dir / filename
     
     # 저장할 데이터 구조
     conversation_data: Dict = {
@@ -61,12 +75,74 @@ def save_conversation(
     }
     
     # JSON 파일로 저장
-    with open(filepath, "w", encoding="utf-8") as f:
+    filename, f = _create_unique(storage_dir, f"{prefix}{timestamp}")
+    with f:
         json.dump(conversation_data, f, ensure_ascii=False, indent=2)
-    
+
+    # 검색 색인 증분 갱신 (실패해도 저장은 유지)
+    try:
+        from .search import index_conversation
+        index_conversation(filename, conversation_data, is_test=is_test)
+    except Exception as e:
+        print(f"[WARN] search index update failed: {e}")
+
     return filename
 
 
+# 목록 요약 캐시: 경로 → ((mtime_ns, size), 요약) - 바뀌지 않은 파일은 다시 열지 않는다
+_summaries: Dict[Path, Tuple[Tuple[int, int], Dict]] = {}
+_summaries_lock = threading.Lock()
+
+
+def _stat_key(stat: os.stat_result) -> Tuple[int, int]:
+    return stat.st_mtime_ns, stat.st_size
+
+
+def store_version(include_test: bool = False) -> Tuple[Tuple[int, ...], float]:
+    """
+    대화 저장소 버전 = 디렉터리 mtime (파일 생성/삭제/os.replace 교체 때 바뀐다)
+    (버전, 마지막 변경 시각) - 여러 워커가 같은 디렉터리를 보므로 프로세스 간에도 맞다
+    """
+    ensure_storage_dir()
+    dirs = [STORAGE_DIR]
+    if include_test:
+        ensure_storage_dir(is_test=True)
+        dirs.append(TEST_STORAGE_DIR)
+    stats = [directory.stat() for directory in dirs]
+    return tuple(stat.st_mtime_ns for stat in stats), max(stat.st_mtime for stat in stats)
+
+
+def _summarize(filepath: Path, is_test: bool) -> Dict:
+    stat = filepath.stat()
+    key = _stat_key(stat)
+    with _summaries_lock:
+        cached = _summaries.get(filepath)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with open(filepath, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # end_report나 analysis가 None일 수도 있으므로 안전하게 처리
+    end_report = data.get("end_report") or {}
+    analysis = data.get("analysis") or {}
+    summary = {
+        "filename": filepath.name,
+        "date": data.get("date", ""),
+        "time": data.get("time", ""),
+        "timestamp": data.get("timestamp", ""),
+        "summary": end_report.get("summary", "대화 요약 없음"),
+        "risk_score": analysis.get("risk_score", 0),
+        "distress_level": analysis.get("emotional_distress", "낮음"),
+        "is_test": is_test,
+    }
+    # 방금 바뀐 파일은 같은 mtime으로 한 번 더 바뀔 수 있어서 기억하지 않는다
+    if time.time() - stat.st_mtime >= 1.0:
+        with _summaries_lock:
+            _summaries[filepath] = (key, summary)
+    return summary
+
+
 def list_conversations(include_test: bool = False) -> List[Dict]:
     """
     저장된 모든 대화 목록 조회
@@ -82,57 +158,40 @@ def list_conversations(include_test: bool = False) -> List[Dict]:
         ensure_storage_dir(is_test=True)
     
     conversations = []
+    seen = set()
     
-    # 일반 대화 읽기
-    for filepath in sorted(STORAGE_DIR.glob("*.json"), reverse=True):
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            # end_report나 analysis가 None일 수도 있으므로 안전하게 처리
-            end_report = data.get("end_report") or {}
-            analysis = data.get("analysis") or {}
-            
-            conversations.append({
-                "filename": filepath.name,
-                "date": data.get("date", ""),
-                "time": data.get("time", ""),
-                "timestamp": data.get("timestamp", ""),
-                "summary": end_report.get("summary", "대화 요약 없음"),
-                "risk_score": analysis.get("risk_score", 0),
-                "distress_level": analysis.get("emotional_distress", "낮음"),
-                "is_test": False,
-            })
-        except Exception as e:
-            # Windows 콘솔(cp949)에서 이모지 사용 시 UnicodeEncodeError가 발생할 수 있어 ASCII만 사용
-            print(f"[WARN] 대화 파일 읽기 실패 ({filepath}): {e}")
-    
-    # 테스트 대화 읽기 (include_test가 True일 때만)
-    if include_test:
-        for filepath in sorted(TEST_STORAGE_DIR.glob("*.json"), reverse=True):
+    # 일반 대화, 테스트 대화(include_test가 True일 때만) 순서
+    sources = [(STORAGE_DIR, False)] + ([(TEST_STORAGE_DIR, True)] if include_test else [])
+    for directory, is_test in sources:
+        for filepath in sorted(directory.glob("*.json"), reverse=True):
+            seen.add(filepath)
             try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                end_report = data.get("end_report") or {}
-                analysis = data.get("analysis") or {}
-                
-                conversations.append({
-                    "filename": filepath.name,
-                    "date": data.get("date", ""),
-                    "time": data.get("time", ""),
-                    "timestamp": data.get("timestamp", ""),
-                    "summary": end_report.get("summary", "대화 요약 없음"),
-                    "risk_score": analysis.get("risk_score", 0),
-                    "distress_level": analysis.get("emotional_distress", "낮음"),
-                    "is_test": True,
-                })
+                conversations.append(_summarize(filepath, is_test))
             except Exception as e:
-                print(f"[WARN] 테스트 대화 파일 읽기 실패 ({filepath}): {e}")
+                # Windows 콘솔(cp949)에서 이모지 사용 시 UnicodeEncodeError가 발생할 수 있어 ASCII만 사용
+                print(f"[WARN] 대화 파일 읽기 실패 ({filepath}): {e}")
+
+    # 지워진 파일 요약은 버린다
+    with _summaries_lock:
+        for path in [path for path in _summaries if path.parent == STORAGE_DIR or (include_test and path.parent == TEST_STORAGE_DIR)]:
+            if path not in seen:
+                del _summaries[path]
     
     return conversations
 
 
+def conversation_path(filename: str, is_test: bool = False) -> Optional[Path]:
+    """파일명 → 저장 경로 (디렉터리를 벗어나는 이름이나 없는 파일이면 None)"""
+    if Path(filename).name != filename or not filename.endswith(".json"):
+        return None
+    # 테스트 파일인지 확인 (test_ 접두사 또는 명시적 is_test)
+    if filename.startswith("test_") or is_test:
+        filepath = TEST_STORAGE_DIR / filename
+    else:
+        filepath = STORAGE_DIR / filename
+    return filepath if filepath.exists() else None
+
+
 def get_conversation(filename: str, is_test: bool = False) -> Optional[Dict]:
     """
     특정 대화 상세 조회
@@ -144,13 +203,8 @@ def get_conversation(filename: str, is_test: bool = False) -> Optional[Dict]:
     Returns:
         대화 데이터 또는 None
     """
-    # 테스트 파일인지 확인 (test_ 접두사 또는 명시적 is_test)
-    if filename.startswith("test_") or is_test:
-        filepath = TEST_STORAGE_DIR / filename
-    else:
-        filepath = STORAGE_DIR / filename
-    
-    if not filepath.exists():
+    filepath = conversation_path(filename, is_test)
+    if filepath is None:
         return None
     
     try:
@@ -159,3 +213,19 @@ def get_conversation(filename: str, is_test: bool = False) -> Optional[Dict]:
     except Exception as e:
         print(f"⚠️ 대화 파일 읽기 실패 ({filepath}): {e}")
         return None
+
+
+def iter_conversation_files(include_test: bool = False) -> Iterator[Path]:
+    """저장된 대화 파일 경로 (일괄 작업용, 절대 경로)"""
+    dirs = [STORAGE_DIR] + ([TEST_STORAGE_DIR] if include_test else [])
+    for directory in dirs:
+        for path in sorted(directory.glob("*.json")):
+            yield path.resolve()
+
+
+def write_conversation_file(path: Path, data: Dict) -> None:
+    """대화 파일 덮어쓰기 (임시 파일에 쓴 뒤 교체해서 중간에 끊겨도 파일이 깨지지 않게 함)"""
+    tmp = Path(path).with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
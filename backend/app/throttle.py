@@ -0,0 +1,276 @@
+"""
+속도 제한 유틸리티
+- TokenBucket: 초당 호출 수 제한 (순간 몰림은 capacity만큼 허용)
+- PriorityLimiter: 동시 실행 수 제한. 빈자리가 나면 priority가 큰 요청부터 들어간다.
+- Coalescer: 같은 키의 호출이 진행 중이면 새로 부르지 않고 그 결과를 같이 받는다
+
+채팅 엔드포인트가 동기 함수(스레드풀)라서 전부 threading 기반이다.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class QueueTimeout(Exception):
+    """대기 시간 안에 실행 차례가 오지 않음"""
+
+
+class TokenBucket:
+    """
+    스레드 안전 토큰 버킷
+    - rate: 초당 충전되는 토큰 수
+    - capacity: 한 번에 몰아서 쓸 수 있는 최대 토큰 수 (burst)
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill_locked(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill_locked(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """tokens만큼 쌓일 때까지 남은 시간(초)"""
+        with self._lock:
+            self._refill_locked(time.monotonic())
+            missing = tokens - self._tokens
+            if missing <= 0:
+                return 0.0
+            if self.rate <= 0:
+                return float("inf")
+            return missing / self.rate
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill_locked(time.monotonic())
+            return self._tokens
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """토큰을 얻을 때까지 기다린다. timeout 안에 못 얻으면 False."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire(tokens):
+            wait = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            time.sleep(wait)
+        return True
+
+    def penalize(self, seconds: float) -> None:
+        """429를 받으면 남은 토큰을 비우고 seconds만큼 더 기다리게 한다"""
+        with self._lock:
+            self._refill_locked(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    상태를 StateStore에 두는 토큰 버킷 - 여러 워커 프로세스가 한도 하나를 나눠 쓴다
+    (워커마다 TokenBucket을 두면 실제 한도가 워커 수만큼 곱해진다)
+    프로세스 간에 monotonic 시계를 공유할 수 없어서 벽시계(time.time)로 충전한다.
+    """
+
+    NAMESPACE = "token_buckets"
+
+    def __init__(self, store, name: str, rate: float, capacity: float, ttl: Optional[float] = None) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.store = store
+        self.name = name
+        # 클라이언트별 버킷처럼 많이 생기는 경우: 쓰지 않으면 ttl 뒤에 지운다 (그때는 어차피 가득 찬 상태)
+        self.ttl = ttl
+
+    def _apply(self, fn: Callable[[float], Tuple[float, T]]) -> T:
+        def step(current):
+            now = time.time()
+            tokens, updated = current if current else (self.capacity, now)
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+            tokens, result = fn(tokens)
+            return [tokens, now], result
+
+        return self.store.update(self.NAMESPACE, self.name, step, ttl=self.ttl)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        return self._apply(lambda available: (available - tokens, True) if available >= tokens else (available, False))
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        available = self.available
+        if available >= tokens:
+            return 0.0
+        return float("inf") if self.rate <= 0 else (tokens - available) / self.rate
+
+    @property
+    def available(self) -> float:
+        return self._apply(lambda available: (available, available))
+
+    def penalize(self, seconds: float) -> None:
+        self._apply(lambda available: (min(available, 0.0) - seconds * self.rate, None))
+
+
+def make_token_bucket(name: str, rate: float, capacity: float) -> TokenBucket:
+    """공유 상태 저장소가 여러 워커를 잇는 경우 SharedTokenBucket, 아니면 프로세스 안 TokenBucket"""
+    from .state import get_state_store
+
+    store = get_state_store()
+    if store.shared:
+        return SharedTokenBucket(store, name, rate, capacity)
+    return TokenBucket(rate, capacity)
+
+
+@dataclass
+class LimiterStats:
+    window: int = 500
+    waits: Deque[float] = field(default_factory=deque)
+    admitted: int = 0
+    timeouts: int = 0
+    total_wait: float = 0.0
+
+    def record(self, wait: float) -> None:
+        self.admitted += 1
+        self.total_wait += wait
+        self.waits.append(wait)
+        if len(self.waits) > self.window:
+            self.waits.popleft()
+
+    def snapshot(self) -> Dict:
+        waits = sorted(self.waits)
+
+        def pct(q: float) -> float:
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            "admitted": self.admitted,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(self.total_wait / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "wait_ms_p50": pct(0.5),
+            "wait_ms_p95": pct(0.95),
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
+
+
+class PriorityLimiter:
+    """동시 실행 수 제한. 대기열은 priority가 큰 순, 같으면 먼저 온 순."""
+
+    def __init__(self, max_concurrent: int) -> None:
+        self.max_concurrent = max(1, max_concurrent)
+        self._active = 0
+        self._waiting: List[Tuple[int, int, threading.Event]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = LimiterStats()
+
+    def _wake_next(self) -> None:
+        # lock을 잡은 상태에서 호출
+        while self._waiting and self._active < self.max_concurrent:
+            _, _, event = heapq.heappop(self._waiting)
+            self._active += 1
+            event.set()
+
+    @contextmanager
+    def slot(self, priority: int = 0, timeout: Optional[float] = None) -> Iterator[float]:
+        """자리를 얻으면 대기 시간(초)을 넘겨준다. timeout이 지나면 QueueTimeout."""
+        started = time.monotonic()
+        with self._lock:
+            if self._active < self.max_concurrent and not self._waiting:
+                self._active += 1
+                event = None
+            else:
+                event = threading.Event()
+                heapq.heappush(self._waiting, (-priority, next(self._order), event))
+        if event is not None and not event.wait(timeout):
+            with self._lock:
+                # 타임아웃 직후에 자리를 받았으면 그대로 쓴다
+                if not event.is_set():
+                    self._waiting = [item for item in self._waiting if item[2] is not event]
+                    heapq.heapify(self._waiting)
+                    self.stats.timeouts += 1
+                    raise QueueTimeout(f"대기열 {timeout}s 초과")
+        wait = time.monotonic() - started
+        with self._lock:
+            self.stats.record(wait)
+        try:
+            yield wait
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._wake_next()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "active": self._active,
+                "queued": len(self._waiting),
+                "max_concurrent": self.max_concurrent,
+                **self.stats.snapshot(),
+            }
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class Coalescer:
+    """같은 키로 진행 중인 호출이 있으면 그 결과를 기다려서 같이 쓴다"""
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def run(self, key: str, fn: Callable[[], T], timeout: Optional[float] = None) -> T:
+        """timeout: 다른 호출 결과를 기다릴 최대 시간 (넘으면 QueueTimeout)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            if not call.done.wait(timeout):
+                raise QueueTimeout(f"진행 중인 같은 호출을 {timeout}s 안에 받지 못함")
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,229 @@
+"""
+대화가 진행되는 동안 누적하는 상태 (턴이 들어올 때마다 갱신, 조회는 O(1))
+
+- TopicTracker: 주제별 언급 횟수(사용자 발화 수)와 처음 나온 턴
+  턴마다 앞 대화 전체를 이어 붙여 주제 키워드를 다시 훑지 않는다.
+- RiskTrajectory: 사용자 턴별 위험 점수 계열의 통계 (최고점, 기울기, 구간별 턴 수, 구간이 바뀐 지점)
+  계열 자체는 들고 있지 않으므로 대화가 길어져도 크기/리포트 비용이 같다.
+둘 다 agent.ConversationTracker로 묶여 프로토콜 2 세션 기록(sessions.py)에 같이 저장되고, 다음 요청은 새 메시지만 더한다.
+
+turn = 대화 항목 위치 (1부터, AI 발화 포함) - EndReport.conversation_turns와 같은 기준
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 주제 키워드 (key_topics에 이 순서로 나온다)
+TOPIC_CUES = [
+    ("학교폭력/또래관계", ["괴롭", "따돌", "폭력", "때렸"]),
+    ("가정 문제", ["가족", "부모", "집"]),
+    ("학업 스트레스", ["성적", "공부", "시험", "학업"]),
+    ("정서적 어려움", ["우울", "외로", "불안"]),
+    ("자살 사고", ["죽", "자살", "끝내"]),
+]
+DEFAULT_TOPICS = ["일반 상담"]
+_TOPIC_ORDER = {topic: index for index, (topic, _) in enumerate(TOPIC_CUES)}
+
+# 위험 점수 구간: 이 점수 이상이면 해당 조치 (agent._next_action 기준)
+RISK_LEVELS = [(35, "주의환기"), (60, "전담자연계"), (80, "즉시대응")]
+BASE_ACTION = "일반대화"
+# 구간이 바뀐 지점은 최근 것만 이만큼 들고 있는다 (횟수는 전부 센다) - 세션 크기/리포트 비용이 대화 길이와 무관하게
+MAX_CHANGE_POINTS = 20
+
+
+def risk_level(score: int) -> int:
+    """0(일반대화) ~ len(RISK_LEVELS)"""
+    level = 0
+    for threshold, _ in RISK_LEVELS:
+        if score >= threshold:
+            level += 1
+    return level
+
+
+def level_action(level: int) -> str:
+    return RISK_LEVELS[level - 1][1] if level > 0 else BASE_ACTION
+
+
+def message_topics(text: str) -> List[str]:
+    """발화 하나에 나온 주제 (TOPIC_CUES 순서)"""
+    return [topic for topic, words in TOPIC_CUES if any(word in text for word in words)]
+
+
+@dataclass
+class TopicTracker:
+    # 주제 -> 그 주제가 나온 사용자 발화 수
+    counts: Dict[str, int] = field(default_factory=dict)
+    # 주제 -> 처음 나온 턴
+    first_turn: Dict[str, int] = field(default_factory=dict)
+    # 지금까지 본 대화 항목 수
+    turns: int = 0
+
+    @classmethod
+    def from_history(cls, pairs: Iterable[Tuple[str, str]]) -> "TopicTracker":
+        tracker = cls()
+        for role, content in pairs:
+            tracker.observe(role, content)
+        return tracker
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> Optional["TopicTracker"]:
+        """세션에 저장한 값에서 복원 (없거나 형식이 다르면 None)"""
+        if not isinstance(data, dict):
+            return None
+        try:
+            return cls(
+                counts={str(k): int(v) for k, v in data["counts"].items()},
+                first_turn={str(k): int(v) for k, v in data["first_turn"].items()},
+                turns=int(data["turns"]),
+            )
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None
+
+    def to_dict(self) -> Dict:
+        return {"counts": dict(self.counts), "first_turn": dict(self.first_turn), "turns": self.turns}
+
+    def observe(self, role: str, content: str) -> List[str]:
+        """대화 항목 하나를 더하고 이 발화에 나온 주제를 돌려준다"""
+        self.turns += 1
+        if role != "user" or not content:
+            return []
+        found = message_topics(content)
+        for topic in found:
+            self.counts[topic] = self.counts.get(topic, 0) + 1
+            self.first_turn.setdefault(topic, self.turns)
+        return found
+
+    def count(self, topic: str) -> int:
+        return self.counts.get(topic, 0)
+
+    def topics(self) -> List[str]:
+        """지금까지 나온 주제 (TOPIC_CUES 순서, 없으면 일반 상담)"""
+        if not self.counts:
+            return list(DEFAULT_TOPICS)
+        return [topic for topic, _ in TOPIC_CUES if topic in self.counts]
+
+    def ranked(self) -> List[str]:
+        """많이 나온 순 (같으면 먼저 나온 순, 없으면 일반 상담)"""
+        if not self.counts:
+            return list(DEFAULT_TOPICS)
+        return sorted(self.counts, key=lambda topic: (-self.counts[topic], self.first_turn[topic], _TOPIC_ORDER[topic]))
+
+    def stats(self) -> List[Dict]:
+        """리포트용 순위 목록 [{"topic", "count", "first_turn"}] (주제가 없으면 빈 목록)"""
+        if not self.counts:
+            return []
+        return [
+            {"topic": topic, "count": self.counts[topic], "first_turn": self.first_turn[topic]}
+            for topic in self.ranked()
+        ]
+
+
+_COUNTERS = ("count", "first", "last", "peak", "peak_turn", "sum_y", "sum_xy", "escalations", "de_escalations")
+
+
+@dataclass
+class RiskTrajectory:
+    # 점수가 들어온 사용자 턴 수 (기울기의 x는 1..count)
+    count: int = 0
+    first: int = 0
+    last: int = 0
+    peak: int = 0
+    peak_turn: int = 0
+    # 최소제곱 기울기용 누적합 (x의 합/제곱합은 count로 바로 계산)
+    sum_y: int = 0
+    sum_xy: int = 0
+    # 조치 이름 -> 그 구간 이상이었던 사용자 턴 수
+    above: Dict[str, int] = field(default_factory=dict)
+    # 구간이 바뀐 횟수
+    escalations: int = 0
+    de_escalations: int = 0
+    # 구간이 바뀐 최근 지점 [{"turn", "from_action", "to_action", "risk_score", "direction"}] (최대 MAX_CHANGE_POINTS)
+    changes: List[Dict] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> Optional["RiskTrajectory"]:
+        if not isinstance(data, dict):
+            return None
+        try:
+            return cls(
+                **{name: int(data[name]) for name in _COUNTERS},
+                above={str(k): int(v) for k, v in data["above"].items()},
+                changes=[dict(change) for change in data["changes"]],
+            )
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "first": self.first,
+            "last": self.last,
+            "peak": self.peak,
+            "peak_turn": self.peak_turn,
+            "sum_y": self.sum_y,
+            "sum_xy": self.sum_xy,
+            "escalations": self.escalations,
+            "de_escalations": self.de_escalations,
+            "above": dict(self.above),
+            "changes": [dict(change) for change in self.changes],
+        }
+
+    def observe(self, turn: int, score: int) -> None:
+        """turn번째 대화 항목(사용자 발화)의 위험 점수를 더한다"""
+        previous_level = risk_level(self.last) if self.count else None
+        self.count += 1
+        if self.count == 1:
+            self.first = score
+        if self.count == 1 or score > self.peak:
+            self.peak, self.peak_turn = score, turn
+        self.last = score
+        self.sum_y += score
+        self.sum_xy += self.count * score
+        level = risk_level(score)
+        for _, action in RISK_LEVELS[:level]:
+            self.above[action] = self.above.get(action, 0) + 1
+        if previous_level is not None and level != previous_level:
+            if level > previous_level:
+                self.escalations += 1
+            else:
+                self.de_escalations += 1
+            self.changes.append({
+                "turn": turn,
+                "from_action": level_action(previous_level),
+                "to_action": level_action(level),
+                "risk_score": score,
+                "direction": "escalation" if level > previous_level else "de-escalation",
+            })
+            if len(self.changes) > MAX_CHANGE_POINTS:
+                del self.changes[0]
+
+    @property
+    def slope(self) -> float:
+        """턴당 점수 변화 (최소제곱, 두 턴 미만이면 0)"""
+        n = self.count
+        if n < 2:
+            return 0.0
+        sum_x = n * (n + 1) / 2
+        sum_xx = n * (n + 1) * (2 * n + 1) / 6
+        return round((n * self.sum_xy - sum_x * self.sum_y) / (n * sum_xx - sum_x * sum_x), 2)
+
+    def report(self) -> Dict:
+        """종료 리포트용 요약 (EndReport.risk_trajectory)"""
+        return {
+            "turns": self.count,
+            "first_score": self.first,
+            "last_score": self.last,
+            "peak_score": self.peak,
+            "peak_turn": self.peak_turn,
+            "slope": self.slope,
+            "turns_at_or_above": {action: self.above.get(action, 0) for _, action in RISK_LEVELS},
+            "escalation_count": self.escalations,
+            "de_escalation_count": self.de_escalations,
+            "escalations": [_change_report(change) for change in self.changes if change["direction"] == "escalation"],
+            "de_escalations": [_change_report(change) for change in self.changes if change["direction"] != "escalation"],
+        }
+
+
+def _change_report(change: Dict) -> Dict:
+    return {key: change[key] for key in ("turn", "from_action", "to_action", "risk_score")}
@@ -0,0 +1,128 @@
+"""
+대화 기록(transcript)의 압축 표현
+요청 하나에서 main/agent/llm/context가 같은 Transcript를 나눠 쓴다 (턴 목록을 복사하지 않음).
+
+- role은 1바이트 코드(array 'b'), 내용은 문자열 리스트. 턴마다 ChatTurn(Pydantic 모델)과 __dict__를 두지 않는다
+- 덧붙이기만 한다 (append-only)
+- 역할별 위치 목록을 따로 들고 있어서 "최근 k개 사용자 발화" 같은 조회가 O(k)
+- turn.role / turn.content를 읽는 기존 코드를 위해 반복/인덱싱은 Turn(이름 있는 튜플)을 돌려준다
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+# role 문자열은 이 튜플의 상수만 쓴다 (턴마다 새 문자열을 들고 있지 않음)
+ROLES = ("user", "ai")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+
+class Turn(NamedTuple):
+    role: str
+    content: str
+
+
+def _role_code(role: str) -> int:
+    try:
+        return _ROLE_CODES[role]
+    except KeyError:
+        raise ValueError(f"알 수 없는 role: {role!r}") from None
+
+
+class Transcript:
+    __slots__ = ("_roles", "_contents", "_positions")
+
+    def __init__(self) -> None:
+        self._roles = array("b")
+        self._contents: List[str] = []
+        # 역할 코드별 턴 위치 (오름차순)
+        self._positions: Tuple[array, ...] = tuple(array("I") for _ in ROLES)
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[str, str]]) -> "Transcript":
+        transcript = cls()
+        for role, content in pairs:
+            transcript.append(role, content)
+        return transcript
+
+    @classmethod
+    def from_turns(cls, turns: Union["Transcript", Iterable[Any]]) -> "Transcript":
+        """Transcript면 그대로, ChatTurn/Turn 목록이나 {"role", "content"} dict 목록이면 새로 만든다"""
+        if isinstance(turns, Transcript):
+            return turns
+        transcript = cls()
+        for turn in turns:
+            if isinstance(turn, dict):
+                transcript.append(turn.get("role", "user"), turn.get("content") or "")
+            else:
+                transcript.append(turn.role, turn.content)
+        return transcript
+
+    def append(self, role: str, content: str) -> None:
+        code = _role_code(role)
+        self._positions[code].append(len(self._roles))
+        self._roles.append(code)
+        self._contents.append(content)
+
+    # ---- 시퀀스 ----
+    def __len__(self) -> int:
+        return len(self._roles)
+
+    def __iter__(self) -> Iterator[Turn]:
+        for code, content in zip(self._roles, self._contents):
+            yield Turn(ROLES[code], content)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Turn(ROLES[code], content) for code, content in zip(self._roles[index], self._contents[index])]
+        return Turn(ROLES[self._roles[index]], self._contents[index])
+
+    def __repr__(self) -> str:
+        return f"Transcript({len(self)} turns)"
+
+    def pairs(self) -> Iterator[Tuple[str, str]]:
+        for code, content in zip(self._roles, self._contents):
+            yield ROLES[code], content
+
+    def tail(self, window: int) -> Iterator[Tuple[str, str]]:
+        """마지막 window개 턴의 (role, content)"""
+        start = max(0, len(self._roles) - window)
+        for i in range(start, len(self._roles)):
+            yield ROLES[self._roles[i]], self._contents[i]
+
+    # ---- 역할별 뷰 ----
+    def count(self, role: str) -> int:
+        return len(self._positions[_role_code(role)])
+
+    def texts(self, role: str) -> List[str]:
+        """role 발화 전체 (순서대로)"""
+        contents = self._contents
+        return [contents[i] for i in self._positions[_role_code(role)]]
+
+    def last(self, role: str, k: int) -> List[str]:
+        """role 발화 중 마지막 k개 (오래된 것부터)"""
+        if k <= 0:
+            return []
+        contents = self._contents
+        return [contents[i] for i in self._positions[_role_code(role)][-k:]]
+
+    def recent(self, role: str, window: int) -> List[str]:
+        """마지막 window개 턴 가운데 role 발화 (history[-window:]를 role로 거른 것과 같음)"""
+        if window <= 0:
+            return []
+        start = len(self._roles) - window
+        positions = self._positions[_role_code(role)]
+        # 뒤에서부터 start 이상인 위치만 - O(결과 수)
+        i = len(positions)
+        while i > 0 and positions[i - 1] >= start:
+            i -= 1
+        contents = self._contents
+        return [contents[p] for p in positions[i:]]
+
+    # ---- 내보내기 ----
+    def to_pairs(self) -> List[List[str]]:
+        """세션 저장용 [[role, content], ...]"""
+        return [[role, content] for role, content in self.pairs()]
+
+    def to_dicts(self) -> List[Dict[str, str]]:
+        return [{"role": role, "content": content} for role, content in self.pairs()]
@@ -0,0 +1,226 @@
+"""
+서버 시작 시 예열 (lifespan 훅에서 호출)
+첫 요청이 ChromaDB 열기, 임베딩 모델 로딩, LLM SDK import/클라이언트 생성, 규칙 엔진 로딩을
+떠안지 않도록 시작할 때 한 번씩 합성 입력으로 돌려 둔다.
+
+- /health: 프로세스가 살아 있는지 (예열과 무관하게 항상 ok)
+- /ready:  예열이 끝났는지. 로드밸런서/오케스트레이터는 이것이 200일 때만 트래픽을 보낸다.
+
+환경 변수:
+    WARMUP              0이면 예열 생략 (바로 ready)
+    WARMUP_STRICT       1이면 실패한 단계가 있을 때 /ready가 503 (기본은 degraded로 200)
+    LLM_WARMUP_CALL     1이면 LLM에 max_tokens=1 호출까지 (기본: local/fake만, openai는 토큰 비용 때문에 생략)
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+from .metrics import STAGE_SECONDS
+
+WARMUP_MESSAGE = "요즘 학교 가기 너무 힘들어"
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    status: str  # ok | skipped | failed
+    seconds: float
+    detail: str = ""
+
+
+class Readiness:
+    """예열 진행 상태 (lifespan 스레드가 쓰고 /ready가 읽는다)"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: List[WarmupStep] = []
+
+    def begin(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self.finished_at = None
+            self.steps = []
+
+    def record(self, step: WarmupStep) -> None:
+        with self._lock:
+            self.steps.append(step)
+
+    def finish(self) -> None:
+        with self._lock:
+            self.finished_at = time.time()
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            if self.finished_at is None:
+                return False
+            if os.getenv("WARMUP_STRICT", "").lower() in ("1", "true", "yes"):
+                return all(step.status != "failed" for step in self.steps)
+            return True
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            steps = [asdict(step) for step in self.steps]
+            finished = self.finished_at is not None
+            started_at, finished_at = self.started_at, self.finished_at
+        if not finished:
+            status = "starting"
+        elif any(step["status"] == "failed" for step in steps):
+            status = "degraded"
+        else:
+            status = "ready"
+        return {
+            "status": status,
+            "warmup_seconds": round(finished_at - started_at, 3) if finished and started_at else None,
+            "steps": steps,
+        }
+
+
+readiness = Readiness()
+
+
+def _run_step(name: str, fn: Callable[[], Optional[str]]) -> WarmupStep:
+    """fn이 문자열을 돌려주면 detail, "skip:" 으로 시작하면 생략으로 기록"""
+    started = time.perf_counter()
+    try:
+        detail = fn() or ""
+        status = "ok"
+        if detail.startswith("skip:"):
+            status, detail = "skipped", detail[5:].strip()
+    except Exception as e:
+        status, detail = "failed", f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - started
+    STAGE_SECONDS.observe(elapsed, stage=f"warmup_{name}")
+    step = WarmupStep(name, status, round(elapsed, 4), detail)
+    readiness.record(step)
+    prefix = "[WARN]" if status == "failed" else "[INFO]"
+    print(f"{prefix} warmup {name}: {status} ({elapsed:.2f}s) {detail}".rstrip())
+    return step
+
+
+def _warm_rules() -> str:
+    from .agent import analyze_message, get_rule_engine, should_end_conversation
+    from .context import build_turn_context
+    from .schemas import ChatTurn
+
+    get_rule_engine()
+    history = [ChatTurn(role="ai", content="안녕, 오늘 어땠어?")]
+    ctx = build_turn_context(history, WARMUP_MESSAGE)
+    analysis = analyze_message(history, WARMUP_MESSAGE, ctx=ctx)
+    should_end_conversation(history, analysis.risk_score, analysis.emotional_distress, WARMUP_MESSAGE, ctx=ctx)
+    return f"risk_score={analysis.risk_score}"
+
+
+def _warm_prompt() -> str:
+    from .context import build_turn_context
+    from .llm import build_messages
+
+    ctx = build_turn_context([], WARMUP_MESSAGE)
+    messages = build_messages([], WARMUP_MESSAGE, ctx, ["(예열용 매뉴얼 청크)"])
+    return f"{len(messages)} messages"
+
+
+def _llm_call_enabled(backend_name: str) -> bool:
+    value = os.getenv("LLM_WARMUP_CALL")
+    if value is None:
+        return backend_name != "openai"
+    return value.lower() in ("1", "true", "yes")
+
+
+def _warm_llm() -> str:
+    from .llm import get_llm_gate
+    from .llm_backends import get_backend
+
+    # 백엔드 생성 = SDK import + 클라이언트(커넥션 풀) 생성
+    backend = get_backend()
+    get_llm_gate()
+    if backend is None:
+        return "skip: LLM 미설정 (규칙 응답만 사용)"
+    if not _llm_call_enabled(backend.name):
+        return f"{backend.label} client ready (호출 생략)"
+    backend.generate(
+        [{"role": "user", "content": WARMUP_MESSAGE}],
+        max_tokens=1,
+        timeout=float(os.getenv("LLM_WARMUP_TIMEOUT_SECONDS", "15")),
+        retries=0,
+    )
+    return f"{backend.label} call ok"
+
+
+def _warm_rag() -> str:
+    from .features import module_available, rag_enabled
+    from .rag import warm_up
+
+    if not rag_enabled():
+        return "skip: " + ("RAG_ENABLED=0" if module_available("chromadb") else "chromadb 미설치")
+    info = warm_up()
+    return f"{info['chunk_count']} chunks"
+
+
+def _warm_caches() -> str:
+    from .features import shadow_enabled
+    from .reply_cache import get_reply_cache
+    from .state import get_state_store
+
+    store = get_state_store()
+    cache = get_reply_cache()
+    shadow = None
+    if shadow_enabled():
+        from .scoring import get_shadow_scorer
+        shadow = get_shadow_scorer()
+    return f"state={store.name}, reply_cache={'on' if cache else 'off'}, shadow={'on' if shadow else 'off'}"
+
+
+def _start_notify() -> str:
+    from .notify import get_dispatcher
+
+    # 재시작 전에 남아 있던 pending 알림도 첫 위기 세션을 기다리지 않고 바로 이어서 전송
+    get_dispatcher().start()
+    return "dispatcher started"
+
+
+def _warm_search_index() -> str:
+    from .search import get_index
+
+    get_index()
+    return "built"
+
+
+WARMUP_STEPS = [
+    ("rules", _warm_rules),
+    ("prompt", _warm_prompt),
+    ("llm", _warm_llm),
+    ("rag", _warm_rag),
+    ("caches", _warm_caches),
+    ("notify", _start_notify),
+]
+
+
+def run_warmup() -> Dict:
+    """예열 단계를 차례로 실행 (한 단계가 실패해도 나머지는 계속)"""
+    readiness.begin()
+    if os.getenv("WARMUP", "1").lower() in ("0", "false", "no"):
+        readiness.record(WarmupStep("all", "skipped", 0.0, "WARMUP=0"))
+        readiness.finish()
+        return readiness.snapshot()
+    for name, fn in WARMUP_STEPS:
+        _run_step(name, fn)
+    readiness.finish()
+    snapshot = readiness.snapshot()
+    print(f"[INFO] warmup {snapshot['status']} in {snapshot['warmup_seconds']}s")
+    # 관리자 검색 색인은 채팅 트래픽과 무관하므로 ready 이후에 만든다
+    _run_step("search_index", _warm_search_index)
+    return snapshot
+
+
+def start_warmup() -> threading.Thread:
+    """백그라운드에서 예열 (그동안 /health는 응답하고 /ready는 503)"""
+    thread = threading.Thread(target=run_warmup, name="warmup", daemon=True)
+    thread.start()
+    return thread
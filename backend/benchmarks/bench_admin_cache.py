@@ -0,0 +1,124 @@
+"""
+관리자 대시보드 조회 비용 벤치마크
+임시 디렉터리에 합성 대화 N개를 만들고 /api/admin/conversations, 상세 조회를 TestClient로 잰다.
+
+- cold: 처음 열 때 (모든 파일을 읽음)
+- warm: 바뀐 게 없을 때 다시 열기 (렌더링 결과 재사용)
+- revalidate: 브라우저가 ETag로 확인 (304, 본문 없음)
+- after_new: 대화 하나가 새로 저장된 뒤 (바뀐 파일만 다시 읽음)
+- uncached: 요약 캐시 없이 전부 다시 읽기 (이전 방식)
+- detail: 긴 대화 상세의 원본/gzip 크기
+
+사용법:
+    cd backend
+    python benchmarks/bench_admin_cache.py [--conversations 2000] [--turns 40] [--repeat 20]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def _conversation(index: int, turns: int) -> Dict:
+    history = []
+    for turn in range(turns):
+        history.append({
+            "role": "user",
+            "content": f"{index}번 학생 {turn}번째 이야기: 요즘 학교 가기 싫고 친구 관계가 힘들어",
+            "analysis": {"emotional_distress": "중간", "suicide_signal": "없음", "risk_score": 30, "next_action": "주의환기"},
+        })
+        history.append({"role": "ai", "content": "그랬구나. 그때 기분이 어땠는지 조금 더 말해줄래?"})
+    return {
+        "timestamp": f"2026-01-01T00:{index // 60 % 60:02d}:{index % 60:02d}",
+        "date": "2026-01-01",
+        "time": f"00:{index // 60 % 60:02d}:{index % 60:02d}",
+        "history": history,
+        "analysis": {"emotional_distress": "중간", "suicide_signal": "없음", "risk_score": 30, "next_action": "주의환기"},
+        "end_report": {"summary": f"{index}번 대화 요약"},
+    }
+
+
+def _time_ms(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="관리자 조회 캐시 벤치마크")
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=40, help="대화당 사용자 턴 수")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="sori_admin_cache_")
+    os.chdir(workdir)
+    os.environ.update({"WARMUP": "0", "RAG_ENABLED": "0", "RISK_SHADOW": "0"})
+    storage_dir = Path("data/conversations")
+    storage_dir.mkdir(parents=True)
+    for index in range(args.conversations):
+        (storage_dir / f"20260101_{index:06d}.json").write_text(
+            json.dumps(_conversation(index, args.turns), ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+    # 방금 쓴 파일은 racy로 보고 기억하지 않으므로 mtime을 과거로
+    past = time.time() - 60
+    for path in list(storage_dir.iterdir()) + [storage_dir]:
+        os.utime(path, (past, past))
+
+    from fastapi.testclient import TestClient
+
+    from app import storage
+    from app.main import _admin_renders, app
+
+    client = TestClient(app)
+    url = "/api/admin/conversations"
+    results: Dict[str, object] = {"conversations": args.conversations, "turns": args.turns}
+
+    def uncached() -> None:
+        storage._summaries.clear()
+        storage.list_conversations()
+
+    results["uncached_ms"] = _time_ms(uncached, max(3, args.repeat // 4))
+    storage._summaries.clear()
+    _admin_renders._items.clear()
+    results["cold_ms"] = _time_ms(lambda: client.get(url), 1)
+    results["warm_ms"] = _time_ms(lambda: client.get(url), args.repeat)
+    response = client.get(url)
+    etag = response.headers["etag"]
+    results["list_bytes"] = len(response.content)
+    results["revalidate_ms"] = _time_ms(lambda: client.get(url, headers={"If-None-Match": etag}), args.repeat)
+    results["revalidate_status"] = client.get(url, headers={"If-None-Match": etag}).status_code
+
+    (storage_dir / "20260102_000000.json").write_text(json.dumps(_conversation(0, args.turns), ensure_ascii=False), encoding="utf-8")
+    past = time.time() - 30
+    os.utime(storage_dir / "20260102_000000.json", (past, past))
+    os.utime(storage_dir, (past, past))
+    results["after_new_ms"] = _time_ms(lambda: client.get(url), 1)
+
+    detail = f"{url}/20260101_000000.json"
+    raw = client.get(detail, headers={"Accept-Encoding": "identity"})
+    compressed = client.get(detail, headers={"Accept-Encoding": "gzip"})
+    results["detail_bytes"] = len(raw.content)
+    results["detail_gzip_bytes"] = int(compressed.headers.get("content-length", 0))
+    results["detail_warm_ms"] = _time_ms(lambda: client.get(detail), args.repeat)
+    results["render_cache"] = _admin_renders.stats()
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+일괄 재채점 동치성/속도 벤치마크
+
+app.batch.score_conversations(NumPy)와 턴마다 _estimate_*를 부르는 기존 방식을
+같은 합성 대화로 비교한다. 발화 경계에 걸친 키워드("죽고" + "싶어")도 섞는다.
+마지막으로 enrich_history_with_analysis + build_report(채팅 경로)로 만든 파일을 재채점했을 때
+턴별 analysis와 end_report(추이, risk_trajectory, 요약 포함)가 바뀌지 않는지 확인한다.
+
+사용법:
+    cd backend
+    python benchmarks/bench_batch.py [대화 수]
+"""
+from __future__ import annotations
+
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.agent import (  # noqa: E402
+    _estimate_distress,
+    _estimate_risk_score,
+    _estimate_suicide_signal,
+    _next_action,
+    build_report,
+    enrich_history_with_analysis,
+)
+from app.batch import (  # noqa: E402
+    DISTRESS_LEVELS,
+    NEXT_ACTIONS,
+    SUICIDE_SIGNALS,
+    _apply,
+    rescore_files,
+    score_conversations,
+)
+
+FRAGMENTS = [
+    "안녕", "오늘 학교에서", "너무 힘들어", "정말 불안하고 우울해", "친구가 따돌려", "괴롭힘 당해",
+    "외롭다", "짜증나", "죽고", "싶어", "죽", "고싶어", "자살", "사라지고 싶어", "의미없어", "그만 살",
+    "끝내고", "싶다", "목숨", "진짜", "계속", "몰라", "싫어", "그냥", "헛소문", "무시당해", "", "  ",
+]
+
+
+def build_conversations(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        [rng.choice(FRAGMENTS) + rng.choice(["", " ", "..."]) for _ in range(rng.randint(1, 12))]
+        for _ in range(count)
+    ]
+
+
+def reference(conversations):
+    rows = []
+    for turns in conversations:
+        texts = []
+        for turn in turns:
+            if not turn:
+                continue
+            texts.append(turn)
+            full = "".join(texts).replace(" ", "")
+            d = _estimate_distress(full)
+            s = _estimate_suicide_signal(full)
+            r = _estimate_risk_score(d, s)
+            rows.append((d, s, r, _next_action(r)))
+    return rows
+
+
+def vectorised(conversations):
+    scored = score_conversations([[t for t in turns if t] for turns in conversations])
+    return [
+        (DISTRESS_LEVELS[d], SUICIDE_SIGNALS[s], int(r), NEXT_ACTIONS[a])
+        for d, s, r, a in zip(scored.distress, scored.signal, scored.risk, scored.action)
+    ]
+
+
+def _stored(turns):
+    """채팅 경로와 같은 방식으로 만든 저장 파일 내용 (마지막 턴에서 종료 리포트)"""
+    history = []
+    for turn in turns:
+        history += [{"role": "user", "content": turn}, {"role": "ai", "content": "응"}]
+    enriched = enrich_history_with_analysis(history, "", include_current=False)
+    analyses = [item["analysis"] for item in enriched if "analysis" in item]
+    latest = analyses[-1] if analyses else {"risk_score": 10, "emotional_distress": "낮음", "suicide_signal": "없음"}
+    report = build_report(history[:-1], latest["risk_score"], latest["emotional_distress"], latest["suicide_signal"])
+    return {
+        "history": enriched,
+        "analysis": {key: latest[key] for key in ("emotional_distress", "suicide_signal", "risk_score", "next_action")} if analyses else {},
+        "end_report": report.model_dump(),
+    }
+
+
+def check_store_roundtrip(conversations) -> int:
+    """저장 경로(enrich + build_report)로 만든 파일은 재채점해도 바뀌지 않아야 한다."""
+    sample = conversations[:500]
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, turns in enumerate(sample):
+            path = Path(tmp) / f"{i}.json"
+            path.write_text(json.dumps(_stored(turns), ensure_ascii=False), encoding="utf-8")
+            paths.append(str(path))
+        stats = rescore_files(paths, dry_run=True)
+
+    # end_report만 따로 비교 (어느 필드가 바뀌었는지 보이도록)
+    stored = [json.loads(json.dumps(_stored(turns), ensure_ascii=False)) for turns in sample]
+    scored = score_conversations([[t for t in turns if t] for turns in sample])
+    changed_reports = set()
+    for index, data in enumerate(stored):
+        before = json.loads(json.dumps(data["end_report"]))
+        _apply(data, scored, index)
+        changed_reports.update(key for key in before if before[key] != data["end_report"].get(key))
+    print(
+        f"store round-trip: {stats['files']} files, {stats['changed_files']} changed files, "
+        f"{stats['changed_turns']} changed turns, end_report fields changed: {sorted(changed_reports) or 'none'}"
+    )
+    return stats["changed_files"] + len(changed_reports)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    conversations = build_conversations(count)
+
+    started = time.perf_counter()
+    expected = reference(conversations)
+    reference_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    got = vectorised(conversations)
+    vector_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(expected, got) if a != b) + abs(len(expected) - len(got))
+    print(f"parity: {len(expected) - mismatches}/{len(expected)} turns identical")
+    print(f"[per-turn python] {len(expected) / reference_seconds:,.0f} turns/s")
+    print(f"[numpy batch]     {len(got) / vector_seconds:,.0f} turns/s")
+    changed = check_store_roundtrip(conversations)
+    sys.exit(1 if mismatches or changed else 0)
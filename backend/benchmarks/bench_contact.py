@@ -0,0 +1,166 @@
+"""
+연락처 추출 정밀도/속도 벤치마크
+
+기존 정규식(r'\\d{10,11}', r'[가-힣]{2,4}|[a-zA-Z]{2,10}')과
+app.contact.extract_contact_info를 같은 코퍼스로 비교한다.
+
+사용법:
+    cd backend
+    python benchmarks/bench_contact.py
+"""
+from __future__ import annotations
+
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.contact import extract_contact_info  # noqa: E402
+
+# (AI가 이름/전화번호를 물어본 직후 학생 메시지, 연락처 제공 여부)
+CORPUS = [
+    ("01012345678", True),
+    ("010-1234-5678", True),
+    ("010 1234 5678", True),
+    ("김민수 01012345678", True),
+    ("김민수", True),
+    ("이름은 김민수야", True),
+    ("내 이름은 민수야", True),
+    ("저는 박지현입니다", True),
+    ("민수라고 해", True),
+    ("김은지 010-9876-5432", True),
+    ("남궁민 이야", True),
+    ("minsu", True),
+    ("my name is Jenny", True),
+    ("02-123-4567", True),
+    ("번호는 010.5555.1234 이야", True),
+    # 두 글자 이름 (단독, 이름 밝힘, 서술격 조사)
+    ("민수", True),
+    ("이름은 지민", True),
+    ("나는 지민", True),
+    ("지민이야", True),
+    ("하준이에요", True),
+    ("민수야", True),
+    ("이름은 수아야", True),
+    ("이름은 민준이", True),
+    ("싫어", False),
+    ("안돼요", False),
+    ("몰라", False),
+    ("아니야 괜찮아", False),
+    ("왜 알려줘야 해?", False),
+    ("말하기 싫어", False),
+    ("이름은 말하기 싫어", False),
+    ("무서워", False),
+    ("그냥 얘기만 할래", False),
+    ("정말 힘들어", False),
+    ("나는 너무 힘들어", False),
+    ("전화는 하지 마", False),
+    ("어떡해", False),
+    ("도와줘", False),
+    ("지금은 안돼", False),
+    ("ok", False),
+    ("부모님한테 말하지 마", False),
+    ("그럼 어떻게 되는데?", False),
+    ("선생님한테 연락하는 거야?", False),
+    ("죽고 싶어", False),
+    ("나중에 할게", False),
+    # 조사/호칭으로 끝나는 말, 성씨 글자로 시작하는 흔한 말
+    ("경찰에", False),
+    ("선생님께", False),
+    ("민준이", False),
+    ("민준이가 때렸어", False),
+    ("엄마한테", False),
+    ("나도 몰라", False),
+    ("진짜 싫어", False),
+    ("정말", False),
+    ("안돼", False),
+    ("하지 마", False),
+    ("나는 정말 힘들어", False),
+    ("나는 혼자야", False),
+    # 다른 말 안에 든 "난"/"나는" (장난, 화난) - 단어 시작에서만 이름 밝힘으로 본다
+    ("장난 아니야", False),
+    ("화난 상태야", False),
+    # 거절/금지/부정 표현, 동사 어간
+    ("하지마", False),
+    ("오지마", False),
+    ("부르지마", False),
+    ("신경꺼", False),
+    ("노노", False),
+    ("절대 안됨", False),
+    ("전화하면 안돼", False),
+    ("하기 싫음", False),
+    ("이따", False),
+    ("경찰에 신고할거야", False),
+]
+# 추출한 이름 값까지 확인
+NAME_CASES = [
+    ("민수", "민수"),
+    ("이름은 지민", "지민"),
+    ("나는 지민", "지민"),
+    ("지민이야", "지민"),
+    ("하준이에요", "하준"),
+    ("이름은 민준이", "민준"),
+    ("이름은 김민수야", "김민수"),
+    ("김민수 01012345678", "김민수"),
+    ("하지원", "하지원"),
+    ("나는 신하늘이야", "신하늘"),
+]
+
+_LEGACY_PHONE = re.compile(r"\d{10,11}")
+_LEGACY_NAME = re.compile(r"[가-힣]{2,4}|[a-zA-Z]{2,10}")
+
+
+def legacy_provided(message: str) -> bool:
+    return bool(re.search(_LEGACY_PHONE, message)) or bool(re.search(_LEGACY_NAME, message))
+
+
+def new_provided(message: str) -> bool:
+    return extract_contact_info(message).provided
+
+
+def _report(name: str, predict) -> None:
+    tp = fp = fn = tn = 0
+    misses = []
+    for message, expected in CORPUS:
+        got = predict(message)
+        if got and expected:
+            tp += 1
+        elif got and not expected:
+            fp += 1
+            misses.append(f"FP {message!r}")
+        elif expected:
+            fn += 1
+            misses.append(f"FN {message!r}")
+        else:
+            tn += 1
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    print(f"[{name}] precision={precision:.3f} recall={recall:.3f} (tp={tp} fp={fp} fn={fn} tn={tn})")
+    for miss in misses:
+        print(f"    {miss}")
+
+
+def _timing(name: str, predict, number: int = 2000) -> None:
+    messages = [m for m, _ in CORPUS]
+    seconds = timeit.timeit(lambda: [predict(m) for m in messages], number=number)
+    per_call_us = seconds / (number * len(messages)) * 1e6
+    print(f"[{name}] {per_call_us:.2f} us/message")
+
+
+def _check_names() -> bool:
+    wrong = [(message, expected, extract_contact_info(message).name) for message, expected in NAME_CASES]
+    wrong = [row for row in wrong if row[1] != row[2]]
+    print(f"[names] {len(NAME_CASES) - len(wrong)}/{len(NAME_CASES)} exact")
+    for message, expected, got in wrong:
+        print(f"    {message!r}: expected {expected!r}, got {got!r}")
+    return not wrong
+
+
+if __name__ == "__main__":
+    _report("legacy", legacy_provided)
+    _report("extract_contact_info", new_provided)
+    _check_names()
+    _timing("legacy", legacy_provided)
+    _timing("extract_contact_info", new_provided)
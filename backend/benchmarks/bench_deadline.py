@@ -0,0 +1,96 @@
+"""
+꼬리 지연이 있는 업스트림에서 generate_reply 지연 분포
+mock_openai_server를 15% 확률로 6초 걸리게 띄우고
+1) deadline 없음 2) deadline 2초 3) deadline 2초 + 0.8초 뒤 hedge
+의 p50/p95/p99와 LLM 응답 비율(나머지는 규칙 응답)을 비교한다.
+4) 회복: 느린 표본(예산 초과)으로 p95가 예산을 넘은 뒤 업스트림이 빨라졌을 때
+   probe 한 번으로 LLM 응답이 다시 나오는지 본다 (안 나오면 재시작 전까지 규칙 응답만 나간다).
+
+사용법:
+    cd backend
+    python benchmarks/bench_deadline.py [요청 수]
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_openai_server import start_mock_server  # noqa: E402
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(requests: int, budget, hedge_after: float) -> dict:
+    import app.llm as llm
+    from app.deadline import Deadline
+
+    os.environ["LLM_HEDGE_AFTER_SECONDS"] = str(hedge_after)
+    llm._gate = None  # 설정을 바꿔서 다시 만든다
+
+    def one(i: int):
+        started = time.perf_counter()
+        deadline = Deadline(budget) if budget else None
+        reply = llm.generate_reply([], f"오늘 있었던 일 {i}", deadline=deadline)
+        return time.perf_counter() - started, reply is not None
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(one, range(requests)))
+    latencies = [r[0] for r in results]
+    return {
+        "p50_s": round(percentile(latencies, 0.5), 2),
+        "p95_s": round(percentile(latencies, 0.95), 2),
+        "p99_s": round(percentile(latencies, 0.99), 2),
+        "llm_answered": f"{sum(1 for r in results if r[1])}/{requests}",
+        "gate": {k: v for k, v in llm.get_llm_gate().stats().items() if k in ("hedged", "hedge_wins", "deadline_exceeded", "skipped_budget", "probes")},
+    }
+
+
+def run_recovery(requests: int, budget: float, slow_samples: int = 30) -> dict:
+    """p95가 예산을 넘은 상태(느린 표본 slow_samples개)에서 빠른 업스트림으로 순서대로 요청"""
+    import app.llm as llm
+    from app.deadline import Deadline
+
+    os.environ["LLM_HEDGE_AFTER_SECONDS"] = "0"
+    os.environ["LLM_PROBE_INTERVAL_SECONDS"] = "10"
+    llm._gate = None
+    gate = llm.get_llm_gate()
+    for _ in range(slow_samples):
+        # deadline 초과는 예산만큼으로 기록된다
+        gate.latency.record(budget)
+    answered = [llm.generate_reply([], f"회복 확인 {i}", deadline=Deadline(budget)) is not None for i in range(requests)]
+    return {
+        "llm_answered": f"{sum(answered)}/{requests}",
+        "first_answer_at": answered.index(True) + 1 if any(answered) else None,
+        "gate": {k: v for k, v in gate.stats().items() if k in ("skipped_budget", "probes", "probe_recovered")},
+    }
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    server, state = start_mock_server(max_concurrent=100, rate_per_minute=100000, latency=0.3, slow_fraction=0.15, slow_latency=6.0)
+    os.environ["OPENAI_API_KEY"] = "test"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["REPLY_CACHE"] = "0"
+    os.environ["LLM_P95_PRIOR_SECONDS"] = "1"
+    # 동시성/속도 제한은 bench_llm_burst에서 따로 본다
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", "32")
+    os.environ.setdefault("LLM_RATE_PER_MINUTE", "100000")
+
+    print(f"[no deadline]        {run(requests, None, 0)}")
+    print(f"[deadline 2s]        {run(requests, 2.0, 0)}")
+    print(f"[deadline 2s, hedge] {run(requests, 2.0, 0.8)}")
+    state.slow_fraction = 0.0
+    recovery = run_recovery(20, 2.0)
+    print(f"[recovery]           {recovery}")
+    if recovery["first_answer_at"] != 1:
+        print("[ERR] p95가 예산을 넘은 뒤 probe가 LLM을 부르지 못함")
+    server.shutdown()
@@ -0,0 +1,132 @@
+"""
+저장용 history 구성 벤치마크: 이전 방식(중복 제거 2번 + 사용자 턴마다 ChatTurn 슬라이스로 주제 추출) vs 단일 패스
+
+1) 동치성: 무작위 대화(연속 중복, 빈 발화, 발화 경계에 걸친 키워드 포함)에서 저장 history와 직전 next_action이 같은지
+2) 요청 한 번의 할당: peak 메모리, 새로 잡힌 블록 수 (tracemalloc), 평균 시간
+
+사용법:
+    cd backend
+    python benchmarks/bench_enrich.py [--turns 200] [--cases 2000] [--repeat 20]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.agent import iter_enriched_history  # noqa: E402
+from app.transcript import Transcript  # noqa: E402
+from legacy_enrich import legacy_save_history  # noqa: E402
+
+# 키워드를 둘로 쪼갠 조각("죽고" + "싶어")도 섞어서 발화 경계 처리를 확인한다
+USER_MESSAGES = [
+    "안녕", "요즘 학교 가기 싫어", "친구들이 나만 빼고 놀아", "시험 때문에 잠을 못 자", "엄마랑 또 싸웠어",
+    "너무 힘들어", "불안하고 우울해", "따돌림 당해", "죽고", "싶어", "죽", "고싶어", "자", "살", "의미", "없어",
+    "사라지고 싶", "진짜", "외롭다", "집에 가기 싫어", "성적이 떨어졌어", "끝내", "고 싶어", "괴롭", "힘", "들", "",
+]
+AI_MESSAGES = ["그랬구나. 그때 기분이 어땠어?", "많이 속상했겠다. 조금 더 말해줄래?", "말해줘서 고마워. 지금은 좀 어때?"]
+
+
+def single_pass(history: Transcript, message: str, reply: str) -> Tuple[List[Dict], Optional[str]]:
+    """main._chat 저장 경로와 같은 방식"""
+    turns = chain(history.pairs(), (("user", message),) if message else (), (("ai", reply),))
+    final_history: List[Dict] = []
+    previous_action = last_action = None
+    for item in iter_enriched_history(turns):
+        turn_analysis = item.get("analysis")
+        if turn_analysis:
+            previous_action, last_action = last_action, turn_analysis.get("next_action")
+        final_history.append(item)
+    return final_history, previous_action
+
+
+def random_case(rng: random.Random) -> Tuple[List[Tuple[str, str]], str, str]:
+    pairs = []
+    for _ in range(rng.randint(0, 30)):
+        role = rng.choice(["user", "user", "ai"])
+        content = rng.choice(USER_MESSAGES if role == "user" else AI_MESSAGES)
+        pairs.append((role, content))
+        if rng.random() < 0.1:
+            pairs.append((role, content))
+    message = rng.choice(USER_MESSAGES)
+    if message and rng.random() < 0.3:
+        pairs.append(("user", message))
+    reply = rng.choice(AI_MESSAGES)
+    if rng.random() < 0.05:
+        pairs.append(("ai", reply))
+    return pairs, message, reply
+
+
+def make_pairs(turns: int) -> List[Tuple[str, str]]:
+    long_lines = [line for line in USER_MESSAGES if len(line) > 3]
+    pairs = []
+    for i in range(turns):
+        pairs.append(("user", f"{long_lines[i % len(long_lines)]} ({i})"))
+        pairs.append(("ai", f"{AI_MESSAGES[i % len(AI_MESSAGES)]} ({i})"))
+    return pairs
+
+
+def request_allocations(handle: Callable[[], object], repeat: int) -> Dict:
+    handle()
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    before = tracemalloc.take_snapshot()
+    result = handle()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(s.count_diff for s in after.compare_to(before, "filename") if s.count_diff > 0)
+    del result
+    started = time.perf_counter()
+    for _ in range(repeat):
+        handle()
+    return {
+        "peak_kb": round((peak - base) / 1024, 1),
+        "new_blocks": blocks,
+        "ms_per_request": round((time.perf_counter() - started) / repeat * 1000, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="저장용 history 단일 패스 벤치마크")
+    parser.add_argument("--turns", type=int, default=200, help="사용자 턴 수 (AI 응답까지 두 배)")
+    parser.add_argument("--cases", type=int, default=2000, help="동치성 확인용 무작위 대화 수")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(7)
+    mismatches = 0
+    for _ in range(args.cases):
+        pairs, message, reply = random_case(rng)
+        legacy = legacy_save_history([{"role": r, "content": c} for r, c in pairs], message, reply)
+        if single_pass(Transcript.from_pairs(pairs), message, reply) != legacy:
+            mismatches += 1
+
+    pairs = make_pairs(args.turns)
+    message, reply = "오늘도 학교에서 힘들었어", "그랬구나. 조금 더 말해줄래?"
+    history = Transcript.from_pairs(pairs)
+    result = {
+        "parity": f"{args.cases - mismatches}/{args.cases}",
+        "turns": len(pairs) + 2,
+        "legacy": request_allocations(lambda: legacy_save_history(history.to_dicts(), message, reply), args.repeat),
+        "single_pass": request_allocations(lambda: single_pass(history, message, reply), args.repeat),
+        "saved_bytes": len(json.dumps(single_pass(history, message, reply)[0], ensure_ascii=False).encode("utf-8")),
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0 if mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
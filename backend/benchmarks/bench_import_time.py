@@ -0,0 +1,158 @@
+"""
+시작 시간 회귀 벤치마크 (python -X importtime 기반)
+새 인터프리터에서 모듈 import / CLI 실행을 여러 번 재고 중앙값을 JSON으로 남긴다.
+
+- import app.main    서버 프로세스 콜드 스타트 (FastAPI 자체가 대부분)
+- import app.rag     RAG 모듈 (chromadb는 클라이언트를 열 때만 import되어야 함)
+- init_rag_db.py --info
+- 무거운 선택 의존성(chromadb, openai, numpy 등)이 import 시점에 딸려오면 실패로 본다
+
+사용법:
+    cd backend
+    python benchmarks/bench_import_time.py [--runs 5] [--budget-ms 1000]
+        [--compare benchmarks/results/import_xxx.json] [--fail-on-regression 0.2]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_TARGETS = ["app.main", "app.rag", "app.llm"]
+CLI_TARGETS = {"init_rag_db --info": [sys.executable, "init_rag_db.py", "--info"]}
+# import 시점에 불러오면 안 되는 모듈 (기능을 처음 쓸 때만)
+HEAVY_MODULES = ("chromadb", "onnxruntime", "openai", "numpy", "torch", "sentence_transformers")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """-X importtime 출력 → [(모듈, 깊이, self_us, cumulative_us)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure_import(module: str, runs: int) -> Dict:
+    walls, cumulatives = [], []
+    rows: List[Tuple[str, int, int, int]] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=BACKEND_DIR, capture_output=True, text=True,
+        )
+        walls.append((time.perf_counter() - started) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} 실패:\n{proc.stderr[-2000:]}")
+        rows = parse_importtime(proc.stderr)
+        cumulatives.append(next((r[3] for r in rows if r[0] == module), 0) / 1000)
+    # 마지막 실행 기준 최상위 import별 누적 시간 (어디서 느린지 보기용)
+    top = sorted((r for r in rows if r[1] <= 1), key=lambda r: r[3], reverse=True)[:10]
+    loaded = {r[0].split(".")[0] for r in rows}
+    return {
+        "wall_ms": round(statistics.median(walls), 1),
+        "import_ms": round(statistics.median(cumulatives), 1),
+        "top_imports_ms": {name: round(cumulative / 1000, 1) for name, _, _, cumulative in top},
+        "heavy_modules": sorted(m for m in HEAVY_MODULES if m in loaded),
+    }
+
+
+def measure_cli(command: List[str], runs: int) -> Dict:
+    walls = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+        walls.append((time.perf_counter() - started) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(command)} 실패:\n{proc.stderr[-2000:]}")
+    return {"wall_ms": round(statistics.median(walls), 1)}
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> bool:
+    ok = True
+    for name, current in result["targets"].items():
+        before = baseline.get("targets", {}).get(name)
+        if not before:
+            continue
+        change = (current["wall_ms"] - before["wall_ms"]) / max(before["wall_ms"], 1e-9)
+        mark = "REGRESSION" if change > tolerance else "ok"
+        ok = ok and change <= tolerance
+        print(f"    {name:22s} {before['wall_ms']:>8}ms -> {current['wall_ms']:>8}ms ({change:+.0%}) {mark}")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="backend import/시작 시간 측정")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000, help="대상별 wall 시간 상한 (넘으면 종료 코드 1)")
+    parser.add_argument("--out", type=Path, help="결과 JSON 경로 (기본 benchmarks/results/import_<commit>_<시각>.json)")
+    parser.add_argument("--compare", type=Path, help="비교할 이전 결과 JSON")
+    parser.add_argument("--fail-on-regression", type=float, default=0.2, help="이 비율보다 느려지면 종료 코드 1")
+    args = parser.parse_args(argv)
+
+    commit = _git_commit()
+    targets: Dict[str, Dict] = {}
+    for module in IMPORT_TARGETS:
+        targets[f"import {module}"] = measure_import(module, args.runs)
+    for name, command in CLI_TARGETS.items():
+        targets[name] = measure_cli(command, args.runs)
+    result = {
+        "commit": commit,
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "targets": targets,
+    }
+
+    out = args.out or BACKEND_DIR / "benchmarks" / "results" / f"import_{commit or 'nogit'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    failed = False
+    for name, stats in targets.items():
+        over = stats["wall_ms"] > args.budget_ms
+        heavy = stats.get("heavy_modules") or []
+        failed = failed or over or bool(heavy)
+        line = f"    {name:22s} wall {stats['wall_ms']:>8}ms"
+        if "import_ms" in stats:
+            line += f"  import {stats['import_ms']:>8}ms"
+        if heavy:
+            line += f"  [ERR] heavy: {', '.join(heavy)}"
+        if over:
+            line += f"  [ERR] > {args.budget_ms:.0f}ms"
+        print(line)
+    print(f"[INFO] saved {out}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if not compare(result, baseline, args.fail_on_regression):
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+교실 몰림 재현: 학생 30명이 동시에 첫 메시지를 보낼 때 LLM 응답 성공률
+mock_openai_server(동시 4개, 넘으면 429)를 띄우고
+1) 제한 없이 OpenAI 클라이언트를 바로 부르는 경우
+2) generate_reply (동시성 제한 + 속도 제한 + 중복 합치기)
+를 비교한다. 일부 학생은 같은 메시지를 보내고, 일부는 위험 점수가 높다.
+
+사용법:
+    cd backend
+    python benchmarks/bench_llm_burst.py [학생 수]
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_openai_server import start_mock_server  # noqa: E402
+
+MESSAGES = ["안녕", "오늘 학교 가기 싫어", "시험 망했어", "친구랑 싸웠어", "심심해"]
+
+
+def run_burst(students: int, call) -> dict:
+    results = [None] * students
+    latencies = [0.0] * students
+    barrier = threading.Barrier(students)
+
+    def student(i: int) -> None:
+        barrier.wait()
+        started = time.perf_counter()
+        results[i] = call(i)
+        latencies[i] = time.perf_counter() - started
+
+    threads = [threading.Thread(target=student, args=(i,)) for i in range(students)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    high = [latencies[i] for i in range(students) if i % 5 == 0]
+    return {
+        "answered": sum(1 for r in results if r),
+        "seconds": round(elapsed, 2),
+        "high_risk_avg_s": round(sum(high) / len(high), 2) if high else 0.0,
+        "all_avg_s": round(sum(latencies) / students, 2),
+    }
+
+
+if __name__ == "__main__":
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    server, state = start_mock_server(max_concurrent=4, rate_per_minute=600, latency=0.3)
+    os.environ["OPENAI_API_KEY"] = "test"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["REPLY_CACHE"] = "0"
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", "4")
+
+    from openai import OpenAI  # noqa: E402
+
+    from app.llm import generate_reply, get_llm_gate  # noqa: E402
+
+    def direct(i: int):
+        try:
+            response = OpenAI().chat.completions.create(
+                model="mock", messages=[{"role": "user", "content": MESSAGES[i % len(MESSAGES)] + str(i)}], timeout=30.0
+            )
+            return response.choices[0].message.content
+        except Exception:
+            return None
+
+    def gated(i: int):
+        # 5명 중 1명은 위험 점수가 높은 세션, 같은 메시지는 합쳐진다
+        return generate_reply([], MESSAGES[i % len(MESSAGES)], priority=80 if i % 5 == 0 else 10)
+
+    print(f"[unbounded]  {run_burst(students, direct)}  server={dict(state.counts)}")
+    state.counts.clear()
+    print(f"[gated]      {run_burst(students, gated)}  server={dict(state.counts)}")
+    state.counts.clear()
+
+    def gated_distinct(i: int):
+        return generate_reply([], MESSAGES[i % len(MESSAGES)] + str(i), priority=80 if i % 5 == 0 else 10)
+
+    print(f"[gated, all distinct] {run_burst(students, gated_distinct)}  server={dict(state.counts)}")
+    print(f"[gate stats] {get_llm_gate().stats()}")
+    server.shutdown()
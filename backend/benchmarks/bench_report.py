@@ -0,0 +1,94 @@
+"""
+종료 리포트 비용 벤치마크: 누적 상태(ConversationTracker) vs 종료 시점에 history 전체를 다시 훑기
+
+1) 동치성: 매 턴 세션처럼 to_dict → from_dict로 저장/복원하며 누적한 상태가 history로 한 번에 만든 상태와 같은지,
+   두 방식으로 만든 리포트가 같은지
+2) 대화 길이별 리포트 생성 시간 (누적 상태는 길이와 무관해야 한다)
+
+사용법:
+    cd backend
+    python benchmarks/bench_report.py [--turns 50,200,800] [--repeat 200]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.agent import ConversationTracker, analyze_message, build_report  # noqa: E402
+from app.transcript import Transcript  # noqa: E402
+
+USER_LINES = [
+    "요즘 학교 가기 싫어", "친구들이 나만 빼고 놀아", "시험 때문에 잠을 못 자", "엄마랑 또 싸웠어",
+    "너무 힘들고 불안해", "다 의미없어", "얘기하니까 좀 나아", "그냥 그래",
+]
+AI_LINES = ["그랬구나. 그때 기분이 어땠어?", "많이 속상했겠다. 조금 더 말해줄래?", "말해줘서 고마워. 지금은 좀 어때?"]
+
+
+def make_pairs(turns: int) -> List[Tuple[str, str]]:
+    pairs = []
+    for i in range(turns):
+        pairs.append(("user", f"{USER_LINES[i % len(USER_LINES)]} ({i})"))
+        pairs.append(("ai", f"{AI_LINES[i % len(AI_LINES)]} ({i})"))
+    return pairs
+
+
+def session_tracker(pairs: List[Tuple[str, str]]) -> ConversationTracker:
+    """프로토콜 2처럼 턴마다 저장/복원하면서 누적"""
+    tracker = ConversationTracker()
+    for role, content in pairs:
+        tracker = ConversationTracker.from_dict(json.loads(json.dumps(tracker.to_dict(), ensure_ascii=False)))
+        tracker.observe(role, content)
+    return tracker
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="종료 리포트 누적 상태 벤치마크")
+    parser.add_argument("--turns", default="50,200,800", help="사용자 턴 수 목록 (쉼표 구분)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    ok = True
+    rows = []
+    for turns in [int(value) for value in args.turns.split(",")]:
+        pairs = make_pairs(turns)
+        # 마지막 사용자 발화까지 (종료 요청 시점)
+        history = Transcript.from_pairs(pairs[:-1])
+        analysis = analyze_message(history, pairs[-2][1])
+        facts = (analysis.risk_score, analysis.emotional_distress, analysis.suicide_signal)
+
+        tracker = session_tracker(pairs[:-1])
+        same_state = tracker == ConversationTracker.from_history(history.pairs()) and tracker.turns == len(history)
+        same_report = build_report(history, *facts, tracker) == build_report(history, *facts)
+        ok = ok and same_state and same_report
+
+        timings = {}
+        for name, fn in (
+            ("tracker", lambda: build_report(history, *facts, tracker)),
+            ("full_pass", lambda: build_report(history, *facts)),
+        ):
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                fn()
+            timings[name] = round((time.perf_counter() - started) / args.repeat * 1e6, 1)
+        rows.append({
+            "turns": len(history),
+            "same_state": same_state,
+            "same_report": same_report,
+            "tracker_us": timings["tracker"],
+            "full_pass_us": timings["full_pass"],
+            "session_state_bytes": len(json.dumps(tracker.to_dict(), ensure_ascii=False).encode("utf-8")),
+        })
+
+    print(json.dumps(rows, ensure_ascii=False, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
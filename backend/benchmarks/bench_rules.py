@@ -0,0 +1,120 @@
+"""
+규칙 엔진 동치성/속도 벤치마크
+
+규칙 엔진(app.agent._compose_reply)과 전환 전 if-chain(legacy_compose.py)에
+같은 대화를 넣어 응답이 모두 같은지 확인하고, 턴당 처리 시간을 비교한다.
+대화는 두 가지로 만든다.
+  - self-play: AI 턴에 실제 응답을 넣어가며 이어가는 대화 (반복 방지/번갈아 쓰기 분기 확인)
+  - random facts: distress/suicide_signal/risk_score를 임의로 줘서 모든 분기를 고르게 확인
+
+사용법:
+    cd backend
+    python benchmarks/bench_rules.py [대화 수]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.agent import (  # noqa: E402
+    _estimate_distress,
+    _estimate_risk_score,
+    _estimate_suicide_signal,
+    get_rule_engine,
+)
+from app.context import build_turn_context  # noqa: E402
+from app.schemas import ChatTurn  # noqa: E402
+from legacy_compose import legacy_compose_reply  # noqa: E402
+
+USER_MESSAGES = [
+    "안녕", "하이", "hi", "힘들어", "너무 힘들고 불안하고 우울해", "친구가 때렸어", "매일 맞아",
+    "계속 괴롭혀", "왕따 당해", "따돌림 당하고 있어", "죽고 싶어", "자살하고 싶어", "사라지고 싶어",
+    "의미없어", "싫어", "몰라", "없어", "아니야", "안돼", "응 해줘", "좋아", "괜찮아", "그래",
+    "김민수", "01012345678", "이름은 김민수야", "경찰도 못 도와줘", "어른들은 아무것도 못해",
+    "그냥 참고 지낼래", "포기할래", "그만", "그만할래", "고마워", "이제 괜찮아", "학교 가기 싫어",
+    "피곤해", "지쳤어", "얘기하고 싶어", "?", "ㅇㅇ", "그냥", "짜증나", "외롭다",
+]
+AI_MESSAGES = [
+    "내가 대신 전화해줄까? 이름하고 전화번호 알려줄래?",
+    "어떤 상황이었는지 조금만 더 말해줄래?",
+    "선생님이나 부모님께 말씀드리는 것도 방법이야. 내가 연결 시켜줘도 괜찮을까?",
+    "알려줘서 고마워. 지금 필요한 게 있으면 편하게 말해줘.",
+    "지금은 안전한 곳에 있어?",
+    "요즘 얼마나 자주 있어?",
+    "괜찮아, 천천히 말해도 돼. 어떤 기분이 드는지 편하게 얘기해줘.",
+]
+DISTRESS = ["낮음", "중간", "높음"]
+SIGNALS = ["없음", "낮음", "중간", "높음"]
+
+
+def _facts(history, message):
+    full_text = "".join([t.content for t in history if t.role == "user"] + [message]).replace(" ", "")
+    distress = _estimate_distress(full_text)
+    signal = _estimate_suicide_signal(full_text)
+    return distress, signal, _estimate_risk_score(distress, signal)
+
+
+def build_cases(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count // 2):
+        # self-play
+        history = []
+        for _ in range(rng.randint(1, 8)):
+            message = rng.choice(USER_MESSAGES)
+            distress, signal, risk = _facts(history, message)
+            cases.append((list(history), message, distress, signal, risk))
+            reply = legacy_compose_reply(build_turn_context(history, message), distress, signal, risk)
+            history += [ChatTurn(role="user", content=message), ChatTurn(role="ai", content=reply)]
+        # random facts
+        history = []
+        for _ in range(rng.randint(0, 6)):
+            history.append(ChatTurn(role="user", content=rng.choice(USER_MESSAGES)))
+            history.append(ChatTurn(role="ai", content=rng.choice(AI_MESSAGES)))
+        cases.append((history, rng.choice(USER_MESSAGES), rng.choice(DISTRESS), rng.choice(SIGNALS), rng.randint(0, 100)))
+    return cases
+
+
+def check_parity(cases) -> int:
+    engine = get_rule_engine()
+    mismatches = 0
+    fired = Counter()
+    for history, message, distress, signal, risk in cases:
+        expected = legacy_compose_reply(build_turn_context(history, message), distress, signal, risk)
+        rule_id, got = engine.evaluate(build_turn_context(history, message), distress, signal, risk)
+        fired[rule_id] += 1
+        if got != expected:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"[MISMATCH] rule={rule_id} message={message!r} distress={distress} signal={signal} risk={risk}")
+                print(f"    legacy: {expected}")
+                print(f"    engine: {got}")
+    print(f"parity: {len(cases) - mismatches}/{len(cases)} identical, {len(fired)} rules fired")
+    return mismatches
+
+
+def _time(name: str, compose, cases, repeat: int = 3) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        # 매 턴 새 컨텍스트를 만드는 실제 요청 경로와 같게 측정
+        contexts = [(build_turn_context(h, m), d, s, r) for h, m, d, s, r in cases]
+        start = time.perf_counter()
+        for ctx, distress, signal, risk in contexts:
+            compose(ctx, distress, signal, risk)
+        best = min(best, time.perf_counter() - start)
+    print(f"[{name}] {best / len(cases) * 1e6:.2f} us/turn ({len(cases) / best:,.0f} turns/s)")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    cases = build_cases(count)
+    failed = check_parity(cases)
+    engine = get_rule_engine()
+    _time("legacy if-chain", legacy_compose_reply, cases)
+    _time("rule engine", lambda *args: engine.evaluate(*args)[1], cases)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,54 @@
+"""
+위험도 n-gram 분류기 추론 속도 벤치마크
+
+모델 파일이 있으면 그 모델을, 없으면 같은 크기의 임의 가중치 모델을 쓴다.
+(추론 시간은 가중치 값과 무관)
+
+사용법:
+    cd backend
+    python benchmarks/bench_scoring.py [모델 경로]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.scoring import DEFAULT_MODEL_PATH, NgramLogisticScorer, RuleScorer  # noqa: E402
+
+WORDS = [
+    "오늘", "학교에서", "친구가", "너무", "힘들어", "불안해", "죽고", "싶어", "안", "괜찮아",
+    "매일", "괴롭혀", "선생님", "말하기", "싫어", "그냥", "사라지고", "집에", "가기", "무서워",
+]
+
+
+def build_texts(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 60))) for _ in range(count)]
+
+
+def _time(name: str, scorer, texts, batch_size: int) -> None:
+    scorer.score_batch(texts[:batch_size])  # 해시 캐시 예열
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        scorer.score_batch(texts[start:start + batch_size])
+    per_message_ms = (time.perf_counter() - started) / len(texts) * 1000
+    print(f"[{name}] batch={batch_size:<4} {per_message_ms:.4f} ms/message")
+
+
+if __name__ == "__main__":
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MODEL_PATH
+    if path.exists():
+        model = NgramLogisticScorer.load(path)
+    else:
+        rng = np.random.default_rng(7)
+        model = NgramLogisticScorer(rng.normal(0, 0.1, 1 << 18).astype(np.float32), 0.0)
+    texts = build_texts(5000)
+    for batch_size in (1, 32, 256):
+        _time("ngram_lr", model, texts, batch_size)
+    _time("rules", RuleScorer(), texts, 256)
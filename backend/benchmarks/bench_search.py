@@ -0,0 +1,100 @@
+"""
+대화 전문 검색 정확도/속도 벤치마크
+임시 디렉터리에 합성 대화 N개를 저장하고 app.search로 색인을 만든 뒤
+1) 검색어마다 total이 원문을 직접 훑은 결과(공백 무시하고 검색어가 이어서 나오는 대화 수)와 같은지
+2) 첫 페이지 검색 시간(색인 조회 + 페이지 하이라이트)의 중앙값/최댓값
+을 본다. 흔한 말(후보가 많음), 드문 말, 떨어진 2-gram("죽고 나서 살고 싶어"), 영문 이름, 전화번호 조각을 섞는다.
+
+사용법:
+    cd backend
+    python benchmarks/bench_search.py [--conversations 20000] [--repeat 20]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+USER_FRAGMENTS = [
+    "요즘 너무 힘들어", "학교 가기 싫어", "친구가 나만 빼고 놀아", "시험 망쳤어", "엄마랑 싸웠어", "계속 불안해",
+    "잠이 안 와", "죽고 싶어", "죽고싶다", "죽고 나서 살고 싶어", "그냥 다 귀찮아", "따돌림 당하는 것 같아",
+    "my friend John 이 도와줬어", "Jenny 한테 말했어", "번호는 010-1234-5678", "내 번호 010 9876 1234 야",
+    "오늘은 좀 괜찮아", "공부가 손에 안 잡혀", "외로워", "아무도 몰라",
+]
+AI_FRAGMENTS = [
+    "그랬구나. 조금 더 얘기해줄래?", "많이 힘들었겠다. 지금은 어때?", "말해줘서 고마워.", "혼자 버티지 말고 같이 생각해보자.",
+]
+QUERIES = ["힘들어", "친구", "학교", "죽고싶", "죽고 싶어", "살고 싶", "따돌림", "john", "friend", "my friend john", "jenny", "1234", "9876", "010-1234"]
+
+
+def _conversation(rng: random.Random, index: int) -> Dict:
+    history = []
+    for _ in range(rng.randint(2, 12)):
+        history.append({"role": "user", "content": rng.choice(USER_FRAGMENTS)})
+        history.append({"role": "ai", "content": rng.choice(AI_FRAGMENTS)})
+    return {"timestamp": f"2026-01-01T{index // 3600 % 24:02d}:{index // 60 % 60:02d}:{index % 60:02d}", "history": history}
+
+
+def _expected_total(conversations: List[Dict], query: str) -> int:
+    """원문에서 직접: 검색어 글자(공백 제외)가 공백만 사이에 두고 이어서 나오는 발화가 있는 대화 수"""
+    chars = [ch for ch in query.lower() if not ch.isspace()]
+    pattern = re.compile(r"\s*".join(re.escape(ch) for ch in chars), re.IGNORECASE)
+    return sum(
+        1 for data in conversations
+        if any(pattern.search(item["content"]) for item in data["history"] if item["role"] in ("user", "ai"))
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="대화 검색 벤치마크")
+    parser.add_argument("--conversations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="sori_search_")
+    os.chdir(workdir)
+    storage_dir = Path("data/conversations")
+    storage_dir.mkdir(parents=True)
+    rng = random.Random(7)
+    conversations = [_conversation(rng, index) for index in range(args.conversations)]
+    for index, data in enumerate(conversations):
+        (storage_dir / f"20260101_{index:06d}.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    from app.search import get_index, search_conversations
+
+    started = time.perf_counter()
+    get_index()
+    print(f"[INFO] {args.conversations} conversations indexed in {time.perf_counter() - started:.2f}s")
+
+    ok = True
+    for query in QUERIES:
+        expected = _expected_total(conversations, query)
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = search_conversations(query, page=1, page_size=20)
+            samples.append((time.perf_counter() - started) * 1000)
+        total = result["total"]
+        highlighted = all(item["highlights"] for item in result["results"])
+        passed = total == expected and highlighted
+        ok = ok and passed
+        print(
+            f"    {'ok  ' if passed else 'FAIL'} {query!r:18} total={total:6d} expected={expected:6d} "
+            f"p50={statistics.median(samples):7.2f}ms max={max(samples):7.2f}ms"
+        )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
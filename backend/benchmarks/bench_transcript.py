@@ -0,0 +1,134 @@
+"""
+대화 기록 표현 벤치마크: List[ChatTurn] vs Transcript (긴 대화, 기본 200턴)
+
+1) 보관 메모리: 같은 대화를 ChatTurn 목록 / Transcript로 들고 있을 때 추가로 잡히는 바이트 (tracemalloc)
+   내용 문자열은 양쪽이 같이 쓰므로 빼고 잰다
+2) 요청 한 번의 할당: 턴 컨텍스트 + 분석 + 프롬프트 구성 + 저장용 dict
+   - chat_turns: 프로토콜 1처럼 ChatTurn 목록을 검증해서 만든 뒤 처리
+   - transcript: 프로토콜 2처럼 저장된 (role, content) 쌍에서 바로 Transcript를 만든 뒤 처리
+3) 조회: 최근 k개 사용자 발화, 전체 사용자 발화
+
+사용법:
+    cd backend
+    python benchmarks/bench_transcript.py [--turns 200] [--repeat 200]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.agent import analyze_message  # noqa: E402
+from app.context import build_turn_context  # noqa: E402
+from app.llm import build_messages  # noqa: E402
+from app.schemas import ChatTurn  # noqa: E402
+from app.transcript import Transcript  # noqa: E402
+
+USER_LINES = ["요즘 학교 가기 싫어", "친구들이 나만 빼고 놀아", "시험 때문에 잠을 못 자", "엄마랑 또 싸웠어", "그냥 다 힘들어"]
+AI_LINES = ["그랬구나. 그때 기분이 어땠어?", "많이 속상했겠다. 조금 더 말해줄래?", "말해줘서 고마워. 지금은 좀 어때?"]
+
+
+def make_pairs(turns: int) -> List[List[str]]:
+    pairs = []
+    for i in range(turns):
+        pairs.append(["user", f"{USER_LINES[i % len(USER_LINES)]} ({i})"])
+        pairs.append(["ai", f"{AI_LINES[i % len(AI_LINES)]} ({i})"])
+    return pairs
+
+
+def retained_bytes(build: Callable[[], object]) -> Tuple[int, int]:
+    """build() 결과를 들고 있는 동안 늘어난 (바이트, 블록 수)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    del kept
+    return sum(s.size_diff for s in stats), sum(s.count_diff for s in stats)
+
+
+def request_allocations(handle: Callable[[], object], repeat: int) -> Dict:
+    """요청 처리 한 번의 peak 메모리/할당 블록 수, 평균 시간"""
+    handle()  # 캐시 예열
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    before = tracemalloc.take_snapshot()
+    result = handle()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(s.count_diff for s in after.compare_to(before, "filename") if s.count_diff > 0)
+    del result
+    started = time.perf_counter()
+    for _ in range(repeat):
+        handle()
+    return {
+        "peak_kb": round((peak - base) / 1024, 1),
+        "new_blocks": blocks,
+        "us_per_request": round((time.perf_counter() - started) / repeat * 1e6, 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Transcript 메모리/할당 벤치마크")
+    parser.add_argument("--turns", type=int, default=200, help="사용자 턴 수 (AI 응답까지 두 배)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    pairs = make_pairs(args.turns)
+    dicts = [{"role": role, "content": content} for role, content in pairs]
+    message = "오늘도 학교에서 힘들었어"
+
+    chat_turn_bytes, chat_turn_blocks = retained_bytes(lambda: [ChatTurn(**item) for item in dicts])
+    transcript_bytes, transcript_blocks = retained_bytes(lambda: Transcript.from_pairs(pairs))
+
+    def handle(history) -> object:
+        ctx = build_turn_context(history, message)
+        analysis = analyze_message(ctx.history, message, ctx=ctx)
+        messages = build_messages(ctx.history, message, ctx, [])
+        return analysis, messages, ctx.history.to_dicts()
+
+    chat_turns = request_allocations(lambda: handle([ChatTurn(**item) for item in dicts]), args.repeat)
+    transcript = request_allocations(lambda: handle(Transcript.from_pairs(pairs)), args.repeat)
+
+    turns = [ChatTurn(**item) for item in dicts]
+    history = Transcript.from_pairs(pairs)
+    lookups = {}
+    for name, fn in (
+        ("chat_turns_last3_user", lambda: [t.content for t in turns if t.role == "user"][-3:]),
+        ("transcript_last3_user", lambda: history.last("user", 3)),
+        ("chat_turns_all_user", lambda: [t.content for t in turns if t.role == "user"]),
+        ("transcript_all_user", lambda: history.texts("user")),
+    ):
+        started = time.perf_counter()
+        for _ in range(args.repeat * 10):
+            fn()
+        lookups[name] = round((time.perf_counter() - started) / (args.repeat * 10) * 1e6, 2)
+
+    result = {
+        "turns": len(pairs),
+        "retained": {
+            "chat_turns": {"bytes": chat_turn_bytes, "blocks": chat_turn_blocks},
+            "transcript": {"bytes": transcript_bytes, "blocks": transcript_blocks},
+        },
+        "request": {"chat_turns": chat_turns, "transcript": transcript},
+        "lookup_us": lookups,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
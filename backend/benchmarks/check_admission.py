@@ -0,0 +1,157 @@
+"""
+/api/chat 입장 제어 점검 (통합 점검, 실패하면 종료 코드 1)
+
+프로세스 안에서 fake LLM으로 세 종류의 클라이언트를 동시에 돌린다 (X-Forwarded-For로 구분).
+- 스크립트 클라이언트: 쉬지 않고 보낸다 → 예산을 넘는 요청은 429, 저장 파일도 그만큼만 생겨야 한다
+- 보통 학생: 사람 속도로 보낸다 → 거절되지 않아야 한다
+- 위기 학생: 위기 메시지 뒤에 같은 대화로 계속 보낸다 → 예산을 넘겨도 거절/LLM 생략이 없어야 한다
+- 첫 턴부터 위기인 학생과 같은 IP(학교/NAT)의 다른 학생: 위기 표시는 대화에만 붙으므로 예산을 넘기면 429
+마지막으로 LLM 대기열이 찬 상태(과부하)에서 위기가 아닌 요청은 규칙 응답으로 내려가는지 본다.
+
+사용법:
+    cd backend
+    python benchmarks/check_admission.py [--flood 300]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+ENV = {
+    "LLM_BACKEND": "fake",
+    "LLM_FAKE_LATENCY_SECONDS": "0.01",
+    "LLM_RATE_PER_MINUTE": "1000000",
+    "REPLY_CACHE": "0",
+    "RAG_ENABLED": "0",
+    "RISK_SHADOW": "0",
+    "WARMUP": "0",
+    "TRUST_PROXY_HEADERS": "1",
+    "ADMISSION_RATE_PER_MINUTE": "60",
+    "ADMISSION_BURST": "20",
+    "ADMISSION_LLM_RATE_PER_MINUTE": "20",
+    "ADMISSION_LLM_BURST": "5",
+}
+NORMAL_MESSAGES = ["안녕", "요즘 학교 가기 싫어", "친구들이 나만 빼고 놀아", "그냥 좀 답답해"]
+CRISIS_MESSAGES = ["요즘 너무 힘들어", "죽고 싶어", "아무도 모를 거야", "그냥 다 그만두고 싶어", "모르겠어"] * 6
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="클라이언트별 입장 제어 점검")
+    parser.add_argument("--flood", type=int, default=300, help="스크립트 클라이언트가 보낼 요청 수")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="sori_admission_")
+    os.chdir(workdir)
+    os.environ.update(ENV)
+    from fastapi.testclient import TestClient
+
+    from app.llm import get_llm_gate
+    from app.main import app
+    from app.metrics import LLM_SHED, REPLIES
+
+    local = threading.local()
+
+    def post(ip: str, payload: Dict):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = TestClient(app)
+        return client.post("/api/chat", json=payload, headers={"X-Forwarded-For": ip})
+
+    def flood() -> Dict:
+        codes: Dict[int, int] = {}
+        for i in range(args.flood):
+            code = post("10.0.0.66", {"history": [], "message": f"스팸 메시지 {i}"}).status_code
+            codes[code] = codes.get(code, 0) + 1
+        return codes
+
+    def normal(index: int) -> List[int]:
+        codes = []
+        for message in NORMAL_MESSAGES:
+            codes.append(post(f"10.0.1.{index}", {"history": [], "message": message}).status_code)
+            time.sleep(0.2)
+        return codes
+
+    def crisis() -> List[Dict]:
+        rows, conversation = [], {}
+        history = [{"role": "ai", "content": "안녕! 무슨 일 있어?"}]
+        for message in CRISIS_MESSAGES:
+            history.append({"role": "user", "content": message})
+            if conversation:
+                payload = {"protocol": 2, "conversation_id": conversation["id"], "last_seen_turn": conversation["turn"], "message": message}
+            else:
+                payload = {"protocol": 2, "history": history, "message": message}
+            response = post("10.0.0.99", payload)
+            data = response.json() if response.status_code == 200 else {}
+            rows.append({"status": response.status_code, "next_action": data.get("next_action")})
+            history.append({"role": "ai", "content": data.get("reply", "")})
+            conversation = {"id": data.get("conversation_id"), "turn": data.get("turn")}
+        return rows
+
+    shed_before = LLM_SHED.value(reason="client_budget") + LLM_SHED.value(reason="overload")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        flood_future = pool.submit(flood)
+        crisis_future = pool.submit(crisis)
+        normal_codes = [code for codes in pool.map(normal, range(5)) for code in codes]
+        flood_codes = flood_future.result()
+        crisis_rows = crisis_future.result()
+    saved = len(list((Path(workdir) / "data" / "conversations").glob("*.json")))
+    admitted = sum(count for code, count in flood_codes.items() if code == 200)
+
+    # 첫 턴부터 위기인 학생 뒤로 같은 IP에서 위기가 아닌 새 대화들
+    post("10.0.3.1", {"history": [], "message": "죽고 싶어"})
+    shared_ip_codes = [post("10.0.3.1", {"history": [], "message": f"숙제 질문 {i}"}).status_code for i in range(40)]
+
+    # 과부하: LLM 대기열을 임계값까지 채운 것처럼 보이게 하고 위기가 아닌 새 클라이언트로 보낸다
+    gate = get_llm_gate()
+    snapshot = gate.limiter.snapshot
+    gate.limiter.snapshot = lambda: {**snapshot(), "queued": 10 ** 6}
+    try:
+        overload_before = LLM_SHED.value(reason="overload")
+        rule_before = REPLIES.value(source="rule_shed")
+        post("10.0.2.1", {"history": [], "message": "오늘 수학 시험 봤어"})
+        overload_shed = LLM_SHED.value(reason="overload") - overload_before
+        crisis_overload = post("10.0.2.2", {"history": [], "message": "죽고 싶어"}).json()
+        rule_shed = REPLIES.value(source="rule_shed") - rule_before
+    finally:
+        gate.limiter.snapshot = snapshot
+
+    result = {
+        "workdir": workdir,
+        "flood_codes": flood_codes,
+        "normal_codes": sorted(set(normal_codes)),
+        "crisis_statuses": sorted({row["status"] for row in crisis_rows}),
+        "saved_files": saved,
+        "shared_ip_codes": sorted(set(shared_ip_codes)),
+        "llm_shed": LLM_SHED.value(reason="client_budget") + LLM_SHED.value(reason="overload") - shed_before,
+    }
+    checks = [
+        ("flood is rate limited (429)", flood_codes.get(429, 0) > 0),
+        ("flood admitted within burst + refill", admitted <= int(ENV["ADMISSION_BURST"]) + 30),
+        ("normal students never rejected", set(normal_codes) == {200}),
+        ("crisis session never rejected", result["crisis_statuses"] == [200]),
+        ("saved files only for admitted requests", saved == admitted + len(normal_codes) + len(crisis_rows)),
+        ("crisis mark stays on the conversation, not the shared IP", 429 in shared_ip_codes),
+        ("overload sheds non-crisis to rule path", overload_shed == 1 and rule_shed == 1),
+        ("overload keeps crisis on rule priority", crisis_overload.get("next_action") in ("전담자연계", "즉시대응")),
+    ]
+    print(f"[INFO] {json.dumps(result, ensure_ascii=False)}")
+    ok = True
+    for name, passed in checks:
+        ok = ok and passed
+        print(f"    {'ok  ' if passed else 'FAIL'} {name}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""
+여러 워커 프로세스에서 공유 상태가 맞게 동작하는지 확인 (통합 점검, 실패하면 종료 코드 1)
+
+워커 N개가 같은 data/ 디렉터리와 STATE_BACKEND=sqlite 저장소를 쓰며 /api/chat을 동시에 부르고
+1) 같은 초에 저장된 대화도 파일이 덮어써지지 않는지 (요청마다 저장하므로 저장 파일 수 = 요청 수)
+2) 응답 캐시를 워커끼리 나눠 쓰는지 (같은 짧은 메시지의 LLM 호출이 워커 수만큼 늘지 않는지)
+3) LLM 분당 한도가 워커 전체 합계로 지켜지는지
+4) 규칙 응답(답변/위험 점수/조치)이 워커 1개일 때와 같은지
+5) 다른 워커가 발행한 위험 상승 이벤트가 이 워커의 관리자 SSE 구독에 빠짐없이 순서대로 오는지
+6) 워커가 뜬 뒤 다른 워커가 저장한 대화도 검색 색인에 잡히는지 (재시작 없이)
+7) 프로토콜 2에서 두 요청이 같은 턴을 이어 받아 기록하면 늦은 쪽이 먼저 기록한 턴을 덮어쓰지 않는지
+를 본다.
+
+기본은 multiprocessing으로 프로세스마다 TestClient를 띄운다.
+--uvicorn이면 실제 `uvicorn --workers N` 서버를 띄워 HTTP로 1), 4), 5), 6)을 본다 (uvicorn 설치 필요).
+
+사용법:
+    cd backend
+    python benchmarks/check_multiworker.py [--workers 4] [--state sqlite|memory] [--uvicorn]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+LLM_RATE_PER_MINUTE = 600  # 초당 10회, 버킷 용량 20
+CACHE_MESSAGE = "안녕"
+# LLM 없이 규칙 응답만 (키가 비어 있으면 openai 백엔드는 None)
+RULE_ONLY_ENV = {"LLM_BACKEND": "openai", "OPENAI_API_KEY": ""}
+CACHE_ROUNDS = 6
+
+# 규칙 응답 비교용 대화 (마지막 턴에서 종료 → 저장)
+SCRIPTS = [
+    ["안녕", "요즘 학교 가기 싫어", "친구들이 나만 빼고 놀아", "그만할래"],
+    ["시험 망쳤어", "엄마한테 혼날 것 같아", "다음에 얘기할게"],
+    ["잠이 안 와", "계속 불안해", "그냥 다 힘들어", "이제 끝낼래"],
+    ["요즘 너무 힘들어", "죽고 싶어", "그만할래"],
+]
+# 6) 검색어: 이 말이 들어간 저장 파일 수와 검색 결과 수를 비교한다
+SEARCH_QUERY = "불안"
+# SSE 읽기 제한 시간 (서버 keep-alive 간격보다 길게)
+HEARTBEAT_TIMEOUT = 20.0
+
+
+def _payload(history: List[Dict], message: str) -> Dict:
+    return {"history": history, "message": message}
+
+
+def play_scripts(send: Callable[[Dict], Dict], copies: int) -> List[List[Dict]]:
+    """SCRIPTS를 copies번 재생하고 턴별 (답변, 위험 점수, 조치, 종료 여부)를 돌려준다"""
+    transcripts = []
+    for _ in range(copies):
+        for script in SCRIPTS:
+            history: List[Dict] = []
+            turns = []
+            for message in script:
+                data = send(_payload(history, message))
+                turns.append({k: data.get(k) for k in ("reply", "risk_score", "next_action", "conversation_end")})
+                history += [{"role": "user", "content": message}, {"role": "ai", "content": data.get("reply", "")}]
+            transcripts.append(turns)
+    return transcripts
+
+
+def _worker(index: int, workdir: str, env: Dict[str, str], barrier, results) -> None:
+    os.chdir(workdir)
+    os.environ.update(env)
+    sys.path.insert(0, str(BACKEND_DIR))
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.metrics import LLM_CALLS
+
+    client = TestClient(app)
+    sent = [0]
+
+    def send(payload: Dict) -> Dict:
+        response = client.post("/api/chat", json=payload)
+        response.raise_for_status()
+        sent[0] += 1
+        return response.json()
+
+    barrier.wait()
+    # 1) 모든 워커가 같은 순간에 대화를 끝낸다 (같은 초 파일명 충돌) - 규칙 응답만으로
+    os.environ.update(RULE_ONLY_ENV)
+    transcripts = play_scripts(send, 1)
+    os.environ.update(env)
+    # 2) 같은 짧은 메시지를 여러 번
+    for _ in range(CACHE_ROUNDS):
+        send(_payload([], CACHE_MESSAGE))
+    llm_before = LLM_CALLS.value(result="ok")
+    # 3) 캐시되지 않는 메시지를 한꺼번에 - 한도를 넘는 만큼은 규칙 응답으로
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: send(_payload([], f"오늘 있었던 일을 길게 얘기해 볼게 {index}-{i} " * 3)), range(40)))
+    results.put({
+        "worker": index,
+        "transcripts": transcripts,
+        "requests": sent[0],
+        "llm_ok_burst": LLM_CALLS.value(result="ok") - llm_before,
+        "burst_started": started,
+        "burst_finished": time.time(),
+    })
+
+
+def _files_matching(directory: Path, query: str) -> int:
+    count = 0
+    for filepath in directory.glob("*.json"):
+        with open(filepath, "r", encoding="utf-8") as f:
+            history = json.load(f).get("history") or []
+        if any(query in "".join((item.get("content") or "").split()) for item in history if item.get("role") in ("user", "ai")):
+            count += 1
+    return count
+
+
+def _collect_events(offset: int, stop: threading.Event, received: List[int]) -> threading.Thread:
+    """이 프로세스(워커 하나로 보고)의 이벤트 버스를 구독해 받은 offset을 모은다"""
+    from app.events import get_event_bus
+
+    async def run() -> None:
+        async def disconnected() -> bool:
+            return stop.is_set()
+
+        async for event in get_event_bus().subscribe(offset, disconnected):
+            if event is not None:
+                received.append(event.offset)
+
+    thread = threading.Thread(target=lambda: asyncio.run(run()), daemon=True)
+    thread.start()
+    return thread
+
+
+def run_processes(workers: int, state: str) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="sori_multiworker_")
+    env = {
+        "STATE_BACKEND": state,
+        "STATE_SQLITE_PATH": str(Path(workdir) / "data" / "state.sqlite3"),
+        "LLM_BACKEND": "fake",
+        "LLM_FAKE_LATENCY_SECONDS": "0.02",
+        "LLM_RATE_PER_MINUTE": str(LLM_RATE_PER_MINUTE),
+        "LLM_QUEUE_TIMEOUT_SECONDS": "0.3",
+        # fake 백엔드는 같은 입력에 같은 응답이라 변형이 1개보다 많이 모이지 않는다
+        "REPLY_CACHE_VARIANTS": "1",
+        "RAG_ENABLED": "0",
+        "RISK_SHADOW": "0",
+        # 모든 요청이 같은 클라이언트로 보이므로 클라이언트별 입장 제어는 끈다 (여기서는 공급자 한도만 본다)
+        "ADMISSION_ENABLED": "0",
+    }
+    # 부모 프로세스도 워커 하나처럼: 색인을 먼저 만들고 이벤트를 구독한 뒤 다른 워커들을 띄운다
+    os.chdir(workdir)
+    os.environ.update(env)
+    from app.events import get_event_bus
+    from app.search import get_index, search_conversations
+
+    get_index()
+    stop = threading.Event()
+    received: List[int] = []
+    subscriber = _collect_events(get_event_bus().next_offset, stop, received)
+
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(i, workdir, env, barrier, results)) for i in range(workers)]
+    for proc in procs:
+        proc.start()
+    rows = [results.get(timeout=120) for _ in procs]
+    for proc in procs:
+        proc.join(30)
+
+    published = get_event_bus().next_offset
+    deadline = time.time() + 5
+    while len(received) < published and time.time() < deadline:
+        time.sleep(0.1)
+    stop.set()
+    subscriber.join(5)
+
+    from app.reply_cache import ReplyCache
+    from app.state import get_state_store
+
+    store = get_state_store()
+    files = list((Path(workdir) / "data" / "conversations").glob("*.json"))
+    cache_stats = ReplyCache(store=store).stats() if store.shared else {}
+    burst_seconds = max(r["burst_finished"] for r in rows) - min(r["burst_started"] for r in rows)
+    transcripts = [t for r in rows for t in r["transcripts"]]
+    return {
+        "workdir": workdir,
+        "transcripts": transcripts,
+        "requests": sum(r["requests"] for r in rows),
+        "saved_files": len(files),
+        "events_published": published,
+        "events_received": list(received),
+        "search_total": search_conversations(SEARCH_QUERY, page_size=1)["total"],
+        "search_expected": _files_matching(Path(workdir) / "data" / "conversations", SEARCH_QUERY),
+        "cache_stores": cache_stats.get("stores"),
+        "cache_hits": cache_stats.get("hits"),
+        "llm_ok_burst": sum(r["llm_ok_burst"] for r in rows),
+        "llm_allowed_burst": round(LLM_RATE_PER_MINUTE / 30 + LLM_RATE_PER_MINUTE / 60 * burst_seconds, 1),
+    }
+
+
+def session_race() -> bool:
+    """두 워커가 같은 대화의 같은 턴을 이어 받은 뒤 차례로 기록 - 먼저 기록한 턴이 남고 늦은 쪽은 resync"""
+    from app.schemas import ChatRequest
+    from app.sessions import ResyncRequired, resolve
+    from app.state import get_session
+
+    first = resolve(ChatRequest(protocol=2, history=[{"role": "ai", "content": "안녕! 무슨 일 있어?"}], message="안녕"))
+    turn = first.record("반가워")
+    conversation_id = first.conversation_id
+    a = resolve(ChatRequest(protocol=2, conversation_id=conversation_id, last_seen_turn=turn, message="A 메시지"))
+    b = resolve(ChatRequest(protocol=2, conversation_id=conversation_id, last_seen_turn=turn, message="B 메시지"))
+    a.record("A 응답")
+    try:
+        b.record("B 응답")
+    except ResyncRequired:
+        pass
+    else:
+        return False
+    turns = get_session(conversation_id)["turns"]
+    return [t[1] for t in turns[-2:]] == ["A 메시지", "A 응답"]
+
+
+def rule_transcripts_single() -> List[List[Dict]]:
+    """워커 1개(프로세스 안)에서 LLM 없이 재생한 기준 대화"""
+    workdir = tempfile.mkdtemp(prefix="sori_single_")
+    os.chdir(workdir)
+    os.environ.update({**RULE_ONLY_ENV, "RAG_ENABLED": "0", "RISK_SHADOW": "0", "STATE_BACKEND": "memory", "ADMISSION_ENABLED": "0"})
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    return play_scripts(lambda p: client.post("/api/chat", json=p).json(), 1)
+
+
+def _read_sse_ids(url: str, stop: threading.Event, received: List[int]) -> threading.Thread:
+    """SSE 스트림에서 이벤트 id를 모은다 (다른 스레드에서)"""
+    def run() -> None:
+        with urllib.request.urlopen(url, timeout=HEARTBEAT_TIMEOUT) as response:
+            for line in response:
+                if stop.is_set():
+                    break
+                if line.startswith(b"id: "):
+                    received.append(int(line[4:]))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_uvicorn(workers: int) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="sori_uvicorn_")
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(BACKEND_DIR),
+        "WEB_CONCURRENCY": str(workers),
+        "STATE_SQLITE_PATH": str(Path(workdir) / "data" / "state.sqlite3"),
+        **RULE_ONLY_ENV,
+        "RAG_ENABLED": "0",
+        "RISK_SHADOW": "0",
+        "ADMISSION_ENABLED": "0",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--workers", str(workers), "--port", str(port)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(f"{base}/ready", timeout=1).read()
+                break
+            except Exception:
+                time.sleep(0.2)
+
+        def send(payload: Dict) -> Dict:
+            request = urllib.request.Request(
+                f"{base}/api/chat", data=json.dumps(payload).encode("utf-8"),
+                headers={"Content-Type": "application/json"}, method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return json.loads(response.read())
+
+        # 5) 한 워커에 붙은 관리자 스트림이 모든 워커의 위험 상승을 받는지
+        stop = threading.Event()
+        received: List[int] = []
+        _read_sse_ids(f"{base}/api/admin/events", stop, received)
+        time.sleep(0.5)
+        with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+            batches = list(pool.map(lambda _: play_scripts(send, 1), range(workers * 2)))
+        requests = sum(len(script) for script in SCRIPTS) * workers * 2
+
+        from app.state import SQLiteStateStore
+
+        published = int(SQLiteStateStore(Path(env["STATE_SQLITE_PATH"])).get("events", "head", 0))
+        deadline = time.time() + 5
+        while len(received) < published and time.time() < deadline:
+            time.sleep(0.1)
+        stop.set()
+        # 6) 색인은 워커가 뜰 때 만들어졌다 - 다른 워커들이 저장한 대화도 보여야 한다
+        query = urllib.parse.urlencode({"q": SEARCH_QUERY, "page_size": 1})
+        with urllib.request.urlopen(f"{base}/api/admin/search?{query}", timeout=30) as response:
+            search_total = json.loads(response.read())["total"]
+    finally:
+        server.terminate()
+        server.wait(10)
+    transcripts = [t for batch in batches for t in batch]
+    files = list((Path(workdir) / "data" / "conversations").glob("*.json"))
+    return {
+        "workdir": workdir,
+        "transcripts": transcripts,
+        "requests": requests,
+        "saved_files": len(files),
+        "events_published": published,
+        "events_received": list(received),
+        "search_total": search_total,
+        "search_expected": _files_matching(Path(workdir) / "data" / "conversations", SEARCH_QUERY),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="멀티 워커 공유 상태 점검")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--state", default="sqlite", choices=("sqlite", "memory"), help="memory로 돌리면 문제가 드러난다")
+    parser.add_argument("--uvicorn", action="store_true", help="실제 uvicorn --workers 서버로 점검")
+    args = parser.parse_args(argv)
+
+    if args.uvicorn:
+        result = run_uvicorn(args.workers)
+    else:
+        result = run_processes(args.workers, args.state)
+        result["session_race_ok"] = session_race()
+    transcripts = result.pop("transcripts")
+    # 기준은 워커 1개 - 다른 프로세스 상태에 영향받지 않도록 마지막에 부모 프로세스에서
+    baseline = rule_transcripts_single()
+
+    checks = [
+        ("saved files == requests", result["saved_files"] == result["requests"]),
+        ("rule replies identical to single worker", all(t == baseline[i % len(baseline)] for i, t in enumerate(transcripts))),
+        ("escalations reach admin stream on another worker",
+         result["events_published"] > 0 and result["events_received"] == list(range(result["events_published"]))),
+        ("search sees conversations saved by other workers", result["search_total"] == result["search_expected"] > 0),
+    ]
+    if not args.uvicorn:
+        if args.state == "sqlite":
+            from app.reply_cache import get_reply_cache
+
+            variants = get_reply_cache().variants
+            # 변형을 모으는 동안 워커들이 동시에 부르는 만큼은 여유로 둔다
+            checks.append(("reply cache shared across workers", (result["cache_stores"] or 0) <= variants + args.workers))
+            checks.append(("reply cache hits", (result["cache_hits"] or 0) > 0))
+        checks.append(("concurrent protocol-2 turns do not overwrite each other", result["session_race_ok"]))
+        checks.append(("LLM rate limit is global", result["llm_ok_burst"] <= result["llm_allowed_burst"] * 1.1 + 2))
+
+    print(f"[INFO] {json.dumps(result, ensure_ascii=False)}")
+    ok = True
+    for name, passed in checks:
+        ok = ok and passed
+        print(f"    {'ok  ' if passed else 'FAIL'} {name}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+위기 알림 디스패처 점검 (통합 점검, 실패하면 종료 코드 1)
+
+로컬에 웹훅(http.server)과 SMTP 대역 서버를 띄우고 환경 변수로 app.notify를 그 서버에 연결한다.
+- 웹훅은 한 번 503, 한 번 429를 돌려준 뒤 받는다 → 재시도 간격이 지수 백오프로 늘어나는지
+- SMTP는 첫 MAIL FROM을 451로 거절한 뒤 받는다 → 재시도 후 한 번만 전달되는지
+- 같은 대화/메시지로 다시 알림을 요청하면 idempotency key가 같아 적재/전송되지 않는지
+- 글자까지 같은 짧은 위기 대화라도 다른 대화(학생)의 알림은 따로 적재/전송되는지
+- outbox 파일이 pending → sent 로 옮겨지는지, 계속 실패하면 최대 시도 뒤 pending → failed 로 옮겨지는지
+를 본다. 백오프 기준 시간은 --backoff로 줄여서 돌린다 (실제 기본값은 notify.BACKOFF_BASE_SECONDS).
+
+사용법:
+    cd backend
+    python benchmarks/check_notify.py [--backoff 0.2]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# 웹훅 /hook 이 차례로 돌려줄 상태 코드 (다 쓰면 200), /always-fail 은 항상 503
+WEBHOOK_SCRIPT = [503, 429]
+# SMTP가 MAIL FROM에 차례로 돌려줄 응답 (다 쓰면 250)
+SMTP_MAIL_SCRIPT = [b"451 4.3.0 try again later"]
+MAX_ATTEMPTS = 3
+WAIT_SECONDS = 15.0
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        with server.lock:
+            if self.path == "/hook":
+                status = server.script.pop(0) if server.script else 200
+            else:
+                status = 503
+            server.hits.append({
+                "path": self.path,
+                "key": self.headers.get("Idempotency-Key"),
+                "status": status,
+                "at": time.monotonic(),
+                "payload": json.loads(body.decode("utf-8")),
+            })
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    """EHLO/MAIL/RCPT/DATA/RSET/QUIT만 아는 SMTP 대역"""
+
+    def reply(self, line: bytes) -> None:
+        self.wfile.write(line + b"\r\n")
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        server = self.server
+        self.reply(b"220 localhost stand-in")
+        in_data = False
+        lines: List[bytes] = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if in_data:
+                if line.rstrip(b"\r\n") == b".":
+                    in_data = False
+                    with server.lock:
+                        server.messages.append(b"".join(lines).decode("utf-8", "replace"))
+                    lines = []
+                    self.reply(b"250 2.0.0 queued")
+                else:
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                continue
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                self.reply(b"250 localhost")
+            elif command == b"MAIL":
+                with server.lock:
+                    server.mail_attempts += 1
+                    response = server.script.pop(0) if server.script else b"250 2.1.0 ok"
+                self.reply(response)
+            elif command == b"DATA":
+                in_data = True
+                self.reply(b"354 end data with <CR><LF>.<CR><LF>")
+            elif command == b"QUIT":
+                self.reply(b"221 bye")
+                return
+            else:
+                self.reply(b"250 ok")
+
+
+def _serve(server) -> threading.Thread:
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def _wait(condition: Callable[[], bool], timeout: float = WAIT_SECONDS) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+def _outbox(outbox_dir: Path, sink: str, state: str, key: str) -> Optional[Dict]:
+    path = outbox_dir / sink / state / f"{key}.json"
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _pending_count(outbox_dir: Path) -> int:
+    return len(list(outbox_dir.glob("*/pending/*.json")))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="위기 알림 재시도/중복 제거/outbox 점검")
+    parser.add_argument("--backoff", type=float, default=0.2, help="백오프 기준 시간(초)")
+    args = parser.parse_args(argv)
+
+    webhook = ThreadingHTTPServer(("127.0.0.1", 0), WebhookHandler)
+    webhook.script, webhook.hits = list(WEBHOOK_SCRIPT), []
+    _serve(webhook)
+    smtp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SmtpHandler)
+    smtp.daemon_threads = True
+    smtp.script, smtp.messages, smtp.mail_attempts = list(SMTP_MAIL_SCRIPT), [], 0
+    _serve(smtp)
+    webhook_url = f"http://127.0.0.1:{webhook.server_address[1]}"
+
+    workdir = tempfile.mkdtemp(prefix="sori_notify_")
+    os.chdir(workdir)
+    os.environ.update({
+        "STATE_BACKEND": "memory",
+        "NOTIFY_WEBHOOK_URL": f"{webhook_url}/hook",
+        "NOTIFY_SMTP_HOST": "127.0.0.1",
+        "NOTIFY_SMTP_PORT": str(smtp.server_address[1]),
+        "NOTIFY_SMTP_TO": "counselor@example.org",
+        "NOTIFY_RATE_PER_MINUTE": "6000",
+        "NOTIFY_MAX_ATTEMPTS": "5",
+    })
+    from app import notify
+
+    notify.BACKOFF_BASE_SECONDS = args.backoff
+    notify.POLL_SECONDS = 0.05
+
+    history = ["요즘 너무 힘들어", "죽고 싶어"]
+    message = "내 이름은 김민준이고 010-1234-5678이야"
+    analysis = {"risk_score": 90, "suicide_signal": "높음", "next_action": "즉시대응"}
+    key = notify.make_idempotency_key("conv_A", *history, message)
+    other_key = notify.make_idempotency_key("conv_B", *history, message)
+    dispatcher = notify.get_dispatcher()
+    outbox = dispatcher.outbox_dir.resolve()
+
+    queued_first = notify.notify_crisis_contact(history, message, analysis, conversation_id="conv_A")
+    queued_again = notify.notify_crisis_contact(history, message, analysis, conversation_id="conv_A")
+    delivered = _wait(lambda: _pending_count(outbox) == 0)
+    queued_after_sent = notify.notify_crisis_contact(history, message, analysis, conversation_id="conv_A")
+    # 같은 대화 내용, 다른 학생
+    queued_other = notify.notify_crisis_contact(history, message, analysis, conversation_id="conv_B")
+    delivered_other = _wait(lambda: _pending_count(outbox) == 0)
+    time.sleep(max(0.5, args.backoff * 2))
+
+    # 계속 실패하는 채널: 최대 시도 뒤 failed 로
+    failing_outbox = Path(workdir) / "outbox_failing"
+    failing = notify.NotificationDispatcher(
+        [notify.WebhookSink(f"{webhook_url}/always-fail")],
+        outbox_dir=failing_outbox,
+        rate_per_minute=6000,
+        max_attempts=MAX_ATTEMPTS,
+    )
+    failing_key = notify.make_idempotency_key("always-fail")
+    failing.enqueue(failing_key, {"type": "crisis_contact", "risk_score": 90})
+    gave_up = _wait(lambda: _outbox(failing_outbox, "webhook", "failed", failing_key) is not None)
+    dispatcher.stop()
+    failing.stop()
+    webhook.shutdown()
+    smtp.shutdown()
+
+    hook_hits = [hit for hit in webhook.hits if hit["path"] == "/hook" and hit["key"] == key]
+    other_hits = [hit for hit in webhook.hits if hit["path"] == "/hook" and hit["key"] == other_key]
+    smtp_first = [m for m in smtp.messages if f"<{key}@sori>" in m]
+    smtp_other = [m for m in smtp.messages if f"<{other_key}@sori>" in m]
+    fail_hits = [hit for hit in webhook.hits if hit["path"] == "/always-fail"]
+    gaps = [round(b["at"] - a["at"], 3) for a, b in zip(hook_hits, hook_hits[1:])]
+    sent_webhook = _outbox(outbox, "webhook", "sent", key) or {}
+    sent_smtp = _outbox(outbox, "smtp", "sent", key) or {}
+    failed = _outbox(failing_outbox, "webhook", "failed", failing_key) or {}
+
+    result = {
+        "workdir": workdir,
+        "queued": [queued_first, queued_again, queued_after_sent, queued_other],
+        "webhook_statuses": [hit["status"] for hit in hook_hits],
+        "webhook_gaps": gaps,
+        "smtp_mail_attempts": smtp.mail_attempts,
+        "smtp_messages": len(smtp.messages),
+        "sent_attempts": {"webhook": sent_webhook.get("attempts"), "smtp": sent_smtp.get("attempts")},
+        "failed_attempts": failed.get("attempts"),
+        "failed_error": failed.get("last_error"),
+    }
+    checks = [
+        ("enqueued to webhook and smtp", sorted(queued_first) == ["smtp", "webhook"]),
+        ("duplicate enqueue skipped while pending", queued_again == []),
+        ("duplicate enqueue skipped after sent", queued_after_sent == []),
+        ("webhook retried after 503 and 429", result["webhook_statuses"] == [503, 429, 200]),
+        ("webhook sends idempotency key", len(hook_hits) + len(other_hits) == len([h for h in webhook.hits if h["path"] == "/hook"])),
+        ("retry delay backs off exponentially",
+         len(gaps) == 2 and gaps[0] >= args.backoff * 0.9 and gaps[1] >= args.backoff * 2 * 0.9),
+        ("smtp retried after 451, delivered once", smtp.mail_attempts == 3 and len(smtp_first) == 1),
+        ("same transcript, other conversation: queued and sent",
+         sorted(queued_other) == ["smtp", "webhook"] and delivered_other
+         and [hit["status"] for hit in other_hits] == [200] and len(smtp_other) == 1),
+        ("outbox pending -> sent", delivered and sent_webhook.get("attempts") == 3 and sent_smtp.get("attempts") == 2),
+        ("outbox pending -> failed after max attempts",
+         gave_up and failed.get("attempts") == MAX_ATTEMPTS and len(fail_hits) == MAX_ATTEMPTS
+         and _pending_count(failing_outbox) == 0),
+    ]
+    print(f"[INFO] {json.dumps(result, ensure_ascii=False)}")
+    ok = True
+    for name, passed in checks:
+        ok = ok and passed
+        print(f"    {'ok  ' if passed else 'FAIL'} {name}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
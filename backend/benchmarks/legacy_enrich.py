@@ -0,0 +1,79 @@
+"""
+저장용 history 구성 고정 사본 (단일 패스 전환 전 main._chat 저장 경로 + app.agent.enrich_history_with_analysis)
+bench_enrich.py가 iter_enriched_history와 결과가 같은지 비교하는 기준으로만 쓴다. 수정하지 말 것.
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.agent import (  # noqa: E402
+    _estimate_distress,
+    _estimate_risk_score,
+    _estimate_suicide_signal,
+    _extract_key_topics,
+    _next_action,
+    _trend,
+)
+from app.schemas import ChatTurn  # noqa: E402
+
+
+def legacy_enrich_history_with_analysis(history: List[Dict], current_message: str, include_current: bool = True) -> List[Dict]:
+    enriched_history = [item.copy() for item in history]
+    user_only_texts = []
+    if include_current and current_message:
+        enriched_history.append({"role": "user", "content": current_message})
+    for idx, item in enumerate(enriched_history):
+        if item.get("role") != "user":
+            continue
+        user_content = item.get("content", "")
+        if not user_content:
+            continue
+        user_only_texts.append(user_content)
+        user_text = "".join(user_only_texts).replace(" ", "")
+        d = _estimate_distress(user_text)
+        s = _estimate_suicide_signal(user_text)
+        r = _estimate_risk_score(d, s)
+        a = _next_action(r)
+        slice_history = [
+            ChatTurn(role=turn.get("role", "user"), content=turn.get("content", ""))
+            for turn in enriched_history[: idx + 1]
+        ]
+        item["analysis"] = {
+            "emotional_distress": str(d),
+            "distress_level": str(d),
+            "suicide_signal": str(s),
+            "risk_score": int(r),
+            "next_action": str(a),
+            "trend": _trend(r, d),
+            "conversation_turns": len(slice_history),
+            "key_topics": _extract_key_topics(slice_history),
+        }
+    return enriched_history
+
+
+def legacy_save_history(base_history: List[Dict], message: str, reply: str) -> Tuple[List[Dict], Optional[str]]:
+    """(저장할 history, 직전 사용자 턴의 next_action)"""
+    deduped_history: List[Dict] = []
+    for item in base_history:
+        if deduped_history and deduped_history[-1]["role"] == item["role"] and deduped_history[-1]["content"] == item["content"]:
+            continue
+        deduped_history.append(item)
+    has_current_in_history = (
+        bool(deduped_history)
+        and deduped_history[-1]["role"] == "user"
+        and deduped_history[-1]["content"] == message
+    )
+    final_history = legacy_enrich_history_with_analysis(deduped_history, message, include_current=not has_current_in_history)
+    final_history.append({"role": "ai", "content": reply})
+    deduped_final: List[Dict] = []
+    for item in final_history:
+        if deduped_final and deduped_final[-1].get("role") == item.get("role") and deduped_final[-1].get("content") == item.get("content"):
+            continue
+        deduped_final.append(item)
+    user_analyses = [item["analysis"] for item in deduped_final if item.get("role") == "user" and item.get("analysis")]
+    previous_action = user_analyses[-2].get("next_action") if len(user_analyses) >= 2 else None
+    return deduped_final, previous_action
@@ -0,0 +1,382 @@
+"""
+/api/chat 부하 테스트 (회귀 비교용)
+합성 학생 대화(일상/스트레스/학교폭력/위기, 길이 다양)를 여러 가상 학생이 동시에 한 턴씩 보내고
+처리량, 지연 p50/p95/p99, 단계별 시간(분석/검색/LLM/종료 리포트/저장), 메모리를 JSON으로 남긴다.
+
+- 기본은 프로세스 안에서 앱을 직접 부른다 (TestClient, LLM_BACKEND=fake, 임시 디렉터리에 저장)
+  - RAG는 chromadb와 data/chroma_db가 있으면 그대로 쓰고, 없으면 검색 단계가 비어 있다
+- --url을 주면 떠 있는 서버에 HTTP로 보낸다 (이 경우 단계별 시간/메모리는 없음)
+- --compare로 이전 결과 JSON과 비교하고, --fail-on-regression 비율보다 나빠지면 종료 코드 1
+
+사용법:
+    cd backend
+    python benchmarks/load_test.py [--students 20] [--conversations 100] [--fake-latency 0.05]
+        [--out benchmarks/results/xxx.json] [--compare benchmarks/results/base.json] [--fail-on-regression 0.15]
+    python benchmarks/load_test.py --url http://127.0.0.1:8000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+PROFILES = {
+    "casual": (0.5, [
+        "안녕", "심심해", "오늘 학교 끝났어", "급식 맛없었어", "숙제 너무 많아", "주말에 뭐하지",
+        "친구랑 게임했어", "그냥 그래", "몰라", "배고파", "웹툰 보는 중이야", "내일 체육 있어",
+    ]),
+    "stress": (0.25, [
+        "요즘 너무 힘들어", "시험 망했어 부모님이 실망하실 것 같아", "잠을 못 자겠어", "계속 불안해",
+        "아무것도 하기 싫어", "우울해", "공부해도 성적이 안 올라", "다 포기하고 싶어", "싫어", "없어",
+    ]),
+    "bullying": (0.15, [
+        "반 애들이 나만 빼고 놀아", "단톡방에서 욕해", "따돌림 당하는 것 같아", "오늘 복도에서 맞았어",
+        "헛소문을 퍼뜨려", "선생님한테 말해도 소용없어", "학교 가기 무서워", "그냥 참고 지내면 되겠지",
+    ]),
+    "crisis": (0.10, [
+        "요즘 너무 힘들어", "다 끝내고 싶어", "죽고 싶다는 생각이 들어", "사라지고 싶어",
+        "아무도 날 신경 안 써", "자살하고 싶어", "살고 싶지 않아",
+    ]),
+}
+END_MESSAGES = ["고마워 이제 괜찮아", "그만할래", "다음에 또 얘기하자"]
+CONTACT_MESSAGE = "김민수 010-1234-5678"
+
+
+def build_conversations(count: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    names = list(PROFILES)
+    weights = [PROFILES[name][0] for name in names]
+    conversations = []
+    for i in range(count):
+        profile = rng.choices(names, weights)[0]
+        pool = PROFILES[profile][1]
+        turns = [rng.choice(pool) for _ in range(rng.randint(2, 12))]
+        if profile == "crisis" and rng.random() < 0.5:
+            turns.append(CONTACT_MESSAGE)
+        elif rng.random() < 0.3:
+            turns.append(rng.choice(END_MESSAGES))
+        conversations.append({"id": i, "profile": profile, "turns": turns})
+    return conversations
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": pick(0.5),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+        "total_ms": round(sum(ordered) * 1000, 1),
+    }
+
+
+class StageTimer:
+    """앱 함수들을 감싸서 단계별 소요 시간을 모은다 (프로세스 안 실행에서만)"""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._restore: List[Callable[[], None]] = []
+
+    def wrap(self, owner, attr: str, stage: str) -> None:
+        original = getattr(owner, attr)
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.samples[stage].append(elapsed)
+
+        setattr(owner, attr, timed)
+        self._restore.append(lambda: setattr(owner, attr, original))
+
+    def install(self) -> None:
+        import app.llm as llm
+        import app.main as main
+
+        self.wrap(main, "analyze_message", "analysis")
+        self.wrap(llm, "search_relevant_chunks", "retrieval")
+        self.wrap(llm._LLMGate, "complete", "llm")
+        self.wrap(main, "generate_reply", "reply_total")
+        self.wrap(main, "build_report", "end_report")
+        self.wrap(main, "save_conversation", "save_write")
+
+    def uninstall(self) -> None:
+        for restore in reversed(self._restore):
+            restore()
+
+    def report(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {stage: percentiles(values) for stage, values in sorted(self.samples.items())}
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _http_sender(url: str) -> Callable[[Dict], Dict]:
+    endpoint = url.rstrip("/") + "/api/chat"
+
+    def send(payload: Dict) -> Dict:
+        request = urllib.request.Request(
+            endpoint,
+            data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    return send
+
+
+def _inprocess_sender() -> Callable[[Dict], Dict]:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    local = threading.local()
+
+    def send(payload: Dict) -> Dict:
+        # TestClient는 스레드마다 하나씩 (포털/이벤트 루프를 공유하지 않게)
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = TestClient(app)
+        response = client.post("/api/chat", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    return send
+
+
+def run_load(conversations: List[Dict], students: int, send: Callable[[Dict], Dict], protocol: int = 1) -> Dict:
+    latencies: List[float] = []
+    by_profile: Dict[str, List[float]] = defaultdict(list)
+    outcomes: Counter = Counter()
+    request_bytes: List[int] = []
+    lock = threading.Lock()
+
+    def play(conversation: Dict) -> None:
+        history: List[Dict] = []
+        conversation_id: Optional[str] = None
+        for message in conversation["turns"]:
+            if protocol >= 2 and conversation_id:
+                # 프로토콜 2: 새 메시지만 (서버가 기록을 들고 있음)
+                payload = {"protocol": 2, "conversation_id": conversation_id, "last_seen_turn": len(history),
+                           "message": message, "is_admin": True}
+            else:
+                payload = {"protocol": protocol, "history": history + [{"role": "user", "content": message}],
+                           "message": message, "is_admin": True}
+            size = len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+            started = time.perf_counter()
+            try:
+                data = send(payload)
+            except Exception as e:
+                with lock:
+                    outcomes["error"] += 1
+                print(f"[WARN] 요청 실패: {e}")
+                return
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                request_bytes.append(size)
+                by_profile[conversation["profile"]].append(elapsed)
+                outcomes["ok"] += 1
+                outcomes[f"action:{data.get('next_action')}"] += 1
+                if data.get("conversation_end"):
+                    outcomes["ended"] += 1
+            conversation_id = data.get("conversation_id")
+            history = history + [{"role": "user", "content": message}, {"role": "ai", "content": data.get("reply", "")}]
+            if data.get("conversation_end"):
+                return
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=students) as pool:
+        list(pool.map(play, conversations))
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 3),
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency": percentiles(latencies),
+        "latency_by_profile": {name: percentiles(values) for name, values in sorted(by_profile.items())},
+        "request_bytes": {
+            "avg": round(sum(request_bytes) / len(request_bytes), 1) if request_bytes else 0.0,
+            "max": max(request_bytes, default=0),
+            "total": sum(request_bytes),
+        },
+        "outcomes": dict(sorted(outcomes.items())),
+    }
+
+
+COMPARED = [
+    ("throughput_rps", lambda r: r.get("throughput_rps"), True),
+    ("latency.p50_ms", lambda r: r.get("latency", {}).get("p50_ms"), False),
+    ("latency.p95_ms", lambda r: r.get("latency", {}).get("p95_ms"), False),
+    ("latency.p99_ms", lambda r: r.get("latency", {}).get("p99_ms"), False),
+    ("memory.rss_peak_mb", lambda r: (r.get("memory") or {}).get("rss_peak_mb"), False),
+]
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> bool:
+    """지표별 변화를 출력하고, threshold보다 나빠진 지표가 있으면 False"""
+    ok = True
+    print(f"[INFO] compare with {baseline.get('meta', {}).get('commit')} ({baseline.get('meta', {}).get('timestamp')})")
+    for name, get, higher_is_better in COMPARED:
+        now, before = get(current), get(baseline)
+        if not now or not before:
+            continue
+        change = (now - before) / before
+        worse = -change if higher_is_better else change
+        flag = "REGRESSION" if worse > threshold else ""
+        ok = ok and not flag
+        print(f"    {name:22s} {before:>10} -> {now:>10}  ({change:+.1%}) {flag}")
+    for stage, stats in current.get("stages", {}).items():
+        before = baseline.get("stages", {}).get(stage, {}).get("p95_ms")
+        if before and stats.get("p95_ms"):
+            print(f"    stage {stage:16s} p95 {before:>8} -> {stats['p95_ms']:>8}  ({(stats['p95_ms'] - before) / before:+.1%})")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="/api/chat 부하 테스트")
+    parser.add_argument("--students", type=int, default=20, help="동시에 대화하는 가상 학생 수")
+    parser.add_argument("--conversations", type=int, default=100, help="재생할 대화 수")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--fake-latency", type=float, default=0.05, help="fake LLM 응답 지연(초)")
+    parser.add_argument("--protocol", type=int, default=2, choices=(1, 2), help="1: 매 턴 전체 history, 2: 새 메시지만")
+    parser.add_argument("--url", help="떠 있는 서버 주소 (없으면 프로세스 안에서 실행)")
+    parser.add_argument("--out", type=Path, help="결과 JSON 경로 (기본 benchmarks/results/load_<commit>_<시각>.json)")
+    parser.add_argument("--compare", type=Path, help="비교할 이전 결과 JSON")
+    parser.add_argument("--fail-on-regression", type=float, default=0.15, help="이 비율보다 나빠지면 종료 코드 1")
+    args = parser.parse_args(argv)
+
+    conversations = build_conversations(args.conversations, args.seed)
+    timer: Optional[StageTimer] = None
+    workdir: Optional[str] = None
+    cwd = os.getcwd()
+    rss_start = _rss_mb()
+
+    if args.url:
+        send = _http_sender(args.url)
+    else:
+        # 저장/알림 파일이 실제 data/를 건드리지 않도록 임시 디렉터리에서 실행
+        os.environ["LLM_BACKEND"] = "fake"
+        os.environ["LLM_FAKE_LATENCY_SECONDS"] = str(args.fake_latency)
+        # 공급자 분당 한도는 fake에 의미가 없으니 풀어둔다 (동시성 제한은 그대로)
+        os.environ.setdefault("LLM_RATE_PER_MINUTE", "1000000")
+        # 가상 학생이 모두 같은 클라이언트(testclient)로 보이므로 클라이언트별 입장 제어는 끈다
+        os.environ.setdefault("ADMISSION_ENABLED", "0")
+        for name in [key for key in os.environ if key.startswith("NOTIFY_")]:
+            os.environ.pop(name)
+        workdir = tempfile.mkdtemp(prefix="sori_load_")
+        chroma = BACKEND_DIR / "data" / "chroma_db"
+        if chroma.exists():
+            shutil.copytree(chroma, Path(workdir) / "data" / "chroma_db")
+        os.chdir(workdir)
+        timer = StageTimer()
+        timer.install()
+        send = _inprocess_sender()
+
+    try:
+        result = run_load(conversations, args.students, send, args.protocol)
+    finally:
+        if timer:
+            timer.uninstall()
+        os.chdir(cwd)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = _git_commit()
+    result = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": "http" if args.url else "inprocess",
+            "students": args.students,
+            "protocol": args.protocol,
+            "conversations": args.conversations,
+            "seed": args.seed,
+            "fake_latency": None if args.url else args.fake_latency,
+        },
+        **result,
+        "stages": timer.report() if timer else {},
+        "memory": None if args.url else {
+            "rss_start_mb": rss_start,
+            "rss_end_mb": _rss_mb(),
+            # Linux ru_maxrss 단위는 KB
+            "rss_peak_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+    }
+
+    out = args.out or BACKEND_DIR / "benchmarks" / "results" / f"load_{commit or 'nogit'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    latency = result["latency"]
+    print(
+        f"[INFO] {result['requests']} requests in {result['seconds']}s ({result['throughput_rps']} req/s), "
+        f"p50 {latency.get('p50_ms')}ms, p95 {latency.get('p95_ms')}ms, p99 {latency.get('p99_ms')}ms"
+    )
+    for stage, stats in result["stages"].items():
+        print(f"    {stage:12s} n={stats['count']:<6} p50 {stats['p50_ms']:>8}ms  p95 {stats['p95_ms']:>8}ms  total {stats['total_ms']}ms")
+    if result["memory"]:
+        print(f"    memory: rss {result['memory']['rss_start_mb']} -> {result['memory']['rss_end_mb']} MB (peak {result['memory']['rss_peak_mb']} MB)")
+    print(f"[INFO] saved {out}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if not compare(result, baseline, args.fail_on_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+OpenAI chat completions 흉내 서버 (429 재현용)
+동시 처리 수나 분당 요청 수를 넘으면 429 + Retry-After를 돌려준다.
+--slow-fraction 비율만큼은 --slow-latency초 뒤에 응답해서 꼬리 지연을 흉내 낸다.
+OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 로 두면 백엔드가 이 서버를 부른다.
+
+사용법:
+    cd backend
+    python benchmarks/mock_openai_server.py [--port 8089] [--max-concurrent 4] [--rate-per-minute 120] [--latency 0.3]
+        [--slow-fraction 0.1 --slow-latency 8]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque
+
+
+class MockState:
+    def __init__(
+        self,
+        max_concurrent: int,
+        rate_per_minute: int,
+        latency: float,
+        slow_fraction: float = 0.0,
+        slow_latency: float = 0.0,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.rate_per_minute = rate_per_minute
+        self.latency = latency
+        self.slow_fraction = slow_fraction
+        self.slow_latency = slow_latency
+        self.rng = random.Random(7)
+        self.active = 0
+        self.recent: Deque[float] = deque()
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def admit(self) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and now - self.recent[0] > 60.0:
+                self.recent.popleft()
+            if self.active >= self.max_concurrent or len(self.recent) >= self.rate_per_minute:
+                self.counts["429"] += 1
+                return False
+            self.active += 1
+            self.recent.append(now)
+            self.counts["200"] += 1
+            return True
+
+    def release(self) -> None:
+        with self.lock:
+            self.active -= 1
+
+
+def _handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def _send(self, status: int, body: dict, headers: dict = None) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # 클라이언트가 deadline으로 먼저 끊은 경우
+                pass
+
+        def do_POST(self) -> None:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+            if not state.admit():
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}, {"Retry-After": "1"})
+                return
+            try:
+                with state.lock:
+                    slow = state.rng.random() < state.slow_fraction
+                time.sleep(state.slow_latency if slow else state.latency)
+                last = request.get("messages", [{}])[-1].get("content", "")
+                self._send(200, {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "mock"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": f"그랬구나. '{last[:20]}' 얘기 더 해줄래?"},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 900, "completion_tokens": 40, "total_tokens": 940},
+                })
+            finally:
+                state.release()
+
+    return Handler
+
+
+def start_mock_server(
+    port: int = 0,
+    max_concurrent: int = 4,
+    rate_per_minute: int = 120,
+    latency: float = 0.3,
+    slow_fraction: float = 0.0,
+    slow_latency: float = 0.0,
+):
+    """백그라운드 스레드로 서버를 띄운다. (server, state) 반환, server.server_port로 포트 확인."""
+    state = MockState(max_concurrent, rate_per_minute, latency, slow_fraction, slow_latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="429를 흉내 내는 OpenAI 호환 서버")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--max-concurrent", type=int, default=4)
+    parser.add_argument("--rate-per-minute", type=int, default=120)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="느린 응답 비율 (꼬리 지연 재현)")
+    parser.add_argument("--slow-latency", type=float, default=8.0)
+    args = parser.parse_args()
+    server, state = start_mock_server(
+        args.port, args.max_concurrent, args.rate_per_minute, args.latency, args.slow_fraction, args.slow_latency
+    )
+    print(f"[INFO] mock OpenAI server on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"[INFO] responses {dict(state.counts)}")
+    except KeyboardInterrupt:
+        server.shutdown()
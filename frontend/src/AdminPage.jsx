@@ -1,6 +1,8 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 
 const API_BASE = import.meta.env.VITE_API_BASE || "";
+// 마지막으로 받은 위험 상승 이벤트 id (관리자 화면을 다시 열어도 그 다음부터 이어 받음)
+const LAST_EVENT_ID_KEY = "sori_admin_last_event_id";
 
 export default function AdminPage({ onBack, onLogout }) {
   const [conversations, setConversations] = useState([]);
@@ -9,8 +11,14 @@ export default function AdminPage({ onBack, onLogout }) {
   const [error, setError] = useState("");
   const [activeTab, setActiveTab] = useState("dashboard"); // dashboard, test
   const [pageByTab, setPageByTab] = useState({ dashboard: 1, test: 1 });
+  const [alerts, setAlerts] = useState([]); // 실시간 위험 상승 알림
+  const activeTabRef = useRef(activeTab); // 구독은 한 번만 열고 리스너에서 현재 탭을 읽는다
   const itemsPerPage = 10;
 
+  useEffect(() => {
+    activeTabRef.current = activeTab;
+  }, [activeTab]);
+
   useEffect(() => {
     // activeTab에 따라 다른 대화 목록 로드
     if (activeTab === "test") {
@@ -21,6 +29,21 @@ export default function AdminPage({ onBack, onLogout }) {
     setPageByTab((prev) => ({ ...prev, [activeTab]: 1 }));
   }, [activeTab]);
 
+  // 위험 상승 이벤트 구독 (SSE, 화면을 여는 동안 하나만)
+  // 브라우저 자동 재접속은 Last-Event-ID로, 새로 여는 구독은 저장해 둔 마지막 id 다음 offset부터 이어 받는다.
+  useEffect(() => {
+    const lastId = sessionStorage.getItem(LAST_EVENT_ID_KEY);
+    const query = lastId !== null && /^\d+$/.test(lastId) ? `?offset=${Number(lastId) + 1}` : "";
+    const source = new EventSource(`${API_BASE}/api/admin/events${query}`);
+    source.addEventListener("risk_escalation", (event) => {
+      const data = JSON.parse(event.data);
+      if (event.lastEventId) sessionStorage.setItem(LAST_EVENT_ID_KEY, event.lastEventId);
+      setAlerts((prev) => [data, ...prev].slice(0, 5));
+      loadConversations(activeTabRef.current === "test");
+    });
+    return () => source.close();
+  }, []);
+
   const paginate = (items, page) => {
     const start = (page - 1) * itemsPerPage;
     return items.slice(start, start + itemsPerPage);
@@ -62,7 +85,8 @@ export default function AdminPage({ onBack, onLogout }) {
     try {
       setLoading(true);
       const url = `${API_BASE}/api/admin/conversations${includeTest ? '?include_test=true' : ''}`;
-      const response = await fetch(url);
+      // 브라우저 캐시를 쓰되 매번 ETag로 확인 (바뀐 게 없으면 304라 본문을 다시 받지 않음)
+      const response = await fetch(url, { cache: "no-cache" });
       if (!response.ok) throw new Error("대화 목록을 불러올 수 없습니다.");
       const data = await response.json();
       setConversations(data.conversations || []);
@@ -79,7 +103,7 @@ export default function AdminPage({ onBack, onLogout }) {
       // 파일명으로 테스트 여부 판단
       const isTest = filename.startsWith("test_");
       const url = `${API_BASE}/api/admin/conversations/${filename}${isTest ? '?is_test=true' : ''}`;
-      const response = await fetch(url);
+      const response = await fetch(url, { cache: "no-cache" });
       if (!response.ok) throw new Error("대화를 불러올 수 없습니다.");
       const data = await response.json();
       setSelectedConversation(data);
@@ -308,7 +332,23 @@ export default function AdminPage({ onBack, onLogout }) {
                   {selectedConversation.end_report.key_topics?.length > 0 && (
                     <div className="report-meta">
                       <span>주요 주제</span>
-                      <strong>{selectedConversation.end_report.key_topics.join(", ")}</strong>
+                      <strong>
+                        {selectedConversation.end_report.topics?.length > 0
+                          ? selectedConversation.end_report.topics.map((t) => `${t.topic} (${t.count}회)`).join(", ")
+                          : selectedConversation.end_report.key_topics.join(", ")}
+                      </strong>
+                    </div>
+                  )}
+                  {selectedConversation.end_report.risk_trajectory?.turns > 1 && (
+                    <div className="report-meta">
+                      <span>위험 추이</span>
+                      <strong>
+                        최고 {selectedConversation.end_report.risk_trajectory.peak_score}점
+                        ({selectedConversation.end_report.risk_trajectory.peak_turn}턴) · 상승{" "}
+                        {selectedConversation.end_report.risk_trajectory.escalation_count}회 · 하강{" "}
+                        {selectedConversation.end_report.risk_trajectory.de_escalation_count}회 · 주의환기 이상{" "}
+                        {selectedConversation.end_report.risk_trajectory.turns_at_or_above?.["주의환기"] ?? 0}턴
+                      </strong>
                     </div>
                   )}
                   <div className="report-guidance">
@@ -366,6 +406,24 @@ export default function AdminPage({ onBack, onLogout }) {
         />
 
         <main style={{ flex: 1 }}>
+          {alerts.length > 0 && (
+            <div className="panel" style={{ marginBottom: "18px", border: "1px solid #dc2626", background: "#fef2f2" }}>
+              <div style={{ display: "flex", justifyContent: "space-between", alignItems: "center" }}>
+                <h2 style={{ color: "#dc2626" }}>🚨 위험 상승 알림</h2>
+                <button type="button" onClick={() => setAlerts([])}>닫기</button>
+              </div>
+              {alerts.map((alert) => (
+                <div
+                  key={alert.offset}
+                  onClick={() => alert.data.filename && loadConversationDetail(alert.data.filename)}
+                  style={{ padding: "8px 0", cursor: alert.data.filename ? "pointer" : "default" }}
+                >
+                  <strong>{alert.data.next_action}</strong> · 위험 점수 {alert.data.risk_score} · 자살 신호 {alert.data.suicide_signal}
+                  {alert.data.is_test ? " (테스트)" : ""} — {alert.timestamp.replace("T", " ").slice(0, 19)}
+                </div>
+              ))}
+            </div>
+          )}
           {activeTab === "test" ? (
             <>
               {loading ? (
@@ -1,5 +1,5 @@
 import { useEffect, useMemo, useRef, useState } from "react";
-import { sendChat } from "./api.js";
+import { sendChatMessage } from "./api.js";
 import AdminPage from "./AdminPage.jsx";
 
 const initialHistory = [
@@ -26,6 +26,7 @@ export default function App() {
   const [loginError, setLoginError] = useState(""); // 로그인 에러 메시지
   const [showEndModal, setShowEndModal] = useState(false); // 대화 종료 모달
   const chatWindowRef = useRef(null);
+  const conversationRef = useRef(null); // 서버 대화 기록 { id, turn } (프로토콜 2)
 
   // 관리자 로그인 처리
   const handleAdminLogin = () => {
@@ -106,10 +107,14 @@ export default function App() {
     setLoading(true);
 
     try {
-      const response = await sendChat({
+      const response = await sendChatMessage({
         history: nextHistory,
         message,
+        conversation: conversationRef.current,
       }, isAdmin);
+      conversationRef.current = response.conversation_id
+        ? { id: response.conversation_id, turn: response.turn }
+        : null;
       setAnalysis(response);
       setHistory((prev) => [...prev, { role: "ai", content: response.reply }]);
       setError(""); // 성공 시 에러 메시지 초기화
@@ -132,6 +137,7 @@ export default function App() {
 
   const handleReset = () => {
     setHistory(initialHistory);
+    conversationRef.current = null;
     setMessage("");
     setAnalysis(null);
     setError("");
@@ -146,10 +152,14 @@ export default function App() {
     setLoading(true);
 
     try {
-      const response = await sendChat({
+      const response = await sendChatMessage({
         history: nextHistory,
         message: userMessage,
+        conversation: conversationRef.current,
       }, isAdmin);
+      conversationRef.current = response.conversation_id
+        ? { id: response.conversation_id, turn: response.turn }
+        : null;
       setAnalysis(response);
       setHistory((prev) => [...prev, { role: "ai", content: response.reply }]);
       setError(""); // 성공 시 에러 메시지 초기화
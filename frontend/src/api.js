@@ -22,9 +22,18 @@ export async function sendChat(payload, isAdmin = false) {
 
     clearTimeout(timeoutId);
 
+    if (response.status === 429) {
+      const retryAfter = response.headers.get("Retry-After");
+      const limitError = new Error(`메시지를 너무 빨리 보내고 있어요. ${retryAfter || "몇"}초 뒤에 다시 보내주세요.`);
+      limitError.status = 429;
+      throw limitError;
+    }
+
     if (!response.ok) {
       const errorText = await response.text();
-      throw new Error(`서버 오류 (${response.status}): ${errorText || "알 수 없는 오류"}`);
+      const httpError = new Error(`서버 오류 (${response.status}): ${errorText || "알 수 없는 오류"}`);
+      httpError.status = response.status;
+      throw httpError;
     }
 
     return await response.json();
@@ -47,3 +56,32 @@ export async function sendChat(payload, isAdmin = false) {
     throw new Error(`통신 오류: ${error.message || "알 수 없는 오류가 발생했습니다."}`);
   }
 }
+
+// 프로토콜 2: 서버가 대화 기록을 들고 있으므로 새 메시지만 보낸다
+// history: 이번 사용자 메시지까지 포함한 화면의 대화, conversation: 직전 응답의 { id, turn }
+// 화면 기록이 서버와 어긋났거나(오류 응답 등) 서버가 409를 주면 전체 history로 다시 맞춘다
+export async function sendChatMessage({ history, message, conversation }, isAdmin = false) {
+  const canDelta = Boolean(conversation?.id) && conversation.turn === history.length - 1;
+  const fullPayload = {
+    protocol: 2,
+    conversation_id: conversation?.id,
+    history,
+    message,
+  };
+  if (!canDelta) {
+    return sendChat(fullPayload, isAdmin);
+  }
+  try {
+    return await sendChat({
+      protocol: 2,
+      conversation_id: conversation.id,
+      last_seen_turn: conversation.turn,
+      message,
+    }, isAdmin);
+  } catch (error) {
+    if (error.status === 409) {
+      return sendChat(fullPayload, isAdmin);
+    }
+    throw error;
+  }
+}